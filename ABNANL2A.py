@@ -1,21 +1,26 @@
-import pdfplumber
 import re
 
+from common_script import TransactionRegion, open_document, traced
+from normalize import plain_amount
+
+TRANSACTION_REGION = TransactionRegion("ABNANL2A", "Datum Omschrijving Af Bij")
+
 # -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
 def extract_text_from_pdf(pdf_path):
     text = ''
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() + '\n'
+    with open_document(pdf_path) as doc:
+        for page_text in doc.page_texts():
+            text += page_text + '\n'
     return text
 
 def extract_tables_from_pdf(pdf_path):
     tables = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            tables.extend(page.extract_tables())
+    with open_document(pdf_path) as doc:
+        for i in range(doc.page_count):
+            tables.extend(doc.page_tables(i))
     return tables
 
+@traced("ABNANL2A.parse")
 def extract_pdf_info_and_transactions(pdf_path):
     additional_info = {
         "account_holder": "",
@@ -38,10 +43,9 @@ def extract_pdf_info_and_transactions(pdf_path):
     transaction_id = 1
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
+        with open_document(pdf_path) as doc:
             
-            page = pdf.pages[0]
-            text = page.extract_text()
+            text = doc.page_text(0)
 
             
             if "Bij- en afschrijvingen" not in text:
@@ -77,14 +81,13 @@ def extract_pdf_info_and_transactions(pdf_path):
             closing_balance_match = re.search(r'Saldo\s+\d{2}-\d{2}-\d{4}.*?Saldo\s+\d{2}-\d{2}-\d{4}\s+€\s+([\d\.,]+)', text, re.S)
 
             if initial_balance_match:
-                additional_info["initial_balance"] = initial_balance_match.group(1).replace(".", "").replace(",", ".")
+                additional_info["initial_balance"] = plain_amount(initial_balance_match.group(1), ",")
 
             if closing_balance_match:
-                additional_info["closing_balance"] = closing_balance_match.group(1).replace(".", "").replace(",", ".")
+                additional_info["closing_balance"] = plain_amount(closing_balance_match.group(1), ",")
 
             # Extract transactions
-            for page in pdf.pages:
-                text = page.extract_text()
+            for text in doc.region_page_texts(TRANSACTION_REGION):
                 lines = text.splitlines()
 
                 current_details = []
@@ -139,5 +142,5 @@ def extract_pdf_info_and_transactions(pdf_path):
 
 # -------------------- FUNCTION FOR PROCESSING FILES --------------------
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_pdf_info_and_transactions)
+    from common_script import main
+    main(extract_pdf_info_and_transactions)
@@ -1,56 +1,45 @@
-import pdfplumber
 import re
 
-# -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
-def extract_text_from_pdf(pdf_path):
-    text = ''
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() + '\n'
-    return text
-
-def extract_tables_from_pdf(pdf_path):
-    tables = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            tables.extend(page.extract_tables())
-    return tables
-
-def parse_pdf_text(text, tables):
-    lines = text.split('\n')
-    header = {}
-    transactions = []
-    closing_balance = {}
-    statement_period = {}
+from common_script import (PageTextReader, TableColumns, WordColumns, extract_tiered, open_document,
+                           tiered_extraction_enabled, traced)
 
-    # Find line containing "Opening balance" and extract currency and balance
-    for line in lines:
-        match = re.search(r'([A-Z]{3}) Opening balance (\d{4}-\d{2}-\d{2}) (\d+\.\d+)', line)
-        if match:
-            header['currency'] = match.group(1)
-            header['balance'] = match.group(3)
-            header['statement_date'] = match.group(2)
-            break
-
-    # Find line containing "Closing balance" and extract currency and balance
-    for line in lines:
-        match = re.search(r'([A-Z]{3}) Closing balance (\d{4}-\d{2}-\d{2}) (\d+\.\d+)', line)
-        if match:
-            closing_balance['currency'] = match.group(1)
-            closing_balance['balance'] = match.group(3)
-            closing_balance['statement_date'] = match.group(2)
-            break
-
-    # Extract statement period from the text
+# -------------------- PATTERNS --------------------
+OPENING_BALANCE_PATTERN = re.compile(r'([A-Z]{3}) Opening balance (\d{4}-\d{2}-\d{2}) (\d+\.\d+)')
+CLOSING_BALANCE_PATTERN = re.compile(r'([A-Z]{3}) Closing balance (\d{4}-\d{2}-\d{2}) (\d+\.\d+)')
+PERIOD_PATTERN = re.compile(r'Period (\d{4}-\d{2}-\d{2}) - (\d{4}-\d{2}-\d{2})')
+TABLE_COLUMNS = TableColumns("HABALT22", ["Beneficiary / Payer"])
+WORD_COLUMNS = WordColumns("HABALT22", ["No.", "Date", "Beneficiary / Payer", "Details", "Amount", "Balance"], r"\d+$")
+# -------------------- PATTERNS --------------------
+
+# -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
+def read_balances(lines, opening_balance, closing_balance, statement_period):
+    # Fills each of the three from the first line that matches it; called for
+    # every page in turn, so a value found on an earlier page is kept.
     for line in lines:
-        match = re.search(r'Period (\d{4}-\d{2}-\d{2}) - (\d{4}-\d{2}-\d{2})', line)
-        if match:
-            statement_period['from_date'] = match.group(1) + 'T00:00:01'  # Set time to 00:00:01
-            statement_period['to_date'] = match.group(2) + 'T23:59:59'    # Set time to 23:59:59
-            break
-
-    # Parse other information from text and tables
-    header.update({
+        if not opening_balance:
+            match = OPENING_BALANCE_PATTERN.search(line)
+            if match:
+                opening_balance['currency'] = match.group(1)
+                opening_balance['balance'] = match.group(3)
+                opening_balance['statement_date'] = match.group(2)
+
+        if not closing_balance:
+            match = CLOSING_BALANCE_PATTERN.search(line)
+            if match:
+                closing_balance['currency'] = match.group(1)
+                closing_balance['balance'] = match.group(3)
+                closing_balance['statement_date'] = match.group(2)
+
+        # Extract statement period from the text
+        if not statement_period:
+            match = PERIOD_PATTERN.search(line)
+            if match:
+                statement_period['from_date'] = match.group(1) + 'T00:00:01'  # Set time to 00:00:01
+                statement_period['to_date'] = match.group(2) + 'T23:59:59'    # Set time to 23:59:59
+
+def parse_header(lines):
+    # Parse other information from the lines of the first page
+    return {
         "account_holder": lines[1].strip().split('„')[0].strip() if len(lines) > 1 else "",
         "account_holder_id": lines[2].strip().split('ID No ')[1].split()[0] if len(lines) > 2 else "",
         "account_holder_address": " ".join(lines[3].strip().split('Reg.no ')[0].split(',')[0:-1]) if len(lines) > 3 else "",
@@ -62,7 +51,13 @@ def parse_pdf_text(text, tables):
         "bank_vat_code": lines[3].strip().split('VAT payer code ')[1] if len(lines) > 3 and 'VAT payer code' in lines[3] else "",
         "bank_registration_date": lines[5].strip().split()[-1] if len(lines) > 5 else "",
         "bank_bic": lines[6].strip().split('BIC: ')[1] if len(lines) > 6 and 'BIC:' in lines[6] else "",
-    })
+    }
+
+def parse_page_transactions(page_tables):
+    return parse_transactions([table for tables in page_tables for table in tables])
+
+def parse_transactions(tables):
+    transactions = []
 
     # Extract transactions from tables
     for table in tables:
@@ -92,19 +87,33 @@ def parse_pdf_text(text, tables):
                     "cdt_dbt_ind": cdt_dbt_ind
                 })
 
-    return header, transactions, closing_balance, statement_period
+    return transactions
 
+@traced("HABALT22.parse")
 def extract_pdf_data(pdf_file):
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            # Brzo provjeri postoji li ključna riječ "HABALT22" u bilo kojoj stranici PDF-a
-            if not any("HABALT22" in page.extract_text() for page in pdf.pages):
+        with open_document(pdf_file) as doc:
+            # Header and balances are read from the page texts during the
+            # transaction pass, page by page (see PageTextReader); the header
+            # lines are those of the first page.
+            found = set()
+            first_page = []
+            header, closing_balance, statement_period = {}, {}, {}
+
+            def read_page(text):
+                if not first_page:
+                    first_page.append(text)
+                if "HABALT22" in text:
+                    found.add("marker")
+                read_balances(text.split('\n'), header, closing_balance, statement_period)
+
+            page_texts = PageTextReader(doc, read_page)
+            transactions, tier = extract_tiered(doc, parse_page_transactions, WORD_COLUMNS, TABLE_COLUMNS,
+                                                page_texts, lambda: (header.get("balance", ""),
+                                                                     closing_balance.get("balance", "")))
+            if "marker" not in found:
                 return None  # Preskoči PDF ako ključna riječ nije prisutna
-
-            # Nastavi s ekstrakcijom teksta ako je ključna riječ pronađena
-            text = ''.join(page.extract_text() for page in pdf.pages)
-            tables = extract_tables_from_pdf(pdf_file)
-            header, transactions, closing_balance, statement_period = parse_pdf_text(text, tables)
+            header.update(parse_header(first_page[0].split('\n')))
 
             data = {
                 "account_holder": header.get("account_holder", ""),
@@ -121,6 +130,8 @@ def extract_pdf_data(pdf_file):
                 "transactions": transactions,
                 "initial_balance": header.get("balance", "")
             }
+            if tiered_extraction_enabled("HABALT22"):
+                data["extraction_tier"] = tier
 
             return data
 
@@ -132,5 +143,5 @@ def extract_pdf_data(pdf_file):
 
 # Automatically trigger processing when this script is run directly
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_pdf_data)
+    from common_script import main
+    main(extract_pdf_data)
@@ -1,14 +1,17 @@
-import pdfplumber
 import re
 
+from common_script import TransactionRegion, open_document, traced
+from normalize import plain_amount
+
+TRANSACTION_REGION = TransactionRegion("INGBNL2A", "Date Name / Description Amount")
+
 # -------------------- FUNCTION FOR EXTRACTING ACCOUNT INFO --------------------
 def extract_account_info_from_pdf(pdf_path):
     account_info = {}
     
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            first_page = pdf.pages[0]
-            lines = first_page.extract_text().splitlines()
+        with open_document(pdf_path) as doc:
+            lines = doc.page_text(0).splitlines()
 
            
             if "Statement Zakelijke rekening" not in lines[0]:
@@ -56,9 +59,8 @@ def extract_transactions_from_pdf(pdf_path):
     transaction_id = 1
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
+        with open_document(pdf_path) as doc:
+            for text in doc.region_page_texts(TRANSACTION_REGION):
                 if text is None:
                     continue
 
@@ -94,7 +96,7 @@ def extract_transactions_from_pdf(pdf_path):
                                 "date": date_part,
                                 "beneficiary": beneficiary,
                                 "details": "",
-                                "amount": amount.replace(',', ''),
+                                "amount": plain_amount(amount, "."),
                                 "balance": "",
                                 "cdt_dbt_ind": cdt_dbt_ind
                             })
@@ -120,13 +122,15 @@ def extract_transactions_from_pdf(pdf_path):
     return transactions
 
 # -------------------- MAIN FUNCTION FOR EXTRACTING PDF DATA --------------------
+@traced("INGBNL2A.parse")
 def extract_pdf_data(pdf_file):
     try:
-        account_info = extract_account_info_from_pdf(pdf_file)
-        if account_info is None:
-            return None
+        with open_document(pdf_file) as doc:
+            account_info = extract_account_info_from_pdf(doc)
+            if account_info is None:
+                return None
 
-        transactions = extract_transactions_from_pdf(pdf_file)
+            transactions = extract_transactions_from_pdf(doc)
 
         data = {
             "account_holder": account_info.get('Account Holder', ''),
@@ -153,5 +157,5 @@ def extract_pdf_data(pdf_file):
 
 # -------------------- SCRIPT EXECUTION --------------------
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_pdf_data)
+    from common_script import main
+    main(extract_pdf_data)
@@ -1,7 +1,20 @@
-import pdfplumber
 import re
 
+from common_script import open_document, traced
+
+# -------------------- PATTERNS --------------------
+STATEMENT_DATE_PATTERN = re.compile(r"AB\s+(\d{2}\.\d{2}\.\d{4})")
+BANK_NAME_PATTERN = re.compile(r"NÄRPES\s+(.*?)\s+AB")
+ACCOUNT_INFO_PATTERN = re.compile(r"Mottagare\s+IBAN-kontonummer\s+(.*?)\s+FI(\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{2})(.*?)\s+BIC-kod", re.DOTALL)
+STATEMENT_PERIOD_PATTERN = re.compile(r"NÄRPESVÄGEN 13\s+(\d{2}\.\d{2}\.\d{4}) - (\d{2}\.\d{2}\.\d{4})")
+INITIAL_BALANCE_PATTERN = re.compile(r"SALDO\s+(\d{2}\.\d{2}\.\d{4})\s+([+-]?\d{1,3}(?:\.\d{3})*,\d{2})")
+PAGE_PERIOD_PATTERN = re.compile(r"\d{2}\.\d{2}\.\d{4}\s+-\s+\d{2}\.\d{2}\.\d{4}")
+DATE_PATTERN = re.compile(r"\d{2}\.\d{2}")
+AMOUNT_PATTERN = re.compile(r"^[+-]?\d+(,\d{3})*,\d+$")
+# -------------------- PATTERNS --------------------
+
 # -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
+@traced("ITELFIHH.parse")
 def extract_pdf_data(pdf_path):
     data = {
         "statement_date": "",
@@ -18,30 +31,31 @@ def extract_pdf_data(pdf_path):
     }
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            text = "".join([page.extract_text() for page in pdf.pages])
-            
-            if "ITELFIHH" not in text:
-                return None
-
+        with open_document(pdf_path) as doc:
+            doc.use_pdfminer_text("ITELFIHH")
+            # The marker is looked for while the pages are parsed, so each
+            # page is read only once.
+            marker_found = False
             extracting_transactions = False
             transaction_id = 0
             transaction_details = ""
             skip_header = False
 
-            for page in pdf.pages:
-                text = page.extract_text() or ""
+            for i in range(doc.page_count):
+                text = doc.page_text(i) or ""
+                if "ITELFIHH" in text:
+                    marker_found = True
 
                 if not extracting_transactions:
-                    statement_date_match = re.search(r"AB\s+(\d{2}\.\d{2}\.\d{4})", text)
+                    statement_date_match = STATEMENT_DATE_PATTERN.search(text)
                     if statement_date_match:
                         data["statement_date"] = statement_date_match.group(1)
 
-                    bank_name_match = re.search(r"NÄRPES\s+(.*?)\s+AB", text)
+                    bank_name_match = BANK_NAME_PATTERN.search(text)
                     if bank_name_match:
                         data["bank_name"] = bank_name_match.group(1)
 
-                    account_info_match = re.search(r"Mottagare\s+IBAN-kontonummer\s+(.*?)\s+FI(\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{2})(.*?)\s+BIC-kod", text, re.DOTALL)
+                    account_info_match = ACCOUNT_INFO_PATTERN.search(text)
                     if account_info_match:
                         account_info = account_info_match.group(1).strip()
                         account_number = account_info_match.group(2).replace(" ", "")
@@ -51,13 +65,13 @@ def extract_pdf_data(pdf_path):
                         data["account_number"] = f"FI{account_number}"
                         data["account_holder_address"] = ' '.join(address_info.split('\n')).strip()
 
-                    statement_period_match = re.search(r"NÄRPESVÄGEN 13\s+(\d{2}\.\d{2}\.\d{4}) - (\d{2}\.\d{2}\.\d{4})", text)
+                    statement_period_match = STATEMENT_PERIOD_PATTERN.search(text)
                     if statement_period_match:
                         start_date = statement_period_match.group(1)
                         end_date = statement_period_match.group(2)
                         data["statement_period"] = f"{start_date} - {end_date}"
 
-                    initial_balance_match = re.search(r"SALDO\s+(\d{2}\.\d{2}\.\d{4})\s+([+-]?\d{1,3}(?:\.\d{3})*,\d{2})", text)
+                    initial_balance_match = INITIAL_BALANCE_PATTERN.search(text)
                     if initial_balance_match:
                         data["initial_balance"] = initial_balance_match.group(2).replace(",", ".")
 
@@ -69,7 +83,7 @@ def extract_pdf_data(pdf_path):
                     if skip_header:
                         lines = text.split('\n')
                         for i, line in enumerate(lines):
-                            if re.search(r"\d{2}\.\d{2}\.\d{4}\s+-\s+\d{2}\.\d{2}\.\d{4}", line):
+                            if PAGE_PERIOD_PATTERN.search(line):
                                 transaction_lines = lines[i + 1:]
                                 break
                         skip_header = False
@@ -77,7 +91,7 @@ def extract_pdf_data(pdf_path):
                         transaction_lines = text.split('\n')
 
                     for line in transaction_lines:
-                        date_match = re.match(r"\d{2}\.\d{2}", line)
+                        date_match = DATE_PATTERN.match(line)
                         if date_match:
                             date = date_match.group(0)
                             if transaction_details and data["transactions"]:
@@ -91,7 +105,7 @@ def extract_pdf_data(pdf_path):
                             transaction_parts = line.split()
                             amount_index = -1
                             for i in range(len(transaction_parts) - 1, 0, -1):
-                                if re.match(r"^[+-]?\d+(,\d{3})*,\d+$", transaction_parts[i]):
+                                if AMOUNT_PATTERN.match(transaction_parts[i]):
                                     amount_index = i
                                     break
                             if amount_index == -1:
@@ -99,7 +113,7 @@ def extract_pdf_data(pdf_path):
                             amount = transaction_parts[amount_index].replace(",", ".")
 
                             beneficiary_parts = transaction_parts[1:amount_index]
-                            if beneficiary_parts[-1].endswith("/A") or re.match(r"\d{2}\.\d{2}", beneficiary_parts[-1]):
+                            if beneficiary_parts[-1].endswith("/A") or DATE_PATTERN.match(beneficiary_parts[-1]):
                                 beneficiary_parts.pop()
                             beneficiary = " ".join(beneficiary_parts).strip()
 
@@ -119,6 +133,9 @@ def extract_pdf_data(pdf_path):
 
                     skip_header = True
 
+            if not marker_found:
+                return None
+
             if transaction_details and data["transactions"]:
                 arn_index = transaction_details.find("ARN:")
                 if arn_index != -1:
@@ -126,7 +143,7 @@ def extract_pdf_data(pdf_path):
                 data["transactions"][-1]["details"] = transaction_details.strip()
 
             for transaction in data["transactions"]:
-                if re.match(r"\d{2}\.\d{2}", transaction["beneficiary"]):
+                if DATE_PATTERN.match(transaction["beneficiary"]):
                     transaction["beneficiary"] = " ".join(transaction["beneficiary"].split()[1:])
 
             return data
@@ -138,5 +155,5 @@ def extract_pdf_data(pdf_path):
 
 # Automatically trigger processing when this script is run directly
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_pdf_data)
+    from common_script import main
+    main(extract_pdf_data)
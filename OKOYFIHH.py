@@ -1,20 +1,31 @@
-import pdfplumber
 import re
 from datetime import datetime
 
+from common_script import TransactionRegion, open_document, region_of_interest_enabled, traced
+
+DATE_PATTERN = re.compile(r'\d{2}\.\d{2}\.\d{2}')
+AMOUNT_PATTERN = re.compile(r'([+-]\s?\d{1,3}(?:\s?\d{3})*,\d{2})')
+STATEMENT_DATE_PATTERN = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})')
+ACCOUNT_NUMBER_PATTERN = re.compile(r'Tilinumero IBAN:\s+([A-Z]+\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{2})\s+BIC:')
+SALDO_PATTERN = re.compile(r'SALDO\s+\d{1,2}\.\d{1,2}\.\d{4}\s+([+-]\s?\d{1,3}(?:\s?\d{3})*,\d{2})')
+TRANSACTION_REGION = TransactionRegion("OKOYFIHH", "Saaja/Maksaja Kirjauspäivä Laji Määrä EUR")
+
 # Funkcija za parsiranje transakcija
 def parse_transactions(text):
+    return parse_transaction_lines(text.split('\n'))
+
+
+def parse_transaction_lines(lines):
     transactions = []
-    lines = text.split('\n')
     transaction_id = 1
     transaction = None
-    date_pattern = re.compile(r'\d{2}\.\d{2}\.\d{2}')  
-    amount_pattern = re.compile(r'([+-]\s?\d{1,3}(?:\s?\d{3})*,\d{2})')  
+    date_pattern = DATE_PATTERN
+    amount_pattern = AMOUNT_PATTERN
 
     transaction_keys = ["TILISIIRTO", "PALVELUMAKSU", "VIITESIIRTO", "PANO"]
     stop_keywords = ["SALDO", "NOSTOVARA", "OTOT YHTEENSÄ"]
 
-    for i, line in enumerate(lines):
+    for line in lines:
         if any(key in line for key in transaction_keys):
             date_match = date_pattern.search(line)
             if date_match:
@@ -59,6 +70,7 @@ def parse_transactions(text):
     return transactions
 
 
+@traced("OKOYFIHH.parse")
 def extract_pdf_data(pdf_path):
     data = {
         "statement_date": "",
@@ -76,52 +88,81 @@ def extract_pdf_data(pdf_path):
     }
 
     try:
-        statement_date_pattern = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})')
-        account_number_pattern = re.compile(r'Tilinumero IBAN:\s+([A-Z]+\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{2})\s+BIC:')
-        initial_balance_pattern = re.compile(r'SALDO\s+\d{1,2}\.\d{1,2}\.\d{4}\s+([+-]\s?\d{1,3}(?:\s?\d{3})*,\d{2})')
-        closing_balance_pattern = re.compile(r'SALDO\s+\d{1,2}\.\d{1,2}\.\d{4}\s+([+-]\s?\d{1,3}(?:\s?\d{3})*,\d{2})')
+        statement_date_pattern = STATEMENT_DATE_PATTERN
+        account_number_pattern = ACCOUNT_NUMBER_PATTERN
+        initial_balance_pattern = SALDO_PATTERN
+        closing_balance_pattern = SALDO_PATTERN
 
         current_year = datetime.now().year
 
-        with pdfplumber.open(pdf_path) as pdf:
-            text = "".join([page.extract_text() for page in pdf.pages])
-            
-            if "OKOYFIHH" not in text:
+        with open_document(pdf_path) as doc:
+            doc.use_pdfminer_text("OKOYFIHH")
+            found = {"marker": False}
+            # With region of interest the pages are kept apart; otherwise
+            # they are read as one text, as before: the last line of a page
+            # runs on into the first line of the next one.
+            separate_pages = region_of_interest_enabled("OKOYFIHH")
+            def statement_lines():
+                # Yields the lines of the statement page by page and fills in
+                # the header fields on the way; each field comes from the
+                # first page that has it, the closing balance from the last.
+                # The marker may be on any page, as in the dispatcher.
+                line_number = 0
+                ajalta_line = None
+
+                def header_lines(lines):
+                    nonlocal line_number, ajalta_line
+                    for line in lines:
+                        # Parsiranje perioda izvoda
+                        if line_number == 1:
+                            data["statement_period"] = line.replace("Ajalta", "").strip()
+                        if ajalta_line is None and 'Ajalta' in line:
+                            ajalta_line = line_number
+                        elif ajalta_line is not None and line_number == ajalta_line + 2:
+                            data['account_holder'] = line.strip()
+                        elif ajalta_line is not None and line_number == ajalta_line + 3:
+                            data['account_holder_address'] = line.strip()
+                        line_number += 1
+                        yield line
+
+                last_line = ""
+                for page_text in doc.iter_region_page_texts(TRANSACTION_REGION):
+                    if "OKOYFIHH" in page_text:
+                        found["marker"] = True
+
+                    if not data["statement_date"]:
+                        statement_date_match = statement_date_pattern.search(page_text)
+                        if statement_date_match:
+                            day, month, year = statement_date_match.groups()
+                            data["statement_date"] = f"{day.zfill(2)}.{month.zfill(2)}.{year.zfill(4)}"
+
+                    if not data["account_number"]:
+                        account_number_match = account_number_pattern.search(page_text)
+                        if account_number_match:
+                            data["account_number"] = account_number_match.group(1).replace(" ", "")
+
+                    if "initial_balance" not in found:
+                        initial_balance_match = initial_balance_pattern.search(page_text)
+                        if initial_balance_match:
+                            found["initial_balance"] = True
+                            data["initial_balance"] = initial_balance_match.group(1).replace(' ', '')
+
+                    closing_balance_matches = closing_balance_pattern.findall(page_text)
+                    if closing_balance_matches:
+                        data["closing_balance"] = closing_balance_matches[-1].replace(' ', '')
+
+                    lines = page_text.split('\n')
+                    if not separate_pages:
+                        lines[0] = last_line + lines[0]
+                        last_line = lines.pop()
+                    yield from header_lines(lines)
+                if not separate_pages:
+                    yield from header_lines([last_line])
+
+            transactions = parse_transaction_lines(statement_lines())
+            if not found["marker"]:
                 return None
-
-            statement_date_match = statement_date_pattern.search(text)
-            if statement_date_match:
-                day, month, year = statement_date_match.groups()
-                data["statement_date"] = f"{day.zfill(2)}.{month.zfill(2)}.{year.zfill(4)}"
-
-            account_number_match = account_number_pattern.search(text)
-            if account_number_match:
-                data["account_number"] = account_number_match.group(1).replace(" ", "")
-
-            initial_balance_match = initial_balance_pattern.search(text)
-            if initial_balance_match:
-                data["initial_balance"] = initial_balance_match.group(1).replace(' ', '')
-
-            closing_balance_matches = closing_balance_pattern.findall(text)
-            if closing_balance_matches:
-                data["closing_balance"] = closing_balance_matches[-1].replace(' ', '')
-
-            # Parsiranje perioda izvoda
-            lines = text.split('\n')
-            if len(lines) >= 2:
-                statement_period_line = lines[1].replace("Ajalta", "").strip()
-                data["statement_period"] = statement_period_line
-
-            for i, line in enumerate(lines):
-                if 'Ajalta' in line:
-                    if (i + 2) < len(lines):
-                        data['account_holder'] = lines[i + 2].strip()
-                    if (i + 3) < len(lines):
-                        data['account_holder_address'] = lines[i + 3].strip()
-                    break
-
-            
-            data["transactions"] = parse_transactions(text)
+            data["transactions"] = transactions
 
     except Exception:
         
@@ -131,5 +172,5 @@ def extract_pdf_data(pdf_path):
 
 
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_pdf_data)
+    from common_script import main
+    main(extract_pdf_data)
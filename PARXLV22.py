@@ -1,16 +1,76 @@
-import pdfplumber
 import re
 
+from common_script import (PageTextReader, TableColumns, WordColumns, extract_tiered, open_document,
+                           tiered_extraction_enabled, traced)
+
+TABLE_COLUMNS = TableColumns("PARXLV22", ["Sākuma atlikums"])
+WORD_COLUMNS = WordColumns("PARXLV22", ["Datums", "Saņēmējs/Maksātājs", "Apraksts", "Summa EUR"],
+                           r"\d{2}\.\d{2}\.\d{4}$", ["Sākuma atlikums", "Izejošie maksājumi", "Debeta apgrozījums"])
+CLOSING_BALANCE_PATTERN = re.compile(r"Beigu atlikums:\s*([+-]?[\d,\.]+)")
+
 # -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
+def read_header(text, data, found):
+    # Fills the header fields from one page text; each field comes from the
+    # first page that has it. found holds the fields already read.
+    if 'AS "Citadele banka" Reģ.' in text:
+        found.add("marker")
+
+    if "account_holder" not in found:
+        account_holder_match = re.search(r"Konta pārskats\s*(.*?)\s*Personas kods/Pases Nr\.", text, re.MULTILINE | re.DOTALL)
+        if account_holder_match:
+            found.add("account_holder")
+            data["account_holder"] = account_holder_match.group(1).strip()
+
+    if "account_holder_id" not in found:
+        index = text.find("Personas kods/Pases Nr.:")
+        if index != -1:
+            found.add("account_holder_id")
+            segment = text[index:]
+            account_holder_id_match = re.search(r"Personas kods/Pases Nr\.\s*(\d{6}-\d{5})", segment)
+            if account_holder_id_match:
+                data["account_holder_id"] = account_holder_id_match.group(1)
+
+            address_start = segment.find(data["account_holder_id"]) + len(data["account_holder_id"]) + len("Personas kods/Pases Nr.: ")
+            address_segment = segment[address_start:]
+            address_end = address_segment.find("Konta numurs (IBAN):")
+            if address_end != -1:
+                address_text = address_segment[:address_end].strip().split("\n", 1)
+                data["account_holder_address"] = address_text[1].strip() if len(address_text) > 1 else ""
+            else:
+                data["account_holder_address"] = address_segment.strip()
+
+            text = text.replace(f"Personas kods/Pases Nr.: {data['account_holder_id']}", "")
+            text = text.replace(data["account_holder_address"], "")
+
+    if "account_number" not in found:
+        account_number_match = re.search(r"Konta numurs \(IBAN\):\s*(LV\d{2}[A-Z0-9]{15})", text)
+        if account_number_match:
+            found.add("account_number")
+            data["account_number"] = account_number_match.group(1).replace(" ", "")
+
+    if "statement_period" not in found:
+        statement_period_match = re.search(r"No\s+(\d{2}\.\d{2}\.\d{4})\s+līdz\s+(\d{2}\.\d{2}\.\d{4})", text)
+        if statement_period_match:
+            found.add("statement_period")
+            data["statement_period"] = f"{statement_period_match.group(1)} - {statement_period_match.group(2)}"
+
+    if "initial_balance" not in found:
+        initial_balance_match = re.search(r"Sākuma atlikums:\s*([\d,\.]+)", text)
+        if initial_balance_match:
+            found.add("initial_balance")
+            data["initial_balance"] = initial_balance_match.group(1).replace(' ', '')
+
+    if "closing_balance" not in found:
+        closing_balance_match = CLOSING_BALANCE_PATTERN.search(text)
+        if closing_balance_match:
+            found.add("closing_balance")
+            data["closing_balance"] = closing_balance_match.group(1)
+
+
+@traced("PARXLV22.parse")
 def extract_pdf_data(pdf_path):
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            text = "".join([page.extract_text() for page in pdf.pages])
-            
-            
-            if 'AS "Citadele banka" Reģ.' not in text:
-                return None
-
+        with open_document(pdf_path) as doc:
             data = {
                 "account_holder": "",
                 "account_holder_id": "",
@@ -27,51 +87,19 @@ def extract_pdf_data(pdf_path):
                 "transactions": []
             }
 
-            
-            account_holder_match = re.search(r"Konta pārskats\s*(.*?)\s*Personas kods/Pases Nr\.", text, re.MULTILINE | re.DOTALL)
-            if account_holder_match:
-                data["account_holder"] = account_holder_match.group(1).strip()
-
-            
-            index = text.find("Personas kods/Pases Nr.:")
-            if index != -1:
-                segment = text[index:]
-                account_holder_id_match = re.search(r"Personas kods/Pases Nr\.\s*(\d{6}-\d{5})", segment)
-                if account_holder_id_match:
-                    data["account_holder_id"] = account_holder_id_match.group(1)
-                    
-                address_start = segment.find(data["account_holder_id"]) + len(data["account_holder_id"]) + len("Personas kods/Pases Nr.: ")
-                address_segment = segment[address_start:]
-                address_end = address_segment.find("Konta numurs (IBAN):")
-                if address_end != -1:
-                    address_text = address_segment[:address_end].strip().split("\n", 1)
-                    data["account_holder_address"] = address_text[1].strip() if len(address_text) > 1 else ""
-                else:
-                    data["account_holder_address"] = address_segment.strip()
-                
-                text = text.replace(f"Personas kods/Pases Nr.: {data['account_holder_id']}", "")
-                text = text.replace(data["account_holder_address"], "")
-            else:
-                data["account_holder_id"] = ""
-                data["account_holder_address"] = ""
-
-           
-            account_number_match = re.search(r"Konta numurs \(IBAN\):\s*(LV\d{2}[A-Z0-9]{15})", text)
-            if account_number_match:
-                data["account_number"] = account_number_match.group(1).replace(" ", "")
-
-            
-            statement_period_match = re.search(r"No\s+(\d{2}\.\d{2}\.\d{4})\s+līdz\s+(\d{2}\.\d{2}\.\d{4})", text)
-            if statement_period_match:
-                data["statement_period"] = f"{statement_period_match.group(1)} - {statement_period_match.group(2)}"
-
-            
-            initial_balance_match = re.search(r"Sākuma atlikums:\s*([\d,\.]+)", text)
-            if initial_balance_match:
-                data["initial_balance"] = initial_balance_match.group(1).replace(' ', '')
+            # The header is read from the page texts during the transaction
+            # pass, page by page (see PageTextReader).
+            found = set()
+            page_texts = PageTextReader(doc, lambda text: read_header(text, data, found))
+            data["transactions"], tier = extract_tiered(doc, parse_transactions, WORD_COLUMNS, TABLE_COLUMNS,
+                                                        page_texts, lambda: (data["initial_balance"],
+                                                                             data.get("closing_balance", "")))
+            data.pop("closing_balance", None)
+            if "marker" not in found:
+                return None
 
-            
-            data["transactions"] = extract_transactions_from_pdf(pdf_path)
+            if tiered_extraction_enabled("PARXLV22"):
+                data["extraction_tier"] = tier
 
             return data
 
@@ -80,89 +108,94 @@ def extract_pdf_data(pdf_path):
         return None
 
 def extract_transactions_from_pdf(pdf_file):
+    with open_document(pdf_file) as doc:
+        return parse_transactions(doc.iter_column_page_tables(TABLE_COLUMNS))
+
+def parse_transactions(page_tables):
     transactions = []
     found_initial_balance = False
     stop_processing = False
 
-    with pdfplumber.open(pdf_file) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables()
+    for tables in page_tables:
 
-            initial_balance = ""
-            found_initial_balance = False
-            stop_processing = False
-            
-            for table in tables:
-                for row in table:
-                    if not found_initial_balance:
-                        
-                        for cell in row:
-                            if cell and "Sākuma atlikums" in cell:
-                                initial_balance = cell.split("Sākuma atlikums:")[-1].strip()
-                                found_initial_balance = True
-                                break
-                        if found_initial_balance:
-                            continue
-            
+        initial_balance = ""
+        found_initial_balance = False
+        stop_processing = False
+        
+        for table in tables:
+            for row in table:
+                if not found_initial_balance:
                     
-                    if any(cell and ("Izejošie maksājumi" in cell or "Debeta apgrozījums" in cell) for cell in row):
-                        stop_processing = True
-                        break
-            
-                    if stop_processing:
-                        break
-
-                    if len(row) >= 2:
-                        
-                        if is_date(row[0]):
-                            date = row[0].strip()
-                            beneficiary = row[1].strip() if len(row) > 1 else ""
-                            details = row[2].strip() if len(row) > 2 else ""
-                        elif is_date(row[1]):
-                            date = row[1].strip()
-                            beneficiary = row[2].strip() if len(row) > 2 else ""
-                            details = row[3].strip() if len(row) > 3 else ""
-                        else:
-                            continue  
-                        
-                        
-                        possible_amount = row[-1].strip() if len(row) > 1 and row[-1] else ''
-                        if not possible_amount:
-                            possible_amount = row[-2].strip() if len(row) > 2 and row[-2] else ''
-                        
-                        if possible_amount.startswith('+'):
-                            amount = possible_amount[1:].strip()
-                            cdt_dbt_ind = 'CRDT'
-                        elif possible_amount.startswith('-'):
-                            amount = possible_amount[1:].strip()
-                            cdt_dbt_ind = 'DBIT'
-                        else:
-                            amount = ''
-                            cdt_dbt_ind = ''
-
-                        if amount:
-                            transactions.append({
-                                "transaction_id": "",  
-                                "date": date,
-                                "beneficiary": beneficiary,
-                                "details": details,
-                                "amount": amount,
-                                "balance": "",  
-                                "cdt_dbt_ind": cdt_dbt_ind
-                            })
+                    for cell in row:
+                        if cell and "Sākuma atlikums" in cell:
+                            initial_balance = cell.split("Sākuma atlikums:")[-1].strip()
+                            found_initial_balance = True
+                            break
+                    if found_initial_balance:
+                        continue
+        
                 
+                if any(cell and ("Izejošie maksājumi" in cell or "Debeta apgrozījums" in cell) for cell in row):
+                    stop_processing = True
+                    break
+        
                 if stop_processing:
-                    break  
+                    break
+
+                if len(row) >= 2:
+                    
+                    if is_date(row[0]):
+                        date = row[0].strip()
+                        beneficiary = row[1].strip() if len(row) > 1 else ""
+                        details = row[2].strip() if len(row) > 2 else ""
+                    elif is_date(row[1]):
+                        date = row[1].strip()
+                        beneficiary = row[2].strip() if len(row) > 2 else ""
+                        details = row[3].strip() if len(row) > 3 else ""
+                    else:
+                        continue  
+                    
+                    
+                    possible_amount = row[-1].strip() if len(row) > 1 and row[-1] else ''
+                    if not possible_amount:
+                        possible_amount = row[-2].strip() if len(row) > 2 and row[-2] else ''
+                    
+                    if possible_amount.startswith('+'):
+                        amount = possible_amount[1:].strip()
+                        cdt_dbt_ind = 'CRDT'
+                    elif possible_amount.startswith('-'):
+                        amount = possible_amount[1:].strip()
+                        cdt_dbt_ind = 'DBIT'
+                    else:
+                        amount = ''
+                        cdt_dbt_ind = ''
+
+                    if amount:
+                        transactions.append({
+                            "transaction_id": "",  
+                            "date": date,
+                            "beneficiary": beneficiary,
+                            "details": details,
+                            "amount": amount,
+                            "balance": "",  
+                            "cdt_dbt_ind": cdt_dbt_ind
+                        })
+            
+            if stop_processing:
+                break  
 
     return transactions
 
+DATE_PATTERN = re.compile(r'\d{2}\.\d{2}\.\d{4}')
+
+
 def is_date(value):
     
-    return bool(re.match(r'\d{2}\.\d{2}\.\d{4}', value))
+    return bool(DATE_PATTERN.match(value))
 
 # -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
 
 # Automatically trigger processing when this script is run directly
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_pdf_data)
+    from common_script import main
+    main(extract_pdf_data)
@@ -1,16 +1,27 @@
-import pdfplumber
 import re
+from itertools import chain, islice
+
+from common_script import TransactionRegion, open_document, traced
+from normalize import amount_minor, format_minor, plain_amount
+
+TRANSACTION_REGION = TransactionRegion("RABONL2U", "Datum Omschrijving Bedrag")
+# extract_account_info only reads the first lines of the statement
+ACCOUNT_INFO_LINES = 13
 
 # -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
+def iter_text_lines(pdf_path):
+    # The lines of extract_text_from_pdf(pdf_path), read one page at a time
+    with open_document(pdf_path) as doc:
+        doc.use_pdfminer_text("RABONL2U")
+        for page_text in doc.iter_region_page_texts(TRANSACTION_REGION):
+            yield from page_text.split('\n')
+    yield ''
+
 def extract_text_from_pdf(pdf_path):
-    text = ''
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() + '\n'
+        return '\n'.join(iter_text_lines(pdf_path))
     except FileNotFoundError:
         return None
-    return text
 
 def extract_account_info(text):
     account_info = {
@@ -45,7 +56,7 @@ def extract_account_info(text):
         statement_start_date_match = re.search(r'(\d{2}-\d{2}-\d{4})', initial_balance_line)
         if statement_start_date_match:
             statement_start_date = statement_start_date_match.group(1)
-            account_info["initial_balance"] = re.search(r'([\d.,]+) CR', initial_balance_line).group(1).replace('.', '').replace(',', '.')
+            account_info["initial_balance"] = plain_amount(re.search(r'([\d.,]+) CR', initial_balance_line).group(1), ',')
             account_info["statement_period"] = f"{statement_start_date} - {statement_end_date}" if 'statement_end_date' in locals() else statement_start_date
         
     if len(lines) > 11:
@@ -54,7 +65,7 @@ def extract_account_info(text):
         statement_end_date_match = re.search(r'(\d{2}-\d{2}-\d{4})', closing_balance_line)
         if statement_end_date_match:
             statement_end_date = statement_end_date_match.group(1)
-            account_info["closing_balance"] = re.search(r'([\d.,]+) CR', closing_balance_line).group(1).replace('.', '').replace(',', '.')
+            account_info["closing_balance"] = plain_amount(re.search(r'([\d.,]+) CR', closing_balance_line).group(1), ',')
             if 'statement_period' not in account_info or not account_info["statement_period"]:
                 account_info["statement_period"] = f"{statement_start_date} - {statement_end_date}"
         
@@ -66,46 +77,49 @@ def extract_account_info(text):
 
     return account_info
 
-def parse_transactions(text):
-    transactions = []
-    transaction_id = 1
-
-    transaction_line_pattern = re.compile(r'^(\d{2}-\d{2})\s+(.*?)\s+([\d.,]+)$')
-    verwerkingsdatum_pattern = re.compile(r'Verwerkingsdatum:\s*(\d{2}-\d{2}-\d{4})')
+TRANSACTION_LINE_PATTERN = re.compile(r'^(\d{2}-\d{2})\s+(.*?)\s+([\d.,]+)$')
+VERWERKINGSDATUM_PATTERN = re.compile(r'Verwerkingsdatum:\s*(\d{2}-\d{2}-\d{4})')
 
-    lines = text.split('\n')
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
 
-        match = transaction_line_pattern.match(line)
-        if match:
-            date = match.group(1)
-            beneficiary = match.group(2).strip()
-            amount_str = match.group(3).replace('.', '').replace(',', '.')
-            amount = float(amount_str)
-
-            amount_position = line.rfind(match.group(3))
-            
-            details = []
-            transaction_date = ''
+def parse_transactions(text):
+    return parse_transaction_lines(text.split('\n'))
 
-            i += 1
-            while i < len(lines) and not transaction_line_pattern.match(lines[i].strip()):
-                detail_line = lines[i].strip()
+def parse_transaction_lines(lines):
+    transactions = []
+    transaction_id = 1
 
-                if verwerkingsdatum_pattern.search(detail_line):
-                    transaction_date = verwerkingsdatum_pattern.search(detail_line).group(1)
-                else:
-                    details.append(detail_line)
-                i += 1
+    transaction_line_pattern = TRANSACTION_LINE_PATTERN
+    verwerkingsdatum_pattern = VERWERKINGSDATUM_PATTERN
+
+    # The transaction being read: (date, beneficiary, amount, line, details,
+    # processing date); it is complete when the next transaction line or the
+    # end of the statement is reached.
+    current = None
+
+    for line in chain(lines, [None]):
+        match = None
+        if line is not None:
+            line = line.strip()
+            match = transaction_line_pattern.match(line)
+            if not match:
+                if current is not None:
+                    verwerkingsdatum_match = verwerkingsdatum_pattern.search(line)
+                    if verwerkingsdatum_match:
+                        current[5] = verwerkingsdatum_match.group(1)
+                    else:
+                        current[4].append(line)
+                continue
+
+        if current is not None:
+            date, beneficiary, amount_text, transaction_line, details, transaction_date = current
+            amount = amount_minor(amount_text, ',')
+            amount_position = transaction_line.rfind(amount_text)
 
             if not transaction_date:
                 transaction_date = date
 
             details_text = ' | '.join(details)
-            details_end_position = len(line) - len(details_text) - 1
+            details_end_position = len(transaction_line) - len(details_text) - 1
 
             indicator = 'dbit' if amount_position > details_end_position else 'crdt'
 
@@ -114,25 +128,29 @@ def parse_transactions(text):
                 'date': transaction_date,
                 'beneficiary': beneficiary,
                 'details': ' | '.join(details),
-                'amount': f'{amount:.2f}',
+                'amount': format_minor(amount),
                 'balance': '',
                 'cdt_dbt_ind': indicator
             })
             
             transaction_id += 1
-        else:
-            i += 1
+
+        current = None
+        if match:
+            current = [match.group(1), match.group(2).strip(), match.group(3), line, [], '']
     
     return transactions
 
+@traced("RABONL2U.parse")
 def extract_pdf_data(pdf_file):
     try:
-        text = extract_text_from_pdf(pdf_file)
-        if text is None:
-            return None
+        # Only the first lines are kept as text; transactions are parsed
+        # while the remaining pages are read.
+        lines = iter_text_lines(pdf_file)
+        head = list(islice(lines, ACCOUNT_INFO_LINES))
         
-        account_info = extract_account_info(text)
-        transactions = parse_transactions(text)
+        account_info = extract_account_info('\n'.join(head))
+        transactions = parse_transaction_lines(chain(head, lines))
 
         data = {
             "account_holder": account_info.get('account_holder', ''),
@@ -162,5 +180,5 @@ def extract_pdf_data(pdf_file):
 
 # Automatically trigger processing when this script is run directly
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_pdf_data)
+    from common_script import main
+    main(extract_pdf_data)
@@ -1,69 +1,91 @@
-import pdfplumber
 import re
 
+from common_script import (PageTextReader, TableColumns, WordColumns, extract_tiered, open_document,
+                           tiered_extraction_enabled, traced)
+
+TABLE_COLUMNS = TableColumns("RIKOLV2X", ["Начальный остаток", "Sākuma atlikums"])
+WORD_COLUMNS = WordColumns("RIKOLV2X", ["Datums", "Saņēmējs/Maksātājs", "Maksājuma mērķis", "Debets", "Kredīts"],
+                           r"\d{2}\.\d{2}\.\d{4}$",
+                           ["Начальный остаток", "Sākuma atlikums", "Итого исходящие:", "Kopā izejošie:"])
+
+# field -> (pattern, group); each field comes from the first page that matches
+HEADER_PATTERNS = {
+    "account_holder": (re.compile(r"(Обзор счета|Konta pārskats)\s+(.+?)\s+\d"), 2),
+    "account_holder_id": (re.compile(r"(\d{6}-\d{5})"), 1),
+    "account_number": (re.compile(r"(Счет:|Konts:)\s+(LV\d{2}RIKO\d{13})"), 2),
+    "statement_period": (re.compile(r"(Отчетный период:|Pārskata periods:)\s+(\d{2}\.\d{2}\.\d{4}\s+-\s+"
+                                    r"\d{2}\.\d{2}\.\d{4})"), 2),
+    "initial_balance": (re.compile(r"(Начальный остаток|Sākuma atlikums):\s+\+?([\d,\.]+)\s+EUR"), 2),
+    "closing_balance": (re.compile(r"(Конечный остаток|Beigu atlikums):\s+([+-]?[\d,\.]+)\s+EUR"), 2),
+}
+
 # -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
 def extract_transactions_from_pdf(pdf_file):
+    try:
+        with open_document(pdf_file) as doc:
+            return parse_transactions(doc.iter_column_page_tables(TABLE_COLUMNS))
+    except FileNotFoundError:
+        return None
+
+def parse_transactions(page_tables):
     transactions = []
     found_initial_balance = False
     stop_processing = False
 
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-
-                for table in tables:
-                    for row in table:
-                        if not found_initial_balance:
-                            if any(cell and ("Начальный остаток" in cell or "Sākuma atlikums" in cell) for cell in row):
-                                found_initial_balance = True
-                            continue  
-
-                        if any(cell and ("Итого исходящие:" in cell or "Kopā izejošie:" in cell) for cell in row):
-                            stop_processing = True
-                            break  
-
-                        if stop_processing:
-                            break  
-
-                        if len(row) >= 3:
-                            date = row[0].strip() if row[0] else ""
-                            beneficiary = " ".join(row[1].strip().split()) if row[1] else ""
-                            details = " ".join(row[2].strip().split()) if row[2] else ""
-                            
-                            amount = ''
-                            cdt_dbt_ind = ''
-                            
-                            possible_amount1 = row[3].strip() if len(row) > 3 and row[3] else ''
-                            possible_amount2 = row[4].strip() if len(row) > 4 and row[4] else ''
-
-                            if possible_amount1 and possible_amount2:
-                                if row.index(possible_amount1) < row.index(possible_amount2):
-                                    amount = possible_amount1
-                                    cdt_dbt_ind = 'DBIT'
-                                else:
-                                    amount = possible_amount2
-                                    cdt_dbt_ind = 'CRDT'
-                            elif possible_amount1:
+        for tables in page_tables:
+            for table in tables:
+                for row in table:
+                    if not found_initial_balance:
+                        if any(cell and ("Начальный остаток" in cell or "Sākuma atlikums" in cell) for cell in row):
+                            found_initial_balance = True
+                        continue  
+
+                    if any(cell and ("Итого исходящие:" in cell or "Kopā izejošie:" in cell) for cell in row):
+                        stop_processing = True
+                        break  
+
+                    if stop_processing:
+                        break  
+
+                    if len(row) >= 3:
+                        date = row[0].strip() if row[0] else ""
+                        beneficiary = " ".join(row[1].strip().split()) if row[1] else ""
+                        details = " ".join(row[2].strip().split()) if row[2] else ""
+                        
+                        amount = ''
+                        cdt_dbt_ind = ''
+                        
+                        possible_amount1 = row[3].strip() if len(row) > 3 and row[3] else ''
+                        possible_amount2 = row[4].strip() if len(row) > 4 and row[4] else ''
+
+                        if possible_amount1 and possible_amount2:
+                            if row.index(possible_amount1) < row.index(possible_amount2):
                                 amount = possible_amount1
                                 cdt_dbt_ind = 'DBIT'
-                            elif possible_amount2:
+                            else:
                                 amount = possible_amount2
                                 cdt_dbt_ind = 'CRDT'
-                            
-                            if amount:
-                                transactions.append({
-                                    "transaction_id": "",  
-                                    "date": date,
-                                    "beneficiary": beneficiary,
-                                    "details": details,
-                                    "amount": amount,
-                                    "balance": "",  
-                                    "cdt_dbt_ind": cdt_dbt_ind
-                                })
-                    
-                    if stop_processing:
-                        break  
+                        elif possible_amount1:
+                            amount = possible_amount1
+                            cdt_dbt_ind = 'DBIT'
+                        elif possible_amount2:
+                            amount = possible_amount2
+                            cdt_dbt_ind = 'CRDT'
+                        
+                        if amount:
+                            transactions.append({
+                                "transaction_id": "",  
+                                "date": date,
+                                "beneficiary": beneficiary,
+                                "details": details,
+                                "amount": amount,
+                                "balance": "",  
+                                "cdt_dbt_ind": cdt_dbt_ind
+                            })
+                
+                if stop_processing:
+                    break  
 
     except FileNotFoundError:
         return None
@@ -72,35 +94,37 @@ def extract_transactions_from_pdf(pdf_file):
 
     return transactions
 
+def read_header(text, header):
+    if "RIKOLV2X" in text:
+        header["marker"] = True
+    for field, (pattern, group) in HEADER_PATTERNS.items():
+        if field not in header:
+            match = pattern.search(text)
+            if match:
+                header[field] = match.group(group)
+
+
+@traced("RIKOLV2X.parse")
 def extract_pdf_data(pdf_file):
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            text = "".join([page.extract_text() for page in pdf.pages])
-            
-            if "RIKOLV2X" not in text:
+        with open_document(pdf_file) as doc:
+            # The header is read from the page texts during the transaction
+            # pass, page by page (see PageTextReader).
+            header = {}
+            page_texts = PageTextReader(doc, lambda text: read_header(text, header))
+            transactions, tier = extract_tiered(doc, parse_transactions, WORD_COLUMNS, TABLE_COLUMNS, page_texts,
+                                                lambda: (header.get("initial_balance", ""),
+                                                         header.get("closing_balance", "")))
+            if not header.get("marker"):
                 return None
 
-            account_holder_match = re.search(r"(Обзор счета|Konta pārskats)\s+(.+?)\s+\d", text)
-            account_holder_id_match = re.search(r"(\d{6}-\d{5})", text)
-            account_number_match = re.search(r"(Счет:|Konts:)\s+(LV\d{2}RIKO\d{13})", text)
-            statement_period_match = re.search(r"(Отчетный период:|Pārskata periods:)\s+(\d{2}\.\d{2}\.\d{4}\s+-\s+\d{2}\.\d{2}\.\d{4})", text)
-
-            account_holder = account_holder_match.group(2) if account_holder_match else ""
-            account_holder_id = account_holder_id_match.group(1) if account_holder_id_match else ""
-            account_number = account_number_match.group(2) if account_number_match else ""
-            statement_period = statement_period_match.group(2) if statement_period_match else ""
-
-            initial_balance_match = re.search(r"(Начальный остаток|Sākuma atlikums):\s+\+?([\d,\.]+)\s+EUR", text)
-            initial_balance = initial_balance_match.group(2) if initial_balance_match else ""
-
-            transactions = extract_transactions_from_pdf(pdf_file)
-
+            initial_balance = header.get("initial_balance", "")
             data = {
-                "account_holder": account_holder,
-                "account_holder_id": account_holder_id,
+                "account_holder": header.get("account_holder", ""),
+                "account_holder_id": header.get("account_holder_id", ""),
                 "account_holder_address": "",
-                "account_number": account_number,
-                "statement_period": statement_period,
+                "account_number": header.get("account_number", ""),
+                "statement_period": header.get("statement_period", ""),
                 "bank_name": "Luminor Bank AS",
                 "bank_address": "",
                 "bank_reg_no": "",
@@ -110,6 +134,8 @@ def extract_pdf_data(pdf_file):
                 "transactions": transactions,
                 "initial_balance": initial_balance
             }
+            if tiered_extraction_enabled("RIKOLV2X"):
+                data["extraction_tier"] = tier
 
             return data
 
@@ -122,5 +148,5 @@ def extract_pdf_data(pdf_file):
 
 # Automatically trigger processing when this script is run directly
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_pdf_data)
+    from common_script import main
+    main(extract_pdf_data)
@@ -1,118 +1,9 @@
-import pdfplumber
 import re
 
-# -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
-def extract_info_from_pdf(pdf_path):
-    info = {}
-    transactions = []
-    transaction_id = 1
-
-    with pdfplumber.open(pdf_path) as pdf:
-        first_page = pdf.pages[0]
-        text = first_page.extract_text()
-
-        
-        if "Norēķinu konts EUR" not in text:
-            return None  
-
-        
-        date_matches = re.findall(r'(\d{2}\.\d{2}\.\d{4})', text)
-        if len(date_matches) >= 2:
-            info["statement_period"] = f"{date_matches[0]} - {date_matches[1]}"  
-
-        
-        account_holder_match = re.search(r'(.*?)Norēķinu konts EUR', text)
-        if account_holder_match:
-            info["account_holder"] = account_holder_match.group(1).strip()
-
-        info["account_holder_address"] = ""  
-
-        
-        account_number_match = re.search(r'Norēķinu konts EUR\s+(LV\d+.*)', text)
-        if account_number_match:
-            info["account_number"] = account_number_match.group(1).strip()
-
-        
-        period_match = re.search(r'Pārskats par periodu\s+(\d{2}\.\d{2}\.\d{4})\s+-\s+(\d{2}\.\d{2}\.\d{4})', text)
-        if period_match:
-            info["statement_period"] = f"{period_match.group(1)} - {period_match.group(2)}"
-
-        info["bank_name"] = "AS SEB Banka"
-        info["bank_bic"] = "UNLALV2X"
-        info["bank_reg_no"] = "40003816496."
-        info["bank_address"] = "Gustava Zemgala gatve 73"
-
-        
-        closing_balance_match = re.search(r'Beigu atlikums\s+(-?\d+,\d+)', text)
-        if closing_balance_match:
-            closing_balance = closing_balance_match.group(1).replace('.', ',')
-            
-            lines = text.split('\n')
-            for i, line in enumerate(lines):
-                if 'Beigu atlikums' in line:
-                    if i > 0:
-                        initial_balance_match = re.search(r'(-?\d+,\d+)', lines[i-1])
-                        if initial_balance_match:
-                            info["initial_balance"] = initial_balance_match.group(1).replace('.', ',')
-                    break
-        else:
-            info["initial_balance"] = ""
-
-        info["closing_balance"] = closing_balance if 'closing_balance' in locals() else ""
-
-        # Extract transactions from all pages
-        for page in pdf.pages:
-            text = page.extract_text()
-            lines = text.split('\n')
-
-            
-            header_index = None
-            for i, line in enumerate(lines):
-                if 'Datums Dok. Maksātājs/Saņēmējs Maksājuma mērķis Summa' in line:
-                    header_index = i
-                    break
-
-            if header_index is not None:
-                for line in lines[header_index + 1:]:  # Skip header line
-                    match = re.match(r'(\d{2}\.\d{2}\.\d{4})\s+(.*?)\s+(-?\d+,\d+)', line)
-                    
-                    if match:
-                        date = match.group(1)
-                        amount = match.group(3).replace('.', ',')  
-                        
-                        amount_display = amount.lstrip('-') 
-                        rest_of_line = line[len(date):line.rfind(amount)].strip()
-                        split_index = find_split_index(rest_of_line)
-                        beneficiary = rest_of_line[:split_index].strip()
-                        details = rest_of_line[split_index:].strip()
-                        cdt_dbt_ind = 'CRDT' if not amount.startswith('-') else 'DBIT'
-                        
-                        transaction = {
-                            "transaction_id": f"{transaction_id:03}",
-                            "date": date,
-                            "beneficiary": beneficiary,
-                            "details": details,
-                            "amount": amount_display,  
-                            "balance": "",
-                            "cdt_dbt_ind": cdt_dbt_ind
-                        }
-                        transactions.append(transaction)
-                        transaction_id += 1
-
-    
-    return {
-        "statement_period": info.get("statement_period", ""),
-        "account_number": info.get("account_number", ""),
-        "account_holder": info.get("account_holder", ""),
-        "initial_balance": info.get("initial_balance", ""),
-        "closing_balance": info.get("closing_balance", ""),
-        "bank_name": info.get("bank_name", ""),
-        "bank_bic": info.get("bank_bic", ""),
-        "bank_reg_no": info.get("bank_reg_no", ""),
-        "bank_address": info.get("bank_address", ""),
-        "transactions": transactions
-    }
+from common_script import traced
+from layout_engine import compile_layout, parse_statement
 
+# -------------------- FUNCTION FOR SPLITTING BENEFICIARY AND DETAILS --------------------
 def find_split_index(text):
     
     words = text.split()
@@ -130,9 +21,67 @@ def find_split_index(text):
    
     return len(text) // 2
 
+
+def split_beneficiary_and_details(row, line, match):
+    # The text between the date and the last occurrence of the amount holds
+    # both the counterparty and the payment purpose.
+    rest_of_line = line[len(match.group(1)):line.rfind(match.group(3))].strip()
+    split_index = find_split_index(rest_of_line)
+    row["beneficiary"] = rest_of_line[:split_index].strip()
+    row["details"] = rest_of_line[split_index:].strip()
+# -------------------- FUNCTION FOR SPLITTING BENEFICIARY AND DETAILS --------------------
+
+# -------------------- STATEMENT LAYOUT --------------------
+LAYOUT = compile_layout({
+    "bic": "UNLALV2X",
+    "marker": "Norēķinu konts EUR",
+    "marker_scope": "first_page",
+    "pdfminer_text": True,
+    "header": [
+        {"name": "statement_period", "pattern": r"(\d{2}\.\d{2}\.\d{4}).*?(\d{2}\.\d{2}\.\d{4})", "flags": re.S,
+         "format": "{0} - {1}"},
+        {"name": "account_holder", "pattern": r"(.*?)Norēķinu konts EUR", "transforms": ["strip"]},
+        {"name": "account_number", "pattern": r"Norēķinu konts EUR\s+(LV\d+.*)", "transforms": ["strip"]},
+        {"name": "statement_period",
+         "pattern": r"Pārskats par periodu\s+(\d{2}\.\d{2}\.\d{4})\s+-\s+(\d{2}\.\d{2}\.\d{4})",
+         "format": "{0} - {1}"},
+        {"name": "closing_balance", "pattern": r"Beigu atlikums\s+(-?\d+,\d+)"},
+        {"name": "initial_balance", "when": "closing_balance", "line_contains": "Beigu atlikums", "offset": -1,
+         "pattern": r"(-?\d+,\d+)"},
+    ],
+    "rows": {
+        "start_after": "Datums Dok. Maksātājs/Saņēmējs Maksājuma mērķis Summa",
+        "pattern": r"(\d{2}\.\d{2}\.\d{4})\s+(.*?)\s+(-?\d+,\d+)",
+        "fields": {
+            "transaction_id": (("sequence", "{:03}"), []),
+            "date": (("group", 1), []),
+            "beneficiary": (("literal", ""), []),
+            "details": (("literal", ""), []),
+            "amount": (("group", 3), [("lstrip", "-")]),
+            "balance": (("literal", ""), []),
+            "cdt_dbt_ind": (("group", 3), []),
+        },
+        "sign": {"source": ("group", 3), "debit_if": ("startswith", "-")},
+        "refine": split_beneficiary_and_details,
+    },
+    "constants": {
+        "bank_name": "AS SEB Banka",
+        "bank_bic": "UNLALV2X",
+        "bank_reg_no": "40003816496.",
+        "bank_address": "Gustava Zemgala gatve 73",
+    },
+    "output": ["statement_period", "account_number", "account_holder", "initial_balance", "closing_balance",
+               "bank_name", "bank_bic", "bank_reg_no", "bank_address", "transactions"],
+})
+# -------------------- STATEMENT LAYOUT --------------------
+
+# -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
+@traced("UNLALV2X.parse")
+def extract_info_from_pdf(pdf_path):
+    return parse_statement(LAYOUT, pdf_path)
 # -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
 
 # Automatically trigger processing when this script is run directly
 if __name__ == "__main__":
-    from common_script import process_files
-    process_files(extract_info_from_pdf)
+    from common_script import main
+    main(extract_info_from_pdf)
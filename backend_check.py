@@ -0,0 +1,122 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import common_script
+import dispatcher
+from common_script import open_document
+from synthetic_statements import generate_statements
+
+# -------------------- TEXT BACKEND CHECK --------------------
+# Runs every statement through its bank parser twice, once with pdfplumber's
+# extract_text and once with the pdfminer text backend, and compares the
+# parsed output field by field. By default it checks the real statements in
+# PDFs_Pending; synthetic statements (--synthetic) only draw each line as one
+# plain string, so they cannot show differences that come from real fonts,
+# kerning or text operators. A bank should only be switched to the pdfminer
+# backend in production when this reports no differences for its real
+# statements.
+PDFMINER_TEXT_BANKS = ["HELSFIHH", "ITELFIHH", "OKOYFIHH", "RABONL2U", "UNLALV2X"]
+
+
+def parse(extract, pdf_path, pdfminer_text):
+    # The backend is chosen for this one parse; the caller's setting is
+    # restored afterwards, however the parse ends.
+    previous = common_script.PDFMINER_TEXT
+    common_script.PDFMINER_TEXT = {"*"} if pdfminer_text else None
+    try:
+        start = time.perf_counter()
+        data = extract(pdf_path)
+        return data, time.perf_counter() - start
+    finally:
+        common_script.PDFMINER_TEXT = previous
+
+
+def first_difference(expected, actual):
+    if not isinstance(expected, dict) or not isinstance(actual, dict):
+        return f"{expected!r:.60} != {actual!r:.60}"
+    for key in expected.keys() | actual.keys():
+        if key == "transactions":
+            continue
+        if expected.get(key) != actual.get(key):
+            return f"{key}: {expected.get(key)!r:.60} != {actual.get(key)!r:.60}"
+
+    expected_transactions = expected.get("transactions") or []
+    actual_transactions = actual.get("transactions") or []
+    if len(expected_transactions) != len(actual_transactions):
+        return f"{len(expected_transactions)} transactions != {len(actual_transactions)}"
+    for i, (expected_row, actual_row) in enumerate(zip(expected_transactions, actual_transactions)):
+        for key in expected_row.keys() | actual_row.keys():
+            if expected_row.get(key) != actual_row.get(key):
+                return f"transaction {i + 1} {key}: {expected_row.get(key)!r:.60} != {actual_row.get(key)!r:.60}"
+    return None
+
+
+def check_files(pdf_files, banks):
+    results = {}
+    for pdf_path in pdf_files:
+        with open_document(pdf_path) as doc:
+            bank_bic = dispatcher.classify_document(doc)
+        if bank_bic not in banks:
+            continue
+
+        extract = dispatcher.EXTRACT_FUNCTIONS[bank_bic]
+        expected, pdfplumber_seconds = parse(extract, pdf_path, False)
+        actual, pdfminer_seconds = parse(extract, pdf_path, True)
+
+        result = results.setdefault(bank_bic, {"files": 0, "different": 0, "pdfplumber": 0.0, "pdfminer": 0.0})
+        result["files"] += 1
+        result["pdfplumber"] += pdfplumber_seconds
+        result["pdfminer"] += pdfminer_seconds
+        difference = first_difference(expected, actual)
+        if difference is not None:
+            result["different"] += 1
+            print(f"DIFFERENT {os.path.basename(pdf_path)} ({bank_bic}): {difference}")
+    return results
+
+
+def print_report(results, banks):
+    print(f"{'bank':<10}{'files':>7}{'different':>11}{'pdfplumber s':>14}{'pdfminer s':>12}")
+    for bank_bic, r in sorted(results.items()):
+        print(f"{bank_bic:<10}{r['files']:>7}{r['different']:>11}{r['pdfplumber']:>14.2f}{r['pdfminer']:>12.2f}")
+    for bank_bic in sorted(set(banks) - set(results)):
+        print(f"{bank_bic:<10} no statements checked")
+# -------------------- TEXT BACKEND CHECK --------------------
+
+# Check the statements in PDFs_Pending: python backend_check.py
+# or other real ones: python backend_check.py archive/*.pdf
+# or synthetic ones: python backend_check.py --synthetic --count 5 --pages 4
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare parser output of the pdfplumber and pdfminer text backends.")
+    parser.add_argument("pdf_files", nargs="*", help="statements to check (default: the PDFs in PDFs_Pending)")
+    parser.add_argument("--banks", nargs="+", choices=PDFMINER_TEXT_BANKS, default=PDFMINER_TEXT_BANKS)
+    parser.add_argument("--synthetic", action="store_true",
+                        help="generate synthetic statements instead (plain text only, not a substitute for real ones)")
+    parser.add_argument("--count", type=int, default=3, help="synthetic statements per bank")
+    parser.add_argument("--pages", type=int, default=2, help="minimum pages per synthetic statement")
+    parser.add_argument("--transactions", type=int, default=60, help="transactions per synthetic statement")
+    args = parser.parse_args()
+
+    work_folder = None
+    pdf_files = args.pdf_files
+    if args.synthetic:
+        work_folder = tempfile.mkdtemp(prefix="bank_parsers_backend_check_")
+        pdf_files = pdf_files + [path for path, _ in generate_statements(work_folder, args.banks, args.count,
+                                                                         args.pages, args.transactions)]
+    elif not pdf_files:
+        pending_folder = common_script.processing_folders()["pending"]
+        if os.path.isdir(pending_folder):
+            pdf_files = sorted(os.path.join(pending_folder, f) for f in os.listdir(pending_folder)
+                               if f.endswith(".pdf"))
+        if not pdf_files:
+            parser.error(f"no PDFs in {pending_folder}; pass statements to check or use --synthetic")
+    try:
+        results = check_files(pdf_files, set(args.banks))
+        print_report(results, args.banks)
+    finally:
+        if work_folder is not None:
+            shutil.rmtree(work_folder, ignore_errors=True)
+    sys.exit(1 if any(r["different"] for r in results.values()) else 0)
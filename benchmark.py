@@ -0,0 +1,103 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from synthetic_statements import BANKS, generate_statements
+
+# -------------------- END-TO-END THROUGHPUT BENCHMARK --------------------
+# Generates synthetic statements per bank (synthetic_statements.py) and runs
+# them through the real path: extract function -> create_xml -> create_json.
+# Each bank runs in a fresh spawned process, so its peak RSS is measured on
+# its own and is not inflated by earlier banks or by the generator.
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_bank(bank_bic, pdf_files, output_folder, via_dispatcher, results):
+    import dispatcher
+    from common_script import create_json, create_xml
+
+    extract = dispatcher.extract_pdf_data if via_dispatcher else dispatcher.EXTRACT_FUNCTIONS[bank_bic]
+
+    statements = 0
+    transactions = 0
+    start = time.perf_counter()
+    for pdf_path in pdf_files:
+        data = extract(pdf_path)
+        if not data:
+            continue
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        create_xml(data, os.path.join(output_folder, name + ".xml"))
+        create_json(data, os.path.join(output_folder, name + ".json"))
+        statements += 1
+        transactions += len(data.get("transactions") or [])
+    elapsed = time.perf_counter() - start
+
+    results.put({
+        "bank": bank_bic,
+        "seconds": elapsed,
+        "parsed_statements": statements,
+        "parsed_transactions": transactions,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+
+def benchmark_bank(bank_bic, work_folder, count, pages, transactions, via_dispatcher):
+    pdf_folder = os.path.join(work_folder, bank_bic, "pdf")
+    output_folder = os.path.join(work_folder, bank_bic, "out")
+    os.makedirs(output_folder, exist_ok=True)
+    generated = generate_statements(pdf_folder, [bank_bic], count, pages, transactions)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_bank, args=(bank_bic, [path for path, _ in generated], output_folder,
+                                                      via_dispatcher, results))
+    process.start()
+    result = results.get()
+    process.join()
+
+    result["statements"] = len(generated)
+    result["pages"] = sum(statement["pages"] for _, statement in generated)
+    result["transactions"] = sum(len(statement["transactions"]) for _, statement in generated)
+    result["pages_per_sec"] = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+    result["statements_per_sec"] = result["statements"] / result["seconds"] if result["seconds"] else 0.0
+    return result
+
+
+def print_report(results):
+    print(f"{'bank':<10}{'stmts':>7}{'pages':>7}{'txs':>8}{'parsed':>8}{'seconds':>10}"
+          f"{'pages/s':>10}{'stmts/s':>10}{'peak RSS MB':>13}")
+    for r in results:
+        print(f"{r['bank']:<10}{r['statements']:>7}{r['pages']:>7}{r['transactions']:>8}"
+              f"{r['parsed_transactions']:>8}{r['seconds']:>10.2f}{r['pages_per_sec']:>10.1f}"
+              f"{r['statements_per_sec']:>10.2f}{r['peak_rss_mb']:>13.1f}")
+# -------------------- END-TO-END THROUGHPUT BENCHMARK --------------------
+
+# Example: python benchmark.py --banks HABALV22 PARXLV22 --count 20 --pages 5 --transactions 150
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure parser throughput on synthetic statements.")
+    parser.add_argument("--banks", nargs="+", choices=BANKS, default=BANKS)
+    parser.add_argument("--count", type=int, default=10, help="statements per bank")
+    parser.add_argument("--pages", type=int, default=2, help="minimum pages per statement")
+    parser.add_argument("--transactions", type=int, default=60, help="transactions per statement")
+    parser.add_argument("--via-dispatcher", action="store_true",
+                        help="go through dispatcher.extract_pdf_data instead of the bank's own function")
+    parser.add_argument("--work-folder", default=None, help="keep generated PDFs and outputs here")
+    args = parser.parse_args()
+
+    work_folder = args.work_folder or tempfile.mkdtemp(prefix="bank_parsers_bench_")
+    try:
+        results = [benchmark_bank(bank_bic, work_folder, args.count, args.pages, args.transactions,
+                                  args.via_dispatcher)
+                   for bank_bic in args.banks]
+        print_report(results)
+    finally:
+        if args.work_folder is None:
+            shutil.rmtree(work_folder, ignore_errors=True)
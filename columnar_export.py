@@ -0,0 +1,151 @@
+import os
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for --columnar-export
+    pa = None
+    pq = None
+
+from normalize import parse_amount, statement_dates, transaction_date
+
+# -------------------- COLUMNAR TRANSACTION EXPORT --------------------
+# Appends the transactions of every parsed statement to Parquet (or Arrow IPC)
+# files with typed columns, so analytics can scan them vectorized instead of
+# walking per-statement JSON files. Each statement's rows are tagged with the
+# IBAN, BIC, statement period and source PDF.
+#
+# Files are partitioned Hive-style by bank (<folder>/bank_bic=<BIC>/) and every
+# run writes one new file per bank ("part-<run id>.parquet"), so runs never
+# rewrite each other's data. Rows are buffered per bank and written as one row
+# group every ROWS_PER_GROUP rows; a file is written as ".part" and renamed when
+# the sink is closed, so readers never see a file without its footer.
+#
+# Banks print dates and amounts in their own formats (01.02.2024, 2024-02-01,
+# 01/02 without a year, 1.234,56, 17,148.34, +16240,66 ...); normalize.py
+# parses them into date32 and decimal128(18, 2). Values that do not parse
+# become null.
+ROWS_PER_GROUP = 50000
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+INDICATORS = ["CRDT", "DBIT"]
+
+COLUMNS = ["source_file", "iban", "bank_bic", "statement_period", "statement_from", "statement_to",
+           "transaction_id", "date", "beneficiary", "details", "amount", "signed_amount", "cdt_dbt_ind",
+           "balance"]
+
+
+def transaction_schema():
+    return pa.schema([
+        ("source_file", pa.string()),
+        ("iban", pa.string()),
+        ("bank_bic", pa.dictionary(pa.int8(), pa.string())),
+        ("statement_period", pa.string()),
+        ("statement_from", pa.date32()),
+        ("statement_to", pa.date32()),
+        ("transaction_id", pa.string()),
+        ("date", pa.date32()),
+        ("beneficiary", pa.string()),
+        ("details", pa.string()),
+        ("amount", pa.decimal128(18, 2)),
+        ("signed_amount", pa.decimal128(18, 2)),
+        ("cdt_dbt_ind", pa.dictionary(pa.int8(), pa.string())),
+        ("balance", pa.decimal128(18, 2)),
+    ])
+
+
+class ColumnarSink:
+    def __init__(self, folder, file_format="parquet", rows_per_group=None):
+        if pa is None:
+            raise ImportError("columnar export needs pyarrow (pip install pyarrow)")
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown columnar format: {file_format}")
+        self.folder = folder
+        self.file_format = file_format
+        self.rows_per_group = rows_per_group or ROWS_PER_GROUP
+        self.schema = transaction_schema()
+        self.run_id = None
+        self.buffers = {}
+        self.writers = {}
+
+    def add(self, data, pdf_file=None):
+        transactions = data.get("transactions") or []
+        if not transactions:
+            return
+
+        bank_bic = data.get("bank_bic") or "UNKNOWN"
+        statement_period = data.get("statement_period") or ""
+        statement_from, statement_to = statement_dates(statement_period)
+        iban = data.get("account_number") or data.get("iban") or ""
+
+        columns = self.buffers.setdefault(bank_bic, {name: [] for name in COLUMNS})
+        for transaction in transactions:
+            amount = parse_amount(transaction.get("amount"))
+            indicator = (transaction.get("cdt_dbt_ind") or "").upper()
+            if amount is not None:
+                amount = abs(amount)
+            columns["source_file"].append(pdf_file)
+            columns["iban"].append(iban)
+            columns["bank_bic"].append(bank_bic)
+            columns["statement_period"].append(statement_period)
+            columns["statement_from"].append(statement_from)
+            columns["statement_to"].append(statement_to)
+            columns["transaction_id"].append(transaction.get("transaction_id"))
+            columns["date"].append(transaction_date(transaction.get("date"), statement_from, statement_to))
+            columns["beneficiary"].append(transaction.get("beneficiary"))
+            columns["details"].append(transaction.get("details"))
+            columns["amount"].append(amount)
+            columns["signed_amount"].append(None if amount is None else (amount if indicator == "CRDT" else -amount))
+            columns["cdt_dbt_ind"].append(indicator if indicator in INDICATORS else None)
+            columns["balance"].append(parse_amount(transaction.get("balance")))
+
+        if len(columns["transaction_id"]) >= self.rows_per_group:
+            self._flush(bank_bic)
+
+    def _table(self, bank_bic, columns):
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if field.name == "bank_bic":
+                # One bank per partition, so the dictionary is fixed per file
+                array = pa.DictionaryArray.from_arrays(pa.array([0] * len(values), pa.int8()),
+                                                       pa.array([bank_bic], pa.string()))
+            elif field.name == "cdt_dbt_ind":
+                indices = [None if value is None else INDICATORS.index(value) for value in values]
+                array = pa.DictionaryArray.from_arrays(pa.array(indices, pa.int8()),
+                                                       pa.array(INDICATORS, pa.string()))
+            else:
+                array = pa.array(values, field.type)
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _writer(self, bank_bic):
+        if bank_bic not in self.writers:
+            if self.run_id is None:
+                self.run_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+            partition = os.path.join(self.folder, f"bank_bic={bank_bic}")
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, f"part-{self.run_id}{FORMATS[self.file_format]}")
+            if self.file_format == "parquet":
+                writer = pq.ParquetWriter(path + ".part", self.schema, compression="zstd")
+            else:
+                writer = pa.ipc.new_file(path + ".part", self.schema)
+            self.writers[bank_bic] = (path, writer)
+        return self.writers[bank_bic][1]
+
+    def _flush(self, bank_bic):
+        columns = self.buffers.pop(bank_bic, None)
+        if not columns or not columns["transaction_id"]:
+            return
+        self._writer(bank_bic).write_table(self._table(bank_bic, columns))
+
+    def close(self):
+        for bank_bic in list(self.buffers):
+            self._flush(bank_bic)
+        for path, writer in self.writers.values():
+            writer.close()
+            os.replace(path + ".part", path)
+        self.writers.clear()
+        self.run_id = None
+# -------------------- COLUMNAR TRANSACTION EXPORT --------------------
@@ -1,146 +1,1000 @@
+import argparse
+import asyncio
+import hashlib
+import inspect
+import io
 import os
+import re
 import shutil
 import json
+import multiprocessing
+import signal
+import sys
+import threading
+import time
 import xml.etree.ElementTree as ET
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from xml.etree.ElementTree import Element, SubElement, ElementTree
-
-# -------------------- FUNCTION FOR INDENTATION --------------------
-def indent(elem, level=0):
-    i = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for subelem in elem:
-            indent(subelem, level + 1)
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-# -------------------- FUNCTION FOR INDENTATION --------------------
+from functools import partial
+from multiprocessing.connection import wait
 
-# -------------------- FUNCTION FOR CREATING XML --------------------
-def create_xml(data, xml_path):
-    try:
-        if "statement_period" in data and data["statement_period"]:
-            try:
-                from_datetime = data["statement_period"].split(" - ")[0]
-                to_datetime = data["statement_period"].split(" - ")[1]
-            except (ValueError, IndexError):
-                from_datetime = ""
-                to_datetime = ""
+import pdfplumber
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LAParams, LTContainer, LTTextLineHorizontal
+from pdfminer.pdfinterp import PDFPageInterpreter
+from pdfplumber.utils import cluster_objects
+
+from extraction_cache import MISSING, ExtractionCache, file_hash
+from columnar_export import FORMATS as COLUMNAR_FORMATS, ColumnarSink
+from folder_watch import create_watcher
+from ledger import LedgerSink
+from metrics import PAGES_MEASUREMENT, PipelineMetrics
+from normalize import (MISSING_MINOR, MISSING_ORDINAL, amount_minor, amounts_minor, date_ordinals, signed_minor,
+                       statement_dates, transaction_date)
+from quarantine import ExtractionFailure, Quarantine, failure_from_probe
+from tracing import (add_events, enable_failure_probes, enable_measurements, enable_tracing, failure_probes_enabled,
+                     measure, measurements_enabled, span, start_probe, stop_probe, take_events, take_measurements,
+                     traced, tracing_enabled, write_trace)
+
+# -------------------- STATEMENT DOCUMENT --------------------
+# One open pdfplumber handle per statement, shared by every stage (detection,
+# header parsing, transaction parsing). Page objects live in pdf.pages, so the
+# layout of each page is parsed only once no matter how many stages read it.
+# Entering the document again (e.g. a bank module receiving a document that a
+# caller already opened) only bumps a counter; the file is closed when the
+# outermost "with" block exits.
+#
+# extract_text / extract_words / extract_tables results are memoized per page
+# and per settings, so a marker check followed by the real parse pays for each
+# extraction once. Memory stays bounded on long statements: at most
+# MAX_CACHED_RESULTS results are kept (least recently used are dropped) and only
+# MAX_WARM_PAGES pages keep their parsed layout (chars, lines, rects) alive.
+# In bounded memory mode (see enable_bounded_memory) only the page being read
+# keeps its layout and only a few results are memoized, so a statement is
+# processed strictly one page at a time; iter_page_texts() hands pages to a
+# parser lazily, so it can carry its state across pages instead of joining
+# the whole document into one string first.
+#
+# When a persistent ExtractionCache is enabled (see enable_extraction_cache),
+# results are also looked up on disk by PDF content hash before pdfplumber is
+# touched; a fully cached statement is parsed without opening the PDF at all.
+#
+# With region of interest enabled (see enable_region_of_interest) a bank can ask
+# for region_page_texts(): the transaction table's box is learned from the
+# first pages and every later page is read as cropped words inside that box, so
+# repeated page headers and column headers never reach the line parser.
+#
+# Likewise, with learned columns enabled (see enable_learned_columns) a table
+# bank can ask for column_page_tables(): the column boundaries of its
+# transaction table are found once on the first page, and later pages are read
+# by binning words into the cells formed by those boundaries and the page's
+# ruling lines, instead of running pdfplumber's table finder on every page.
+#
+# A bank that only reads plain text can switch its document to the pdfminer
+# text backend (see enable_pdfminer_text and use_pdfminer_text): page_text()
+# then runs pdfminer's layout engine on the page directly and joins its text
+# lines the way extract_text does, without pdfplumber building char, line and
+# rect objects for the page first. The backend is opt-in: its equivalence has
+# only been shown on synthetic statements, whose text is drawn as one simple
+# string per line, not on the fonts, kerning and text operators of real bank
+# PDFs. backend_check.py compares the parser output of both backends on the
+# statements in PDFs_Pending; run it on a bank's real statements before
+# enabling the backend for it.
+MAX_CACHED_RESULTS = 2048
+MAX_WARM_PAGES = 8
+BOUNDED_CACHED_RESULTS = 16
+BOUNDED_WARM_PAGES = 1
+LINE_TOLERANCE = 3
+REGION_PADDING = 2
+EDGE_TOLERANCE = 3
+# boxes_flow=None skips pdfminer's text box ordering, the expensive part of its
+# layout analysis; lines are ordered here instead, top to bottom, left to right.
+PDFMINER_LAPARAMS = {"char_margin": 2.0, "line_margin": 0.5, "word_margin": 0.1, "boxes_flow": None,
+                     "all_texts": True}
+
+EXTRACTION_STATS = {"hits": 0, "disk_hits": 0, "misses": 0}
+EXTRACTION_CACHE = None
+REGION_OF_INTEREST = None
+LEARNED_COLUMNS = None
+PDFMINER_TEXT = None
+BOUNDED_MEMORY = False
+TIERED_EXTRACTION = None
+
+
+def _extract_text(page, settings):
+    return page.extract_text(**settings)
+
+
+def _extract_words(page, settings):
+    return page.extract_words(**settings)
+
+
+def _extract_tables(page, settings):
+    return page.extract_tables(settings or None)
+
+
+def word_lines(words, tolerance=LINE_TOLERANCE):
+    # Groups words into lines the way extract_text does (by "top", within
+    # tolerance), so joined lines read exactly like extract_text output.
+    return cluster_objects(words, "top", tolerance)
+
+
+def words_to_text(words):
+    return "\n".join(" ".join(word["text"] for word in line) for line in word_lines(words))
+
+
+def _extract_region_text(page, settings):
+    # settings: the learned left edge and top, clamped to the page so a
+    # smaller page cannot make crop() fail. Right and bottom are the page's
+    # own: amounts are right-aligned and later pages hold more rows.
+    x0, top, x1, bottom = page.bbox
+    bbox = (max(x0, settings["x0"]), max(top, settings["top"]), x1, bottom)
+    if bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+        return ""
+    return words_to_text(page.crop(bbox).extract_words())
+
+
+def _extract_table_columns(page, settings):
+    # x boundaries of the first ruled table containing one of the markers
+    for table in page.find_tables():
+        rows = table.extract()
+        if any(cell and marker in cell for row in rows for cell in row for marker in settings["markers"]):
+            return sorted({round(x, 2) for cell in table.cells for x in (cell[0], cell[2])})
+    return None
+
+
+def _edge_spans(edges, x):
+    return [(edge["top"], edge["bottom"]) for edge in edges if abs(edge["x0"] - x) <= EDGE_TOLERANCE]
+
+
+def _row_positions(edges, left, right, top, bottom):
+    positions = []
+    for edge in sorted(edges, key=lambda edge: edge["top"]):
+        if edge["x0"] > left + EDGE_TOLERANCE or edge["x1"] < right - EDGE_TOLERANCE:
+            continue
+        if not top - EDGE_TOLERANCE <= edge["top"] <= bottom + EDGE_TOLERANCE:
+            continue
+        if not positions or edge["top"] - positions[-1] > EDGE_TOLERANCE:
+            positions.append(edge["top"])
+    return positions
+
+
+def _extract_column_tables(page, settings):
+    # The table's extent and rows come from the ruling lines at the learned
+    # column boundaries; words are binned into cells by their centre. A column
+    # boundary without a ruling at a row's height merges the cells around it,
+    # which gives spanning rows the [text, None, ...] shape extract_tables
+    # gives them. None means no ruled table at the learned boundaries.
+    columns = settings["columns"]
+    left, right = columns[0], columns[-1]
+    vertical_edges = page.vertical_edges
+    spans = _edge_spans(vertical_edges, left)
+    if not spans:
+        return None
+    top = min(span_top for span_top, _ in spans)
+    bottom = max(span_bottom for _, span_bottom in spans)
+    rows = _row_positions(page.horizontal_edges, left, right, top, bottom)
+    if len(rows) < 2:
+        return None
+    boundaries = [_edge_spans(vertical_edges, x) for x in columns[1:-1]]
+
+    x0, y0, x1, y1 = page.bbox
+    words = page.crop((max(x0, left), max(y0, top), min(x1, right), min(y1, bottom))).extract_words()
+    table = []
+    for row_top, row_bottom in zip(rows, rows[1:]):
+        middle = (row_top + row_bottom) / 2
+        row_words = [word for word in words if row_top <= (word["top"] + word["bottom"]) / 2 < row_bottom]
+
+        cells = [[0, left]]
+        for i, edge_spans in enumerate(boundaries, 1):
+            if any(span_top <= middle <= span_bottom for span_top, span_bottom in edge_spans):
+                cells[-1].append(columns[i])
+                cells.append([i, columns[i]])
+        cells[-1].append(right)
+
+        row = [None] * (len(columns) - 1)
+        for index, cell_left, cell_right in cells:
+            row[index] = words_to_text([word for word in row_words
+                                        if cell_left <= (word["x0"] + word["x1"]) / 2 < cell_right])
+        table.append(row)
+    return [table]
+
+
+def _text_lines(container):
+    for obj in container:
+        if isinstance(obj, LTTextLineHorizontal):
+            yield obj
+        elif isinstance(obj, LTContainer):
+            yield from _text_lines(obj)
+
+
+def _extract_pdfminer_text(page, settings):
+    # Runs on the pdfminer page behind the pdfplumber page, so page.chars and
+    # the other pdfplumber objects are never built for it. Lines whose tops
+    # are within LINE_TOLERANCE form one text line, as in extract_text.
+    resource_manager = page.pdf.rsrcmgr
+    device = PDFPageAggregator(resource_manager, laparams=LAParams(**PDFMINER_LAPARAMS))
+    PDFPageInterpreter(resource_manager, device).process_page(page.page_obj)
+
+    rows = []
+    last_top = None
+    for line in sorted(_text_lines(device.get_result()), key=lambda line: (-line.y1, line.x0)):
+        if rows and last_top - line.y1 <= LINE_TOLERANCE:
+            rows[-1].append(line)
+        else:
+            rows.append([line])
+        last_top = line.y1
+    return "\n".join(" ".join(line.get_text().rstrip("\n") for line in sorted(row, key=lambda line: line.x0))
+                     for row in rows)
+
+
+PAGE_EXTRACTORS = {
+    "text": _extract_text,
+    "pdfminer_text": _extract_pdfminer_text,
+    "words": _extract_words,
+    "tables": _extract_tables,
+    "region_text": _extract_region_text,
+    "table_columns": _extract_table_columns,
+    "column_tables": _extract_column_tables,
+}
+
+
+def _settings_key(settings):
+    return json.dumps(settings, sort_keys=True, default=str)
+
+
+def _cache_settings_key(settings_key):
+    # The pdfplumber version is part of the key: a different version may
+    # produce different text or word boxes for the same settings.
+    return f"pdfplumber={pdfplumber.__version__};{settings_key}"
+
+
+def enable_extraction_cache(path=None, max_bytes=None):
+    global EXTRACTION_CACHE
+    EXTRACTION_CACHE = ExtractionCache(path, max_bytes)
+    return EXTRACTION_CACHE
+
+
+def enable_region_of_interest(banks=None):
+    # banks: BICs to read through their transaction region; empty for all
+    global REGION_OF_INTEREST
+    REGION_OF_INTEREST = set(banks) if banks else {"*"}
+
+
+def region_of_interest_enabled(bank_bic):
+    return REGION_OF_INTEREST is not None and ("*" in REGION_OF_INTEREST or bank_bic in REGION_OF_INTEREST)
+
+
+def enable_learned_columns(banks=None):
+    # banks: BICs to read through their learned table columns; empty for all
+    global LEARNED_COLUMNS
+    LEARNED_COLUMNS = set(banks) if banks else {"*"}
+
+
+def learned_columns_enabled(bank_bic):
+    return LEARNED_COLUMNS is not None and ("*" in LEARNED_COLUMNS or bank_bic in LEARNED_COLUMNS)
+
+
+def enable_pdfminer_text(banks=None):
+    # banks: BICs whose text is read with the pdfminer backend; empty for all
+    global PDFMINER_TEXT
+    PDFMINER_TEXT = set(banks) if banks else {"*"}
+
+
+def pdfminer_text_enabled(bank_bic):
+    return PDFMINER_TEXT is not None and ("*" in PDFMINER_TEXT or bank_bic in PDFMINER_TEXT)
+
+
+def enable_bounded_memory():
+    global BOUNDED_MEMORY
+    BOUNDED_MEMORY = True
+
+
+def enable_tiered_extraction(banks=None):
+    # banks: BICs that try the word tier before their table path; empty for all
+    global TIERED_EXTRACTION
+    TIERED_EXTRACTION = set(banks) if banks else {"*"}
+
+
+def tiered_extraction_enabled(bank_bic):
+    return TIERED_EXTRACTION is not None and ("*" in TIERED_EXTRACTION or bank_bic in TIERED_EXTRACTION)
+
+
+def extraction_stats():
+    return dict(EXTRACTION_STATS)
+
+
+def reset_extraction_stats():
+    for name in EXTRACTION_STATS:
+        EXTRACTION_STATS[name] = 0
+
+
+class StatementDocument:
+    def __init__(self, pdf_path, max_cached_results=None, max_warm_pages=None):
+        self.pdf_path = pdf_path
+        self.pdf = None
+        self.max_cached_results = max_cached_results or (BOUNDED_CACHED_RESULTS if BOUNDED_MEMORY
+                                                         else MAX_CACHED_RESULTS)
+        self.max_warm_pages = max_warm_pages or (BOUNDED_WARM_PAGES if BOUNDED_MEMORY else MAX_WARM_PAGES)
+        self.cache = EXTRACTION_CACHE
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+        self.text_backend = "pdfplumber"
+        self._depth = 0
+        self._doc_hash = None
+        self._page_count = None
+        self._results = OrderedDict()
+        self._warm_pages = OrderedDict()
+
+    def __enter__(self):
+        if self.cache is not None:
+            self.doc_hash  # reads the file, so a missing file fails here as before
+        elif self.pdf is None:
+            self._open()
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth <= 0:
+            if self._page_count is not None:
+                measure(PAGES_MEASUREMENT, self._page_count)
+            self.close()
+        return False
+
+    def close(self):
+        if self.pdf is not None:
+            self.pdf.close()
+            self.pdf = None
+        self._results.clear()
+        self._warm_pages.clear()
+        self._depth = 0
+
+    def _open(self):
+        if self.pdf is None:
+            with span("pdfplumber.open", file=os.path.basename(str(self.pdf_path))):
+                self.pdf = pdfplumber.open(self.pdf_path)
+        return self.pdf
+
+    @property
+    def doc_hash(self):
+        if self._doc_hash is None:
+            self._doc_hash = file_hash(self.pdf_path)
+        return self._doc_hash
+
+    @property
+    def pages(self):
+        return self._open().pages
+
+    @property
+    def page_count(self):
+        if self._page_count is None and self.cache is not None:
+            self._page_count = self.cache.page_count(self.doc_hash)
+        if self._page_count is None:
+            self._page_count = len(self.pages)
+            if self.cache is not None:
+                self.cache.set_page_count(self.doc_hash, self._page_count)
+        return self._page_count
+
+    def use_pdfminer_text(self, bank_bic):
+        # Called by a bank that only needs plain text; takes effect when the
+        # pdfminer backend is enabled for that bank.
+        if pdfminer_text_enabled(bank_bic):
+            self.text_backend = "pdfminer"
+
+    def page_text(self, index, **settings):
+        if self.text_backend == "pdfminer" and not settings:
+            return self._extract("pdfminer_text", index, settings)
+        return self._extract("text", index, settings)
+
+    def page_words(self, index, **settings):
+        return self._extract("words", index, settings)
+
+    def page_tables(self, index, table_settings=None):
+        return self._extract("tables", index, table_settings or {})
+
+    def page_table_columns(self, index, markers):
+        return self._extract("table_columns", index, {"markers": list(markers)})
+
+    def page_texts(self, **settings):
+        return list(self.iter_page_texts(**settings))
+
+    def iter_page_texts(self, **settings):
+        for i in range(self.page_count):
+            yield self.page_text(i, **settings)
+
+    def region_page_texts(self, region):
+        return list(self.iter_region_page_texts(region))
+
+    def iter_region_page_texts(self, region):
+        # Like iter_page_texts(), but pages after the first are read inside
+        # the bank's transaction region. Falls back to iter_page_texts() when
+        # region of interest is off for the bank or the region cannot be
+        # learned.
+        box = None
+        if region_of_interest_enabled(region.bank_bic) and self.page_count > 1:
+            box = region.learn(self)
+        if box is None:
+            yield from self.iter_page_texts()
+            return
+        yield self.page_text(0)
+        for i in range(1, self.page_count):
+            yield self._extract("region_text", i, box)
+
+    def column_page_tables(self, columns):
+        return list(self.iter_column_page_tables(columns))
+
+    def iter_column_page_tables(self, columns):
+        # Tables of every page, like page_tables() per page, with pages after
+        # the first read through the bank's learned table columns. A page
+        # without rulings at those columns falls back to page_tables().
+        yield self.page_tables(0)
+        settings = None
+        if learned_columns_enabled(columns.bank_bic) and self.page_count > 1:
+            settings = columns.learn(self)
+        for i in range(1, self.page_count):
+            page_tables = self._extract("column_tables", i, settings) if settings else None
+            yield self.page_tables(i) if page_tables is None else page_tables
+
+    def iter_word_page_tables(self, columns):
+        # Tables of every page in the shape of page_tables(), built from the
+        # page words alone with the bank's WordColumns. None when the table
+        # header is not found.
+        settings = columns.learn(self)
+        if settings is None:
+            return None
+        return (columns.page_table(self.page_words(i), settings) for i in range(self.page_count))
+
+    def _extract(self, kind, index, settings):
+        settings_key = _settings_key(settings)
+        key = (kind, index, settings_key)
+        if key in self._results:
+            self._results.move_to_end(key)
+            self._count("hits")
+            return self._results[key]
+
+        result = MISSING
+        if self.cache is not None:
+            result = self.cache.get(self.doc_hash, index, kind, _cache_settings_key(settings_key))
+            if result is not MISSING:
+                self._count("disk_hits")
+
+        if result is MISSING:
+            self._count("misses")
+            with span(f"page.extract_{kind}", page=index):
+                result = PAGE_EXTRACTORS[kind](self._page(index), settings)
+            if self.cache is not None:
+                self.cache.put(self.doc_hash, index, kind, _cache_settings_key(settings_key), result)
+
+        self._results[key] = result
+        while len(self._results) > self.max_cached_results:
+            self._results.popitem(last=False)
+        return result
+
+    def _page(self, index):
+        page = self.pages[index]
+        if index in self._warm_pages:
+            self._warm_pages.move_to_end(index)
+            return page
+
+        self._warm_pages[index] = page
+        while len(self._warm_pages) > self.max_warm_pages:
+            _, cold_page = self._warm_pages.popitem(last=False)
+            cold_page.close()  # drops the page's cached layout objects
+        return page
+
+    def _count(self, name):
+        self.stats[name] += 1
+        EXTRACTION_STATS[name] += 1
+
+
+def open_document(pdf_file):
+    if isinstance(pdf_file, StatementDocument):
+        return pdf_file
+    return StatementDocument(pdf_file)
+
+
+class TransactionRegion:
+    # Where a bank's transaction table sits on its later pages. The left edge
+    # is learned from the table on the first page (column header line and
+    # below); the top from the second page, which repeats the page header and
+    # the column header: the table starts halfway between that line and the
+    # first row. A bank whose later pages have no column header is read from
+    # the page top.
+    def __init__(self, bank_bic, header_marker):
+        self.bank_bic = bank_bic
+        self.header_marker = header_marker
+
+    def _header_line(self, lines):
+        for i, line in enumerate(lines):
+            if self.header_marker in " ".join(word["text"] for word in line):
+                return i
+        return None
+
+    def learn(self, doc):
+        lines = word_lines(doc.page_words(0))
+        start = self._header_line(lines)
+        if start is None:
+            return None
+        x0 = min(word["x0"] for line in lines[start:] for word in line) - REGION_PADDING
+
+        top = 0
+        lines = word_lines(doc.page_words(1))
+        header = self._header_line(lines)
+        if header is not None:
+            top = max(word["bottom"] for word in lines[header])
+            if header + 1 < len(lines):
+                top = (top + min(word["top"] for word in lines[header + 1])) / 2
+        return {"x0": round(x0, 2), "top": round(top, 2)}
+
+
+class TableColumns:
+    # The column boundaries of a table bank's transaction table, learned from
+    # the ruled table on the first page that contains one of the markers
+    # (e.g. its opening balance row).
+    def __init__(self, bank_bic, markers):
+        self.bank_bic = bank_bic
+        self.markers = markers
+
+    def learn(self, doc):
+        columns = doc.page_table_columns(0, self.markers)
+        if not columns or len(columns) < 2:
+            return None
+        return {"columns": columns}
+
+
+class WordColumns:
+    # The transaction table of a table bank read from words only (no rulings,
+    # no table finding). Column starts are the x positions of the header
+    # labels on the first page that prints them. A line is a row when its
+    # first word matches row_pattern or it contains one of the markers (the
+    # balance and total rows the parser looks for); a line right below a row
+    # that is neither continues that row's cells, like a wrapped cell of the
+    # ruled table. Other lines (page headers, footers) are left out.
+    def __init__(self, bank_bic, labels, row_pattern, markers=()):
+        self.bank_bic = bank_bic
+        self.labels = [label.split() for label in labels]
+        self.row_pattern = re.compile(row_pattern)
+        self.markers = markers
+
+    def _label_starts(self, line):
+        texts = [word["text"] for word in line]
+        starts = []
+        position = 0
+        for label in self.labels:
+            for i in range(position, len(texts) - len(label) + 1):
+                if texts[i:i + len(label)] == label:
+                    starts.append(line[i]["x0"])
+                    position = i + len(label)
+                    break
+            else:
+                return None
+        return starts
+
+    def learn(self, doc):
+        for i in range(doc.page_count):
+            for line in word_lines(doc.page_words(i)):
+                starts = self._label_starts(line)
+                if starts is not None:
+                    return {"columns": [x0 - EDGE_TOLERANCE for x0 in starts]}
+        return None
+
+    def page_table(self, words, settings):
+        starts = settings["columns"]
+        table = []
+        row = None
+        previous = None
+        for line in word_lines(words):
+            cells = [[] for _ in starts]
+            for word in line:
+                cells[max(bisect_right(starts, word["x0"]) - 1, 0)].append(word["text"])
+            cells = [" ".join(cell) for cell in cells]
+            text = " ".join(cells)
+            if self.row_pattern.match(line[0]["text"]) or any(marker in text for marker in self.markers):
+                row = cells
+                table.append(row)
+            elif row is not None and line[0]["top"] - previous["bottom"] < previous["bottom"] - previous["top"]:
+                for i, cell in enumerate(cells):
+                    if cell:
+                        row[i] = f"{row[i]}\n{cell}" if row[i] else cell
+            else:
+                row = None
+            previous = {"top": min(word["top"] for word in line), "bottom": max(word["bottom"] for word in line)}
+        return [table] if table else []
+
+    def row_count(self, page_tables):
+        # Rows that start with row_pattern, i.e. the transactions the page
+        # tables should yield; balance and total rows are not counted.
+        return sum(1 for tables in page_tables for table in tables for row in table
+                   if row[0] and self.row_pattern.match(row[0].split()[0]))
+
+# -------------------- TIERED EXTRACTION --------------------
+# Table banks normally read every page with the table path (ruled tables,
+# extract_tables). With tiered extraction a statement is first parsed from
+# the cheap word tier (WordColumns) and the result is kept only when it
+# reconciles: opening balance plus the signed transactions equals the closing
+# balance, in exact minor units. Anything else (no header found, an amount
+# that does not parse, no closing balance to check against) runs the table
+# path as before. Balances alone do not catch every loss (a statement without
+# transactions, or a dropped debit and credit of the same amount, still
+# reconciles), so the word tier must also find transactions, one for every
+# row it read (WordColumns.row_count()); an empty result only stands when the
+# table path finds none either. An exception in the word tier is printed and
+# recorded on its span ("extract_tiered.words", see tracing.py) before the
+# table path runs. The tier that produced the transactions ("words" or
+# "tables") is returned so it can be recorded with the statement
+# ("extraction_tier", written to the JSON output's metadata).
+#
+# A table bank also reads header fields and balances from the page texts. A
+# PageTextReader hands it the text of each page while that page is loaded for
+# the transaction pass, instead of in a pass of its own over a joined copy of
+# the statement text: with --bounded-memory only the current page stays
+# loaded, so every extra pass lays all pages out again.
+class PageTextReader:
+    def __init__(self, doc, read_page):
+        # read_page(text) is called once for every page, in page order.
+        self.doc = doc
+        self.read_page = read_page
+        self.pages_read = 0
+
+    def pages(self, page_items):
+        # Yields page_items (one item per page, e.g. the tables of every
+        # page) and reads the text of each page right after its item.
+        for i, item in enumerate(page_items):
+            self._read_until(i + 1)
+            yield item
+
+    def finish(self):
+        # Reads the pages no pass got to, e.g. after a parser stopped early.
+        self._read_until(self.doc.page_count)
+
+    def _read_until(self, page_count):
+        while self.pages_read < page_count:
+            self.read_page(self.doc.page_text(self.pages_read) or "")
+            self.pages_read += 1
+
+
+def balances_reconcile(initial_balance, transactions, closing_balance):
+    total = amount_minor(initial_balance)
+    closing = amount_minor(closing_balance)
+    if total is None or closing is None or transactions is None:
+        return False
+    for transaction in transactions:
+        amount = signed_minor(amount_minor(transaction.get("amount")), transaction.get("cdt_dbt_ind"))
+        if amount is None:
+            return False
+        total += amount
+    return total == closing
+
+
+def extract_tiered(doc, parse_page_tables, word_columns, table_columns, page_texts, balances):
+    # parse_page_tables(page_tables) parses the tables of every page, as
+    # yielded by iter_column_page_tables(), into the bank's transactions.
+    # page_texts is the bank's PageTextReader; balances() returns the
+    # (opening, closing) balance it read, and is only called once every page
+    # text has been read.
+    if tiered_extraction_enabled(word_columns.bank_bic):
+        try:
+            with span("extract_tiered.words"):
+                page_tables = doc.iter_word_page_tables(word_columns)
+                if page_tables is not None:
+                    page_tables = list(page_texts.pages(page_tables))
+                    transactions = parse_page_tables(page_tables)
+                    page_texts.finish()
+                    initial_balance, closing_balance = balances()
+                    if transactions and len(transactions) >= word_columns.row_count(page_tables) \
+                            and balances_reconcile(initial_balance, transactions, closing_balance):
+                        return transactions, "words"
+        except Exception as error:
+            print(f"Word tier failed for {word_columns.bank_bic}, reading tables instead: {error}")
+    transactions = parse_page_tables(page_texts.pages(doc.iter_column_page_tables(table_columns)))
+    page_texts.finish()
+    return transactions, "tables"
+# -------------------- TIERED EXTRACTION --------------------
+
+# -------------------- STREAMING XML WRITER --------------------
+# Writes elements straight to the output file instead of building an Element
+# tree first, so memory stays flat however many Ntry entries a statement has.
+# The layout is the one ElementTree produced after indent(): an element with
+# children gets a newline + indentation after its start tag and after its end
+# tag, a leaf element is written inline, and empty text becomes "<Tag />".
+# Escaping follows ElementTree as well, so the bytes on disk are unchanged.
+def _escape_text(text):
+    if not isinstance(text, str):
+        raise TypeError(f"cannot serialize {text!r} (type {type(text).__name__})")
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _escape_attrib(text):
+    text = _escape_text(text)
+    if "\"" in text:
+        text = text.replace("\"", "&quot;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#09;")
+    return text
+
+
+class XmlStreamWriter:
+    def __init__(self, xml_file):
+        self.xml_file = xml_file
+        self.level = 0
+
+    def declaration(self):
+        self.xml_file.write("<?xml version='1.0' encoding='utf-8'?>\n")
+
+    def _tag(self, tag, attrib):
+        return "<" + tag + "".join(f' {name}="{_escape_attrib(value)}"' for name, value in attrib.items())
+
+    def start(self, tag, **attrib):
+        self.level += 1
+        self.xml_file.write(self._tag(tag, attrib) + ">\n" + self.level * "  ")
+
+    def end(self, tag):
+        self.level -= 1
+        self.xml_file.write("</" + tag + ">\n" + self.level * "  ")
+
+    def leaf(self, tag, text, **attrib):
+        if text:
+            self.xml_file.write(self._tag(tag, attrib) + ">" + _escape_text(text) + "</" + tag + ">")
         else:
+            self.xml_file.write(self._tag(tag, attrib) + " />")
+# -------------------- STREAMING XML WRITER --------------------
+
+# -------------------- FUNCTION FOR CREATING XML --------------------
+CAMT053_ATTRIBUTES = {
+    "xmlns": "urn:iso:std:iso:20022:tech:xsd:camt.053.001.02",
+    "xmlns_xsi": "http://www.w3.org/2001/XMLSchema-instance",
+    "xsi_schemaLocation": "urn:iso:std:iso:20022:tech:xsd:camt.053.001.02 camt.053.001.02.xsd",
+}
+
+
+def prepare_statement(data):
+    if "statement_period" in data and data["statement_period"]:
+        try:
+            from_datetime = data["statement_period"].split(" - ")[0]
+            to_datetime = data["statement_period"].split(" - ")[1]
+        except (ValueError, IndexError):
             from_datetime = ""
             to_datetime = ""
+    else:
+        from_datetime = ""
+        to_datetime = ""
 
-        # Set other required values
-        required_keys = {
-            "creation_datetime": datetime.now().isoformat().split('.')[0],
-            "from_datetime": from_datetime,
-            "to_datetime": to_datetime,
-            "iban": data.get("account_number", ""),
-            "account_holder_name": data.get("account_holder", ""),
-            "start_date": from_datetime
-        }
+    # Set other required values
+    required_keys = {
+        "creation_datetime": datetime.now().isoformat().split('.')[0],
+        "from_datetime": from_datetime,
+        "to_datetime": to_datetime,
+        "iban": data.get("account_number", ""),
+        "account_holder_name": data.get("account_holder", ""),
+        "start_date": from_datetime
+    }
 
-        for key, default in required_keys.items():
-            if key not in data or not data[key]:
-                data[key] = default
-
-        statement_date_str = data["start_date"]
-        message_id = f"{statement_date_str}-001"
-        data["message_id"] = message_id
-        data["statement_id"] = message_id
-
-        root = Element("Document", xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02",
-                       xmlns_xsi="http://www.w3.org/2001/XMLSchema-instance",
-                       xsi_schemaLocation="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02 camt.053.001.02.xsd")
-
-        bk_to_cstmr_stmt = SubElement(root, "BkToCstmrStmt")
-        grp_hdr = SubElement(bk_to_cstmr_stmt, "GrpHdr")
-        msg_id = SubElement(grp_hdr, "MsgId")
-        msg_id.text = data["message_id"]
-
-        cre_dt_tm = SubElement(grp_hdr, "CreDtTm")
-        cre_dt_tm.text = data["creation_datetime"]
-
-        stmt = SubElement(bk_to_cstmr_stmt, "Stmt")
-        stmt_id = SubElement(stmt, "Id")
-        stmt_id.text = data["statement_id"]
-
-        elctrnc_seq_nb = SubElement(stmt, "ElctrncSeqNb")
-        elctrnc_seq_nb.text = "1"
-
-        fr_dt_tm = SubElement(stmt, "FrDtTm")
-        fr_dt_tm.text = data["from_datetime"]
-
-        to_dt_tm = SubElement(stmt, "ToDtTm")
-        to_dt_tm.text = data["to_datetime"]
-
-        acct = SubElement(stmt, "Acct")
-        acct_id = SubElement(acct, "Id")
-        iban = SubElement(acct_id, "IBAN")
-        iban.text = data["iban"]
-
-        ownr = SubElement(acct, "Ownr")
-        nm = SubElement(ownr, "Nm")
-        nm.text = data["account_holder"]
-
-        bal = SubElement(stmt, "Bal")
-        tp = SubElement(bal, "Tp")
-        cd_or_prtry = SubElement(tp, "CdOrPrtry")
-        cd = SubElement(cd_or_prtry, "Cd")
-        cd.text = "OPBD"
-
-        amt = SubElement(bal, "Amt", Ccy="EUR")
-        amt.text = data["initial_balance"]
-
-        dt = SubElement(bal, "Dt")
-        dt_txt = SubElement(dt, "Dt")
-        dt_txt.text = data["from_datetime"]
-
-        if data["transactions"]:
-            txs = SubElement(stmt, "Ntry")
-            for transaction in data["transactions"]:
-                ntry = SubElement(txs, "Ntry")
-                amt = SubElement(ntry, "Amt", Ccy="EUR")
-                amt.text = transaction["amount"]
-                cdt_dbt_ind = SubElement(ntry, "CdtDbtInd")
-                cdt_dbt_ind.text = transaction["cdt_dbt_ind"]
-
-                ntry_dtls = SubElement(ntry, "NtryDtls")
-                tx_dtls = SubElement(ntry_dtls, "TxDtls")
-                refs = SubElement(tx_dtls, "Refs")
-                instr_id = SubElement(refs, "InstrId")
-                instr_id.text = transaction["transaction_id"]
-
-                amt_dtls = SubElement(tx_dtls, "AmtDtls")
-                amt_instd_amt = SubElement(amt_dtls, "AmtInstdAmt", Ccy="EUR")
-                amt_instd_amt.text = transaction["amount"]
-
-                rltd_pties = SubElement(tx_dtls, "RltdPties")
-                dbtr = SubElement(rltd_pties, "Dbtr")
-                nm = SubElement(dbtr, "Nm")
-                nm.text = transaction["beneficiary"]
-
-                rltd_agts = SubElement(tx_dtls, "RltdAgts")
-                dbtr_agt = SubElement(rltd_agts, "DbtrAgt")
-                fin_instn_id = SubElement(dbtr_agt, "FinInstnId")
-                bic = SubElement(fin_instn_id, "BIC")
-                bic.text = data["bank_bic"]
-
-                addtl_ntry_inf = SubElement(ntry, "AddtlNtryInf")
-                addtl_ntry_inf.text = transaction["details"]
-
-        indent(root)
-        tree = ElementTree(root)
-        tree.write(xml_path, encoding="utf-8", xml_declaration=True)
+    for key, default in required_keys.items():
+        if key not in data or not data[key]:
+            data[key] = default
+
+    statement_date_str = data["start_date"]
+    message_id = f"{statement_date_str}-001"
+    data["message_id"] = message_id
+    data["statement_id"] = message_id
+
+
+def write_group_header(writer, message_id, creation_datetime):
+    writer.start("GrpHdr")
+    writer.leaf("MsgId", message_id)
+    writer.leaf("CreDtTm", creation_datetime)
+    writer.end("GrpHdr")
+
+
+def write_statement(writer, data, sequence_number="1"):
+    writer.start("Stmt")
+    writer.leaf("Id", data["statement_id"])
+    writer.leaf("ElctrncSeqNb", sequence_number)
+    writer.leaf("FrDtTm", data["from_datetime"])
+    writer.leaf("ToDtTm", data["to_datetime"])
+
+    writer.start("Acct")
+    writer.start("Id")
+    writer.leaf("IBAN", data["iban"])
+    writer.end("Id")
+    writer.start("Ownr")
+    writer.leaf("Nm", data["account_holder"])
+    writer.end("Ownr")
+    writer.end("Acct")
+
+    writer.start("Bal")
+    writer.start("Tp")
+    writer.start("CdOrPrtry")
+    writer.leaf("Cd", "OPBD")
+    writer.end("CdOrPrtry")
+    writer.end("Tp")
+    writer.leaf("Amt", data["initial_balance"], Ccy="EUR")
+    writer.start("Dt")
+    writer.leaf("Dt", data["from_datetime"])
+    writer.end("Dt")
+    writer.end("Bal")
+
+    if data["transactions"]:
+        writer.start("Ntry")
+        for transaction in data["transactions"]:
+            writer.start("Ntry")
+            writer.leaf("Amt", transaction["amount"], Ccy="EUR")
+            writer.leaf("CdtDbtInd", transaction["cdt_dbt_ind"])
+
+            writer.start("NtryDtls")
+            writer.start("TxDtls")
+            writer.start("Refs")
+            writer.leaf("InstrId", transaction["transaction_id"])
+            writer.end("Refs")
+
+            writer.start("AmtDtls")
+            writer.leaf("AmtInstdAmt", transaction["amount"], Ccy="EUR")
+            writer.end("AmtDtls")
+
+            writer.start("RltdPties")
+            writer.start("Dbtr")
+            writer.leaf("Nm", transaction["beneficiary"])
+            writer.end("Dbtr")
+            writer.end("RltdPties")
+
+            writer.start("RltdAgts")
+            writer.start("DbtrAgt")
+            writer.start("FinInstnId")
+            writer.leaf("BIC", data["bank_bic"])
+            writer.end("FinInstnId")
+            writer.end("DbtrAgt")
+            writer.end("RltdAgts")
+            writer.end("TxDtls")
+            writer.end("NtryDtls")
+
+            writer.leaf("AddtlNtryInf", transaction["details"])
+            writer.end("Ntry")
+        writer.end("Ntry")
+
+    writer.end("Stmt")
+
+
+@traced("create_xml")
+def create_xml(data, xml_path, raise_errors=False):
+    # raise_errors: re-raise after printing, for callers that must not go on
+    # without the XML (incremental mode).
+    try:
+        prepare_statement(data)
+
+        with span("create_xml.write"), open(xml_path, "w", encoding="utf-8", errors="xmlcharrefreplace",
+                                             newline="\n") as xml_file:
+            try:
+                writer = XmlStreamWriter(xml_file)
+                writer.declaration()
+                writer.start("Document", **CAMT053_ATTRIBUTES)
+                writer.start("BkToCstmrStmt")
+                write_group_header(writer, data["message_id"], data["creation_datetime"])
+                write_statement(writer, data)
+                writer.end("BkToCstmrStmt")
+                writer.end("Document")
+            except Exception:
+                # Never leave a half-written statement behind
+                xml_file.close()
+                os.remove(xml_path)
+                raise
 
     except Exception as e:
         print(f"An error occurred while creating XML: {str(e)}")
+        if raise_errors:
+            raise
 # -------------------- FUNCTION FOR CREATING XML --------------------
 
+# -------------------- BATCHED XML OUTPUT --------------------
+# Alternative to one camt.053 file per PDF: statements are appended as Stmt
+# elements to a shared BkToCstmrStmt document, one document per run
+# (group_by="run") or per account (group_by="iban"). Each statement is
+# serialized in memory first and then appended, so a failing statement never
+# leaves a broken document. Documents are written as "<name>.xml.part" and
+# renamed (after an fsync) when the batch is closed, so downstream imports
+# only ever see complete files. With many accounts at most max_open_files
+# handles stay open; the rest are reopened in append mode when needed.
+# Batches are not combined with --incremental: every run writes new
+# documents, so a re-parsed PDF's statement would also stay in the documents
+# of earlier runs.
+MAX_OPEN_BATCH_FILES = 64
+BATCH_GROUPS = ("run", "iban")
+
+
+class XmlBatchWriter:
+    def __init__(self, xml_folder, group_by="run", max_open_files=None):
+        if group_by not in BATCH_GROUPS:
+            raise ValueError(f"Unknown XML batch grouping: {group_by}")
+        self.xml_folder = xml_folder
+        self.group_by = group_by
+        self.max_open_files = max_open_files or MAX_OPEN_BATCH_FILES
+        self.documents = OrderedDict()
+        self.batch_id = None
+
+    def _key(self, data):
+        if self.group_by == "run":
+            return "statements"
+        iban = "".join(ch for ch in data.get("iban") or "" if ch.isalnum())
+        return iban or "no_iban"
+
+    def _document(self, key):
+        if self.batch_id is None:
+            self.batch_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+        document = self.documents.get(key)
+        if document is None:
+            path = os.path.join(self.xml_folder, f"{key}_{self.batch_id}.xml")
+            xml_file = open(path + ".part", "w", encoding="utf-8", errors="xmlcharrefreplace", newline="\n")
+            writer = XmlStreamWriter(xml_file)
+            writer.declaration()
+            writer.start("Document", **CAMT053_ATTRIBUTES)
+            writer.start("BkToCstmrStmt")
+            write_group_header(writer, f"{self.batch_id}-{len(self.documents) + 1:03}",
+                               datetime.now().isoformat().split('.')[0])
+            document = {"path": path, "writer": writer, "statements": 0}
+            self.documents[key] = document
+        elif document["writer"].xml_file is None:
+            document["writer"].xml_file = open(document["path"] + ".part", "a", encoding="utf-8",
+                                               errors="xmlcharrefreplace", newline="\n")
+        self.documents.move_to_end(key)
+
+        open_documents = [d for d in self.documents.values() if d["writer"].xml_file is not None]
+        for cold in open_documents[:-self.max_open_files]:
+            cold["writer"].xml_file.close()
+            cold["writer"].xml_file = None
+        return document
+
+    def add(self, data):
+        # Returns the path the document will have once the batch is closed, or
+        # None when the statement could not be added (the error is printed).
+        try:
+            prepare_statement(data)
+            document = self._document(self._key(data))
+
+            buffer = io.StringIO()
+            statement_writer = XmlStreamWriter(buffer)
+            statement_writer.level = document["writer"].level
+            write_statement(statement_writer, data, str(document["statements"] + 1))
+
+            document["writer"].xml_file.write(buffer.getvalue())
+            document["statements"] += 1
+            return document["path"]
+
+        except Exception as e:
+            print(f"An error occurred while creating XML: {str(e)}")
+            return None
+
+    def close(self):
+        for document in self.documents.values():
+            writer = document["writer"]
+            if writer.xml_file is None:
+                writer.xml_file = open(document["path"] + ".part", "a", encoding="utf-8",
+                                       errors="xmlcharrefreplace", newline="\n")
+            writer.end("BkToCstmrStmt")
+            writer.end("Document")
+            writer.xml_file.flush()
+            os.fsync(writer.xml_file.fileno())
+            writer.xml_file.close()
+            writer.xml_file = None
+            os.replace(document["path"] + ".part", document["path"])
+        self.documents.clear()
+        self.batch_id = None
+# -------------------- BATCHED XML OUTPUT --------------------
+
 # -------------------- FUNCTION FOR CREATING JSON --------------------
+@traced("create_json")
 def create_json(data, json_path):
     output = {
         "output": {
@@ -191,57 +1045,1139 @@ def create_json(data, json_path):
         }
     }
 
-    with open(json_path, 'w', encoding='utf-8') as json_file:
+    if data.get("extraction_tier"):
+        output["output"]["metadata"] = {"extraction_tier": data["extraction_tier"]}
+
+    with span("create_json.dump"), open(json_path, 'w', encoding='utf-8') as json_file:
         json.dump(output, json_file, ensure_ascii=False, indent=4)
 # -------------------- FUNCTION FOR CREATING JSON --------------------
 
-# -------------------- MAIN FUNCTION --------------------
-def process_files(extract_pdf_data_func):
-    import os
-    import shutil
+# -------------------- STATEMENT RECORDS --------------------
+# Compact form of a parsed statement for large batches. The bank parsers build
+# plain dicts; compact_statement() turns one into a StatementHeader (__slots__
+# record) whose transactions are stored column-wise in a TransactionColumns:
+# one packed string per text field plus two typed arrays, the amount in signed
+# minor units (debits negative, like the ledger) and the booking date as a date
+# ordinal. Indexing or iterating the columns yields Transaction rows, which are
+# __slots__ records as well. A columns object pickles as a few strings and
+# byte buffers, so results cross the worker pool cheaply; only worker results
+# are compacted, a statement parsed in the parent process stays a dict. The
+# typed arrays are filled with the batch functions of normalize.py.
+#
+# Both records keep the dict interface the writers and sinks use
+# (record["amount"], record.get(...), "key" in record, record[key] = value)
+# and the text printed on the statement, so XML/JSON output is unchanged.
+# A header key that is not in HEADER_FIELDS is kept in a small side dict; a
+# statement whose rows have keys outside TRANSACTION_FIELDS stays a dict.
+# Typed values that do not parse are MISSING_MINOR / MISSING_ORDINAL.
+TRANSACTION_FIELDS = ("transaction_id", "date", "beneficiary", "details", "amount", "balance", "cdt_dbt_ind")
+HEADER_FIELDS = ("account_holder", "account_holder_id", "account_holder_address", "account_number",
+                 "statement_period", "statement_date", "bank_name", "bank_address", "bank_reg_no", "bank_vat_code",
+                 "bank_registration_date", "bank_bic", "initial_balance", "closing_balance", "transactions",
+                 # added by prepare_statement
+                 "creation_datetime", "from_datetime", "to_datetime", "iban", "account_holder_name", "start_date",
+                 "message_id", "statement_id",
+                 # set by tiered extraction
+                 "extraction_tier")
 
-    script_dir = os.path.dirname(os.path.abspath(__file__))  # Directory where the script is located
-    pdf_folder = os.path.join(script_dir, "PDFs_Pending")  # Folder with PDF files
-    xml_folder = os.path.join(script_dir, "XML")  # Folder for XML files
-    json_folder = os.path.join(script_dir, "JSON")  # Folder for JSON files
-    parsed_folder = os.path.join(script_dir, "PDFs_Parsed")  # Folder for processed PDF files
 
-    if not os.path.exists(pdf_folder):
-        print(f"Error: Folder '{pdf_folder}' does not exist.")
-        return
+class _Record:
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key) if key in self.FIELDS else self._missing(key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def _missing(self, key):
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and hasattr(self, key)
+
+    def keys(self):
+        return [key for key in self.FIELDS if hasattr(self, key)]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
 
-    if not os.path.exists(parsed_folder):
-        os.makedirs(parsed_folder)
+    def values(self):
+        return [self[key] for key in self.keys()]
 
-    if os.path.exists(xml_folder):
-        shutil.rmtree(xml_folder)
-    if os.path.exists(json_folder):
-        shutil.rmtree(json_folder)
+    def __iter__(self):
+        return iter(self.keys())
 
-    os.makedirs(xml_folder, exist_ok=True)
-    os.makedirs(json_folder, exist_ok=True)
+    def __len__(self):
+        return len(self.keys())
 
-    pdf_files = [f for f in os.listdir(pdf_folder) if f.endswith(".pdf")]
+    def __eq__(self, other):
+        if not isinstance(other, (dict, _Record)):
+            return NotImplemented
+        return self.to_dict() == dict(other.items())
 
-    for pdf_file in pdf_files:
-        pdf_path = os.path.join(pdf_folder, pdf_file)
+    __hash__ = None
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Transaction(_Record):
+    __slots__ = TRANSACTION_FIELDS + ("amount_minor", "date_ordinal")
+    FIELDS = TRANSACTION_FIELDS
+
+    def __init__(self, amount_minor=MISSING_MINOR, date_ordinal=MISSING_ORDINAL, **fields):
+        self.amount_minor = amount_minor
+        self.date_ordinal = date_ordinal
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, row, statement_from=None, statement_to=None):
+        minor = signed_minor(amount_minor(row.get("amount")), row.get("cdt_dbt_ind"))
+        booking_date = transaction_date(row.get("date"), statement_from, statement_to)
+        return cls(MISSING_MINOR if minor is None else minor,
+                   MISSING_ORDINAL if booking_date is None else booking_date.toordinal(), **row)
+
+
+class TransactionColumns:
+    # A text column is one string plus an array of offsets into it, so a row
+    # costs a few bytes per field instead of a str object per field. Columns
+    # holding anything but strings (None from an optional regex group) stay
+    # plain lists; a field no row has (HELSFIHH prints no balance) is None.
+    __slots__ = ("texts", "offsets", "amount_minor", "date_ordinal")
+
+    def __init__(self, rows=(), statement_from=None, statement_to=None):
+        self.texts = {}
+        self.offsets = {}
+        for key in TRANSACTION_FIELDS:
+            if rows and key not in rows[0]:
+                self.texts[key] = None
+                self.offsets[key] = None
+                continue
+            values = [row[key] for row in rows]
+            if all(isinstance(value, str) for value in values):
+                offsets = array("I", [0])
+                for value in values:
+                    offsets.append(offsets[-1] + len(value))
+                self.texts[key] = "".join(values)
+                self.offsets[key] = offsets
+            else:
+                self.texts[key] = values
+                self.offsets[key] = None
+
+        empty = [None] * len(rows)
+        amounts = [row["amount"] for row in rows] if self.texts["amount"] is not None else empty
+        indicators = [row["cdt_dbt_ind"] for row in rows] if self.texts["cdt_dbt_ind"] is not None else empty
+        dates = [row["date"] for row in rows] if self.texts["date"] is not None else empty
+        self.amount_minor = amounts_minor(amounts, cdt_dbt_inds=indicators)
+        self.date_ordinal = date_ordinals(dates, statement_from, statement_to)
+
+    def value(self, key, index):
+        offsets = self.offsets[key]
+        if offsets is None:
+            return self.texts[key][index]
+        return self.texts[key][offsets[index]:offsets[index + 1]]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        transaction = Transaction(self.amount_minor[index], self.date_ordinal[index])
+        for key in TRANSACTION_FIELDS:
+            if self.texts[key] is not None:
+                setattr(transaction, key, self.value(key, index))
+        return transaction
+
+    def __len__(self):
+        return len(self.amount_minor)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
         try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+
+class StatementHeader(_Record):
+    __slots__ = HEADER_FIELDS + ("_extra",)
+    FIELDS = HEADER_FIELDS
+
+    def __init__(self, **fields):
+        self._extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    def _missing(self, key):
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key):
+        return super().__contains__(key) or (self._extra is not None and key in self._extra)
+
+    def keys(self):
+        return super().keys() + list(self._extra or ())
+
+
+def compact_statement(data):
+    if not isinstance(data, dict):
+        return data
+    rows = data.get("transactions") or []
+    if not all(isinstance(row, dict) and row.keys() <= set(TRANSACTION_FIELDS) for row in rows):
+        return data
+
+    statement_from, statement_to = statement_dates(data.get("statement_period"))
+    if all(row.keys() == rows[0].keys() for row in rows):
+        transactions = TransactionColumns(rows, statement_from, statement_to)
+    else:
+        transactions = [Transaction.from_dict(row, statement_from, statement_to) for row in rows]
+
+    header = StatementHeader(**data)
+    if "transactions" in data:
+        header["transactions"] = transactions
+    return header
+# -------------------- STATEMENT RECORDS --------------------
+
+# -------------------- PIPELINE METRICS --------------------
+# With metrics enabled (--metrics-file, --metrics-port) every file's stage
+# timings and page count are measured where it is parsed (see MEASUREMENTS in
+# tracing.py) and recorded in PIPELINE_METRICS in the parent, together with
+# the outcome of writing it. See metrics.py for the exported series.
+PIPELINE_METRICS = None
+
+
+def enable_metrics(textfile=None, port=None):
+    global PIPELINE_METRICS
+    PIPELINE_METRICS = PipelineMetrics(textfile)
+    if port is not None:
+        host, port = PIPELINE_METRICS.serve(port)
+        print(f"Serving metrics on http://{host}:{port}/metrics")
+    enable_measurements()
+    return PIPELINE_METRICS
+
+
+def record_extraction(data, measurements):
+    if PIPELINE_METRICS is not None:
+        PIPELINE_METRICS.record_extraction(data, measurements)
+# -------------------- PIPELINE METRICS --------------------
+
+# -------------------- FUNCTIONS FOR PARALLEL EXTRACTION --------------------
+def _init_worker(extraction_cache, tracing=False, region_of_interest=None, learned_columns=None,
+                 pdfminer_text=None, bounded_memory=False, tiered_extraction=None, max_pages=None,
+                 failure_probes=False, measurements=False, classify_document=None):
+    global EXTRACTION_CACHE, REGION_OF_INTEREST, LEARNED_COLUMNS, PDFMINER_TEXT, BOUNDED_MEMORY, TIERED_EXTRACTION
+    global MAX_PAGES, CLASSIFY_DOCUMENT
+    EXTRACTION_CACHE = extraction_cache
+    REGION_OF_INTEREST = region_of_interest
+    LEARNED_COLUMNS = learned_columns
+    PDFMINER_TEXT = pdfminer_text
+    BOUNDED_MEMORY = bounded_memory
+    TIERED_EXTRACTION = tiered_extraction
+    MAX_PAGES = max_pages
+    CLASSIFY_DOCUMENT = classify_document
+    if tracing:
+        enable_tracing()
+    if failure_probes:
+        enable_failure_probes()
+    if measurements:
+        enable_measurements()
+    # Ctrl-C is handled by the parent, which shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _extract_file(extract_pdf_data_func, pdf_path):
+    # With failure probes enabled (--quarantine) a file that yields no data
+    # returns an ExtractionFailure saying where it failed instead of None.
+    probe = start_probe()
+    try:
+        with span("extract_file", file=os.path.basename(pdf_path)):
+            page_failure = page_limit_failure(pdf_path)
+            if page_failure is not None:
+                return page_failure
             data = extract_pdf_data_func(pdf_path)
+    except Exception:
+        data = None
+    finally:
+        stop_probe()
+    if not data and probe is not None:
+        return failure_from_probe(probe, "extract_file", "no bank recognized or no statement data")
+    return data
 
-            if data:
-                xml_filename = os.path.splitext(pdf_file)[0] + '.xml'
-                xml_path = os.path.join(xml_folder, xml_filename)
-                create_xml(data, xml_path)
 
-                json_filename = os.path.splitext(pdf_file)[0] + '.json'
-                json_path = os.path.join(json_folder, json_filename)
+def _extract_file_in_worker(extract_pdf_data_func, pdf_path):
+    # Spans and measurements recorded in a worker travel back to the parent
+    # with the result, and the statement is compacted to cross the process
+    # boundary (see STATEMENT RECORDS).
+    data = compact_statement(_extract_file(extract_pdf_data_func, pdf_path))
+    return data, take_events(), take_measurements()
+
+
+def _worker_result(result):
+    data, events, measurements = result
+    add_events(events)
+    record_extraction(data, measurements)
+    return data
+
+
+def _extract_file_in_parent(extract_pdf_data_func, pdf_path):
+    data = _extract_file(extract_pdf_data_func, pdf_path)
+    record_extraction(data, take_measurements())
+    return data
+
+
+def _worker_pool(workers):
+    initargs = (EXTRACTION_CACHE, tracing_enabled(), REGION_OF_INTEREST, LEARNED_COLUMNS, PDFMINER_TEXT,
+                BOUNDED_MEMORY, TIERED_EXTRACTION, MAX_PAGES, failure_probes_enabled(), measurements_enabled(),
+                CLASSIFY_DOCUMENT)
+    if isolated_workers_enabled():
+        return IsolatedWorkerPool(workers, initargs, FILE_TIMEOUT, MAX_RSS_MB)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+
+
+def extract_files(extract_pdf_data_func, pdf_paths, workers=1):
+    # Yields (pdf_path, data) in the order of pdf_paths. With workers > 1 the
+    # PDFs are parsed in a pool of worker processes that is reused for the whole
+    # batch; pdfplumber layout analysis is CPU-bound Python, so threads would not
+    # help. workers=0 uses one process per CPU. With a timeout or memory cap
+    # even a single worker runs out of process, so it can be killed.
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 and not isolated_workers_enabled():
+        for pdf_path in pdf_paths:
+            yield pdf_path, _extract_file_in_parent(extract_pdf_data_func, pdf_path)
+        return
+
+    extract = partial(_extract_file_in_worker, extract_pdf_data_func)
+    with _worker_pool(workers) as executor:
+        for pdf_path, result in zip(pdf_paths, executor.map(extract, pdf_paths)):
+            yield pdf_path, _worker_result(result)
+# -------------------- FUNCTIONS FOR PARALLEL EXTRACTION --------------------
+
+# -------------------- ISOLATED WORKERS --------------------
+# A malformed PDF can keep pdfplumber's layout analysis busy for minutes or
+# grow it to gigabytes. With a timeout or memory cap (--timeout, --max-rss-mb)
+# every PDF is parsed in a worker process watched by the parent: a file that
+# runs longer than FILE_TIMEOUT seconds, or whose worker grows past MAX_RSS_MB
+# of resident memory, gets its worker killed and is reported, and a fresh
+# worker takes the slot, so the rest of the batch keeps going at full speed.
+# A worker that dies on its own (segfault, OOM killer) is reported and
+# replaced the same way. Workers are reused across files, so isolation costs
+# one pipe round trip per file. Resident memory is read from /proc, so the
+# memory cap only applies on Linux.
+#
+# --max-pages works in every mode: a PDF with more pages is reported and not
+# parsed at all. Stopped files get no output and, like files their parser
+# rejects, stay in PDFs_Pending or go to quarantine. When the entry point
+# classifies documents (the dispatcher), a stopped file is classified from
+# its first page first, so its failure names the bank.
+FILE_TIMEOUT = None
+MAX_RSS_MB = None
+MAX_PAGES = None
+CLASSIFY_DOCUMENT = None  # classify_document(doc, max_pages) -> bank BIC or None
+LIMIT_POLL_SECONDS = 0.25
+
+
+def enable_resource_limits(timeout=None, max_rss_mb=None, max_pages=None, classify_document=None):
+    global FILE_TIMEOUT, MAX_RSS_MB, MAX_PAGES, CLASSIFY_DOCUMENT
+    FILE_TIMEOUT = timeout
+    MAX_RSS_MB = max_rss_mb
+    MAX_PAGES = max_pages
+    CLASSIFY_DOCUMENT = classify_document
+
+
+def isolated_workers_enabled():
+    return FILE_TIMEOUT is not None or MAX_RSS_MB is not None
+
+
+def page_limit_failure(pdf_path):
+    if MAX_PAGES is None:
+        return None
+    bank = None
+    with open_document(pdf_path) as doc:
+        page_count = doc.page_count
+        if page_count <= MAX_PAGES:
+            return None
+        if CLASSIFY_DOCUMENT is not None:
+            try:
+                with span("classify"):
+                    bank = CLASSIFY_DOCUMENT(doc, 1)
+            except Exception:
+                bank = None
+    error = f"{page_count} pages, limit {MAX_PAGES}"
+    print(f"Stopped file: {os.path.basename(pdf_path)} ({error})")
+    return ExtractionFailure("page_limit", bank, error)
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _isolated_worker(conn, initargs):
+    _init_worker(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        conn.send(fn(*args))
+
+
+class _IsolatedWorker:
+    def __init__(self, context, initargs):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_isolated_worker, args=(child_conn, initargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None  # (future, file name, start time) while parsing
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class IsolatedWorkerPool(Executor):
+    # Executor for _extract_file_in_worker calls (the last argument is the PDF
+    # path). A stopped file's future gets an ExtractionFailure as its data
+    # instead of raising, so callers handle it like a file their parser
+    # rejected.
+    def __init__(self, workers, initargs, timeout=None, max_rss_mb=None):
+        self.workers = max(workers, 1)
+        self.initargs = initargs
+        self.timeout = timeout
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self._context = multiprocessing.get_context()
+        self._tasks = deque()
+        self._lock = threading.Lock()
+        self._wakeup_reader, self._wakeup_writer = self._context.Pipe(duplex=False)
+        self._shutdown = False
+        self._monitor = threading.Thread(target=self._run, name="isolated-worker-monitor", daemon=True)
+        self._monitor.start()
+
+    def submit(self, fn, /, *args):
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._tasks.append((future, fn, args))
+        self._wakeup_writer.send_bytes(b"")
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._tasks:
+                    self._tasks.popleft()[0].cancel()
+        self._wakeup_writer.send_bytes(b"")
+        if wait:
+            self._monitor.join()
+
+    def _stop(self, workers, worker, stage, reason):
+        future, name, _ = worker.task
+        worker.kill()
+        workers.remove(worker)
+        print(f"Stopped file: {name} ({reason})")
+        future.set_result((ExtractionFailure(stage, error=reason), [], []))
+
+    def _assign(self, workers):
+        with self._lock:
+            for worker in [w for w in workers if w.task is None] + [None] * (self.workers - len(workers)):
+                while self._tasks:
+                    future, fn, args = self._tasks.popleft()
+                    if future.set_running_or_notify_cancel():
+                        break
+                else:
+                    break
+                if worker is None:
+                    worker = _IsolatedWorker(self._context, self.initargs)
+                    workers.append(worker)
+                worker.task = (future, os.path.basename(str(args[-1])), time.monotonic())
+                try:
+                    worker.conn.send((fn, args))
+                except OSError:
+                    self._stop(workers, worker, "worker_crash", f"worker exited with code {worker.process.exitcode}")
+            return self._shutdown and not self._tasks
+
+    def _collect(self, workers, ready):
+        for worker in [w for w in workers if w.task is not None]:
+            future, name, started = worker.task
+            if worker.conn in ready or worker.process.sentinel in ready:
+                try:
+                    result = worker.conn.recv()
+                except (EOFError, OSError):
+                    worker.process.join()
+                    self._stop(workers, worker, "worker_crash", f"worker exited with code {worker.process.exitcode}")
+                    continue
+                worker.task = None
+                future.set_result(result)
+                continue
+
+            if self.timeout is not None and time.monotonic() - started > self.timeout:
+                self._stop(workers, worker, "timeout", f"timed out after {self.timeout:g} s")
+                continue
+            rss = _rss_bytes(worker.process.pid) if self.max_rss is not None else None
+            if rss is not None and rss > self.max_rss:
+                self._stop(workers, worker, "memory_limit", f"worker used {rss // (1024 * 1024)} MB, limit "
+                                                            f"{self.max_rss // (1024 * 1024)} MB")
+
+    def _run(self):
+        workers = []
+        try:
+            while True:
+                finished = self._assign(workers)
+                if finished and all(worker.task is None for worker in workers):
+                    return
+                waitables = [self._wakeup_reader]
+                for worker in workers:
+                    if worker.task is not None:
+                        waitables += [worker.conn, worker.process.sentinel]
+                ready = wait(waitables, LIMIT_POLL_SECONDS)
+                while self._wakeup_reader.poll():
+                    self._wakeup_reader.recv_bytes()
+                self._collect(workers, ready)
+        finally:
+            for worker in workers:
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+            for worker in workers:
+                worker.process.join(LIMIT_POLL_SECONDS)
+                if worker.process.is_alive():
+                    worker.kill()
+# -------------------- ISOLATED WORKERS --------------------
+
+# -------------------- FUNCTIONS FOR INCREMENTAL OUTPUT --------------------
+# In incremental mode XML/ and JSON/ are kept between runs and every written
+# statement is recorded in a manifest (one JSON line per statement: PDF name,
+# input hash, parser version, output paths). A PDF whose bytes and parser are
+# unchanged and whose outputs still exist is not parsed again. The parser
+# version is a hash of the source of every module loaded from this folder, so
+# editing any bank module or common_script invalidates the affected outputs.
+MANIFEST_FILENAME = "output_manifest.jsonl"
+
+
+def parser_version(extract_pdf_data_func):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    source_files = {inspect.getsourcefile(inspect.unwrap(extract_pdf_data_func))}
+    for module in list(sys.modules.values()):
+        module_file = getattr(module, "__file__", None)
+        if module_file and module_file.endswith(".py") and os.path.dirname(os.path.abspath(module_file)) == script_dir:
+            source_files.add(module_file)
+
+    digest = hashlib.sha256()
+    for source_file in sorted(os.path.abspath(f) for f in source_files):
+        with open(source_file, "rb") as f:
+            digest.update(os.path.basename(source_file).encode("utf-8"))
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def load_manifest(manifest_path):
+    # Later lines win. The file is compacted to one line per PDF on load so it
+    # does not grow without bound across runs.
+    manifest = {}
+    if not os.path.exists(manifest_path):
+        return manifest
+
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        for line in manifest_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # partial line left by an interrupted run
+            manifest[entry["pdf_file"]] = entry
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+        for entry in manifest.values():
+            manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def append_manifest(manifest_path, entry):
+    with open(manifest_path, "a", encoding="utf-8") as manifest_file:
+        manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def is_up_to_date(entry, input_hash, version, script_dir):
+    if not entry or entry.get("input_hash") != input_hash or entry.get("parser_version") != version:
+        return False
+    return all(os.path.exists(os.path.join(script_dir, path)) for path in entry.get("outputs", []))
+# -------------------- FUNCTIONS FOR INCREMENTAL OUTPUT --------------------
+
+# -------------------- MAIN FUNCTION --------------------
+def processing_folders():
+    script_dir = os.path.dirname(os.path.abspath(__file__))  # Directory where the script is located
+    return {
+        "script": script_dir,
+        "pending": os.path.join(script_dir, "PDFs_Pending"),  # Folder with PDF files
+        "xml": os.path.join(script_dir, "XML"),  # Folder for XML files
+        "json": os.path.join(script_dir, "JSON"),  # Folder for JSON files
+        "parsed": os.path.join(script_dir, "PDFs_Parsed"),  # Folder for processed PDF files
+        "quarantine": os.path.join(script_dir, "PDFs_Quarantine"),  # Folder for PDFs that failed
+        "manifest": os.path.join(script_dir, MANIFEST_FILENAME),  # Manifest for incremental mode
+    }
+
+
+def prepare_folders(folders, incremental=False):
+    if not os.path.exists(folders["pending"]):
+        print(f"Error: Folder '{folders['pending']}' does not exist.")
+        return False
+
+    if not os.path.exists(folders["parsed"]):
+        os.makedirs(folders["parsed"])
+
+    if not incremental:
+        if os.path.exists(folders["xml"]):
+            shutil.rmtree(folders["xml"])
+        if os.path.exists(folders["json"]):
+            shutil.rmtree(folders["json"])
+
+    os.makedirs(folders["xml"], exist_ok=True)
+    os.makedirs(folders["json"], exist_ok=True)
+    return True
+
+
+def skip_if_unchanged(pdf_file, folders, manifest, version):
+    # Incremental mode: returns the input hash of a PDF that still has to be
+    # parsed, or None after moving an unchanged PDF straight to PDFs_Parsed.
+    pdf_path = os.path.join(folders["pending"], pdf_file)
+    input_hash = file_hash(pdf_path)
+    if is_up_to_date(manifest.get(pdf_file), input_hash, version, folders["script"]):
+        shutil.move(pdf_path, os.path.join(folders["parsed"], pdf_file))
+        print(f"Skipped unchanged file: {pdf_file}")
+        return None
+    return input_hash
+
+
+@traced("write_outputs")
+def write_replacing(data, outputs):
+    # outputs: (write function, path) pairs. Every output is written next to
+    # its target and renamed only once all of them were written, so a crash
+    # never leaves a half-written file behind a valid manifest entry. A
+    # failed write is raised, and no temporary file is left behind.
+    tmp_paths = [path + ".tmp" for _, path in outputs]
+    try:
+        for (write, _), tmp_path in zip(outputs, tmp_paths):
+            write(data, tmp_path)
+        for (_, path), tmp_path in zip(outputs, tmp_paths):
+            os.replace(tmp_path, path)
+    finally:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def write_outputs(pdf_path, data, folders, input_hash=None, version=None, xml_batch=None, sinks=()):
+    # Writes XML/JSON for one parsed PDF and moves it to PDFs_Parsed. Passing
+    # input_hash/version selects incremental mode (atomic writes + manifest;
+    # the manifest line is only written once every output is in place).
+    # With an XmlBatchWriter the statement is appended to its batch document
+    # instead of getting an XML file of its own. Every sink (e.g. the columnar
+    # export) also receives the parsed statement.
+    pdf_file = os.path.basename(pdf_path)
+    incremental = input_hash is not None
+    try:
+        if data:
+            xml_filename = os.path.splitext(pdf_file)[0] + '.xml'
+            xml_path = os.path.join(folders["xml"], xml_filename)
+
+            json_filename = os.path.splitext(pdf_file)[0] + '.json'
+            json_path = os.path.join(folders["json"], json_filename)
+
+            if xml_batch is not None:
+                xml_path = xml_batch.add(data)
+                if incremental:
+                    if xml_path is None:
+                        # Not in the batch (add() printed why), so there is
+                        # no XML output to record in the manifest.
+                        raise ValueError(f"statement of {pdf_file} was not added to the XML batch")
+                    write_replacing(data, [(create_json, json_path)])
+                else:
+                    create_json(data, json_path)
+            elif incremental:
+                write_replacing(data, [(partial(create_xml, raise_errors=True), xml_path), (create_json, json_path)])
+            else:
+                create_xml(data, xml_path)
                 create_json(data, json_path)
 
-                parsed_pdf_path = os.path.join(parsed_folder, pdf_file)
-                shutil.move(pdf_path, parsed_pdf_path)
+            for sink in sinks:
+                sink.add(data, pdf_file)
+
+            parsed_pdf_path = os.path.join(folders["parsed"], pdf_file)
+            shutil.move(pdf_path, parsed_pdf_path)
+
+            if incremental:
+                append_manifest(folders["manifest"], {
+                    "pdf_file": pdf_file,
+                    "input_hash": input_hash,
+                    "parser_version": version,
+                    "outputs": [os.path.relpath(xml_path, folders["script"]),
+                                os.path.relpath(json_path, folders["script"])]
+                })
+
+            print(f"Processed file: {pdf_file}")
+            return True
+    except Exception as e:
+        print(f"An error occurred while writing outputs for {pdf_file}: {str(e)}")
+    return False
+
+
+def open_quarantine(folders, extract_pdf_data_func):
+    # Failure probes have to be on before the worker pool starts, so workers
+    # report where a file failed. Due files go back to PDFs_Pending first.
+    enable_failure_probes()
+    failures = Quarantine(folders["quarantine"], parser_version(extract_pdf_data_func))
+    failures.release_due(folders["pending"])
+    return failures
+
+
+def finish_file(pdf_path, data, folders, input_hash=None, version=None, xml_batch=None, sinks=(), failures=None,
+                measurements=()):
+    # write_outputs, plus recording the outcome in the metrics and, with a
+    # Quarantine, moving a PDF that failed to parse or to write to quarantine
+    # with a record of where it failed. measurements are those of earlier
+    # stages that ran in other threads (the --pipeline read stage); the write
+    # is measured in this thread.
+    if failures is None and PIPELINE_METRICS is None:
+        return write_outputs(pdf_path, data, folders, input_hash, version, xml_batch, sinks)
+
+    probe = start_probe()
+    try:
+        written = write_outputs(pdf_path, data, folders, input_hash, version, xml_batch, sinks)
+    finally:
+        stop_probe()
+
+    failure = None
+    if not written:
+        failure = data
+        if not isinstance(failure, ExtractionFailure):
+            failure = failure_from_probe(probe, "write_outputs", "no statement data")
+    if PIPELINE_METRICS is not None:
+        PIPELINE_METRICS.record_file(data, failure, list(measurements) + take_measurements())
+
+    if failures is not None:
+        if written:
+            failures.resolve(pdf_path)
+        elif os.path.exists(pdf_path):
+            failures.add(pdf_path, failure, input_hash)
+    return written
+
+
+def process_files(extract_pdf_data_func, workers=1, incremental=False, xml_batch=None, sinks=(), pipeline=False,
+                  quarantine=False):
+    folders = processing_folders()
+    if not prepare_folders(folders, incremental):
+        return
+
+    failures = open_quarantine(folders, extract_pdf_data_func) if quarantine else None
+    pdf_files = sorted(f for f in os.listdir(folders["pending"]) if f.endswith(".pdf"))
+
+    if pipeline:
+        process_files_pipelined(extract_pdf_data_func, pdf_files, folders, workers, incremental, xml_batch, sinks,
+                                failures)
+        return
+
+    input_hashes = {}
+    version = None
+    if incremental:
+        manifest = load_manifest(folders["manifest"])
+        version = parser_version(extract_pdf_data_func)
+        pending_files = []
+        for pdf_file in pdf_files:
+            input_hashes[pdf_file] = skip_if_unchanged(pdf_file, folders, manifest, version)
+            if input_hashes[pdf_file] is not None:
+                pending_files.append(pdf_file)
+        pdf_files = pending_files
+
+    pdf_paths = [os.path.join(folders["pending"], pdf_file) for pdf_file in pdf_files]
+    if failures is not None:
+        pdf_paths = [pdf_path for pdf_path in pdf_paths
+                     if failures.admit(pdf_path, input_hashes.get(os.path.basename(pdf_path)))]
+
+    batch_writer = XmlBatchWriter(folders["xml"], xml_batch) if xml_batch else None
+
+    # Outputs are written and PDFs moved here in the parent process, one file at
+    # a time, so only the extraction runs concurrently.
+    try:
+        for pdf_path, data in extract_files(extract_pdf_data_func, pdf_paths, workers):
+            finish_file(pdf_path, data, folders, input_hashes.get(os.path.basename(pdf_path)), version,
+                        batch_writer, sinks, failures)
+    finally:
+        if batch_writer is not None:
+            batch_writer.close()
+        for sink in sinks:
+            sink.close()
+
+
+# -------------------- ASYNC PIPELINE --------------------
+# Alternative to the loop in process_files (--pipeline): reading, parsing and
+# writing run concurrently on different files, connected by bounded asyncio
+# queues. Reads (prefetching the PDF into the OS cache, or hashing it and
+# skipping unchanged files in incremental mode) run on a thread pool, parsing
+# in the worker process pool, and writing (XML/JSON, sinks, moving the PDF,
+# manifest) on a single writer thread, so the XML batch, the sinks and the
+# manifest still see one statement at a time. A full queue makes the stage
+# before it wait, so at most PIPELINE_QUEUE_SIZE read and PIPELINE_QUEUE_SIZE
+# parsed statements are held whatever the size of the batch, and throughput
+# is set by the slowest stage instead of the sum of all three. Statements are
+# written in the order their parses finish.
+PIPELINE_QUEUE_SIZE = 8
+READ_THREADS = 4
+READ_CHUNK_BYTES = 1024 * 1024
+
 
-                print(f"Processed file: {pdf_file}")
-        except Exception:
-            pass  
+def _read_file(pdf_path, folders, manifest, version, failures):
+    try:
+        with span("read_input", file=os.path.basename(pdf_path)):
+            if version is not None:
+                input_hash = skip_if_unchanged(os.path.basename(pdf_path), folders, manifest, version)
+                if input_hash is None:
+                    return False, None
+            else:
+                input_hash = None
+                with open(pdf_path, "rb") as pdf_file:
+                    while pdf_file.read(READ_CHUNK_BYTES):
+                        pass
+            return failures is None or failures.admit(pdf_path, input_hash), input_hash
+    except OSError:
+        return False, None
+
+
+def _read_input(pdf_path, folders, manifest, version, failures):
+    # Returns (parse, input_hash, measurements). Reading the PDF once here
+    # means the parser reads it from the OS cache instead of a slow disk or
+    # network share. The reader threads are shared by all files, so the
+    # measurements of this read travel on with the file.
+    parse, input_hash = _read_file(pdf_path, folders, manifest, version, failures)
+    return parse, input_hash, take_measurements()
+
+
+async def _run_pipeline(extract_pdf_data_func, pdf_paths, folders, workers, manifest, version, batch_writer, sinks,
+                        failures):
+    loop = asyncio.get_running_loop()
+    parse_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+    write_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+    paths = iter(pdf_paths)
+
+    with ThreadPoolExecutor(READ_THREADS) as readers, ThreadPoolExecutor(1) as writer, \
+            _worker_pool(workers) as parsers:
+        async def read():
+            # READ_THREADS of these share one iterator over the paths
+            for pdf_path in paths:
+                parse, input_hash, measurements = await loop.run_in_executor(
+                    readers, _read_input, pdf_path, folders, manifest, version, failures)
+                if parse:
+                    await parse_queue.put((pdf_path, input_hash, measurements))
+
+        async def parse():
+            while (item := await parse_queue.get()) is not None:
+                pdf_path, input_hash, measurements = item
+                result = await loop.run_in_executor(parsers, _extract_file_in_worker, extract_pdf_data_func,
+                                                    pdf_path)
+                await write_queue.put((pdf_path, input_hash, measurements, _worker_result(result)))
+
+        async def write():
+            while (item := await write_queue.get()) is not None:
+                pdf_path, input_hash, measurements, data = item
+                await loop.run_in_executor(writer, finish_file, pdf_path, data, folders, input_hash, version,
+                                           batch_writer, sinks, failures, measurements)
+
+        parse_tasks = [asyncio.create_task(parse()) for _ in range(workers)]
+        write_task = asyncio.create_task(write())
+        await asyncio.gather(*(read() for _ in range(READ_THREADS)))
+        for _ in parse_tasks:
+            await parse_queue.put(None)
+        await asyncio.gather(*parse_tasks)
+        await write_queue.put(None)
+        await write_task
+
+
+def process_files_pipelined(extract_pdf_data_func, pdf_files, folders, workers=1, incremental=False,
+                            xml_batch=None, sinks=(), failures=None):
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    manifest = load_manifest(folders["manifest"]) if incremental else {}
+    version = parser_version(extract_pdf_data_func) if incremental else None
+    pdf_paths = [os.path.join(folders["pending"], pdf_file) for pdf_file in pdf_files]
+
+    batch_writer = XmlBatchWriter(folders["xml"], xml_batch) if xml_batch else None
+    try:
+        asyncio.run(_run_pipeline(extract_pdf_data_func, pdf_paths, folders, workers, manifest, version,
+                                  batch_writer, sinks, failures))
+    finally:
+        if batch_writer is not None:
+            batch_writer.close()
+        for sink in sinks:
+            sink.close()
+# -------------------- ASYNC PIPELINE --------------------
+
+# -------------------- WATCH-FOLDER DAEMON --------------------
+# Long-running alternative to process_files: PDFs_Pending is watched (inotify,
+# or polling where inotify is unavailable) and each PDF is parsed as soon as
+# its size and mtime have been stable for SETTLE_SECONDS, i.e. once the writer
+# is done with it. Worker processes stay warm between files. PDFs that no
+# parser accepted are only retried after they change. Batched XML documents
+# and sink files (e.g. the columnar export) are closed, and become visible,
+# every BATCH_ROTATE_SECONDS.
+SETTLE_SECONDS = 0.2
+BATCH_ROTATE_SECONDS = 60
+
+
+def _file_state(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def watch_files(extract_pdf_data_func, workers=1, incremental=False, xml_batch=None, sinks=(), quarantine=False):
+    folders = processing_folders()
+    if not prepare_folders(folders, incremental):
+        return
+
+    manifest = load_manifest(folders["manifest"]) if incremental else {}
+    version = parser_version(extract_pdf_data_func) if incremental else None
+    failures = open_quarantine(folders, extract_pdf_data_func) if quarantine else None
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    executor = None
+    if workers > 1 or isolated_workers_enabled():
+        executor = _worker_pool(workers)
+
+    batch_writer = XmlBatchWriter(folders["xml"], xml_batch) if xml_batch else None
+    watcher = create_watcher(folders["pending"])
+    rotated = time.monotonic()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    # name -> ((size, mtime), time of last change); None until first stat
+    candidates = {f: None for f in os.listdir(folders["pending"]) if f.endswith(".pdf")}
+    rejected = {}
+    in_flight = {}
+
+    def finish(pdf_path, data, input_hash, state):
+        if not finish_file(pdf_path, data, folders, input_hash, version, batch_writer, sinks, failures):
+            rejected[os.path.basename(pdf_path)] = state
+
+    print(f"Watching folder: {folders['pending']} ({type(watcher).__name__})")
+    try:
+        while True:
+            for name in watcher.wait(0.1 if candidates or in_flight else 1.0):
+                if name.endswith(".pdf"):
+                    candidates.setdefault(name, None)
+
+            now = time.monotonic()
+            in_flight_names = {os.path.basename(task[0]) for task in in_flight.values()}
+            for name in list(candidates):
+                pdf_path = os.path.join(folders["pending"], name)
+                state = _file_state(pdf_path)
+                if state is None:
+                    del candidates[name]
+                    continue
+
+                previous = candidates[name]
+                if previous is None or previous[0] != state:
+                    candidates[name] = (state, now)
+                    continue
+                if now - previous[1] < SETTLE_SECONDS or name in in_flight_names:
+                    continue
+
+                del candidates[name]
+                if rejected.get(name) == state:
+                    continue
+
+                input_hash = None
+                if incremental:
+                    input_hash = skip_if_unchanged(name, folders, manifest, version)
+                    if input_hash is None:
+                        continue
+                if failures is not None and not failures.admit(pdf_path, input_hash):
+                    continue
+
+                if executor is None:
+                    finish(pdf_path, _extract_file_in_parent(extract_pdf_data_func, pdf_path), input_hash, state)
+                else:
+                    future = executor.submit(_extract_file_in_worker, extract_pdf_data_func, pdf_path)
+                    in_flight[future] = (pdf_path, input_hash, state)
+
+            for future in [f for f in in_flight if f.done()]:
+                pdf_path, input_hash, state = in_flight.pop(future)
+                finish(pdf_path, _worker_result(future.result()), input_hash, state)
+
+            if time.monotonic() - rotated >= BATCH_ROTATE_SECONDS:
+                if batch_writer is not None:
+                    batch_writer.close()
+                for sink in sinks:
+                    sink.close()
+                if failures is not None:
+                    failures.release_due(folders["pending"])
+                rotated = time.monotonic()
+
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        watcher.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if batch_writer is not None:
+            batch_writer.close()
+        for sink in sinks:
+            sink.close()
+# -------------------- WATCH-FOLDER DAEMON --------------------
+
+
+def main(extract_pdf_data_func, argv=None, classify_document_func=None):
+    # classify_document_func(doc, max_pages) names the bank of a PDF that is
+    # stopped before parsing (--max-pages).
+    parser = argparse.ArgumentParser(description="Parse bank statement PDFs from PDFs_Pending.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (0 = one per CPU, default 1)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep XML/ and JSON/ and skip PDFs whose input and parser are unchanged")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and parse PDFs as they land in PDFs_Pending")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap reading, parsing and writing of different PDFs (asyncio with bounded queues)")
+    parser.add_argument("--extract-cache", action="store_true",
+                        help="reuse pdfplumber results from the persistent extraction cache")
+    parser.add_argument("--extract-cache-path", default=None,
+                        help="extraction cache file (default: .extraction_cache.sqlite next to the scripts)")
+    parser.add_argument("--extract-cache-mb", type=int, default=None,
+                        help="extraction cache size cap in MB (default 1024)")
+    parser.add_argument("--xml-batch", choices=BATCH_GROUPS, default=None,
+                        help="write one camt.053 document per run or per IBAN instead of one per PDF "
+                             "(not with --incremental)")
+    parser.add_argument("--columnar-export", choices=sorted(COLUMNAR_FORMATS), default=None,
+                        help="also append all transactions to partitioned Parquet or Arrow IPC files (needs pyarrow)")
+    parser.add_argument("--columnar-folder", default=None,
+                        help="folder for the columnar export (default: Transactions next to the scripts)")
+    parser.add_argument("--ledger", action="store_true",
+                        help="also store statements and transactions in the SQLite ledger")
+    parser.add_argument("--ledger-path", default=None,
+                        help="ledger file (default: ledger.sqlite next to the scripts)")
+    parser.add_argument("--roi", nargs="*", default=None, metavar="BIC",
+                        help="read later statement pages inside the transaction region learned from the first "
+                             "page (all supporting banks, or only the given BICs)")
+    parser.add_argument("--learned-columns", nargs="*", default=None, metavar="BIC",
+                        help="read later statement pages of table banks through the column boundaries learned "
+                             "from the first page (all supporting banks, or only the given BICs)")
+    parser.add_argument("--pdfminer-text", nargs="*", default=None, metavar="BIC",
+                        help="read plain-text banks with pdfminer directly instead of pdfplumber "
+                             "(all supporting banks, or only the given BICs); only checked against synthetic "
+                             "statements, so verify a bank's real statements with backend_check.py first")
+    parser.add_argument("--bounded-memory", action="store_true",
+                        help="process each statement strictly one page at a time (for very long statements)")
+    parser.add_argument("--tiered", nargs="*", default=None, metavar="BIC",
+                        help="parse table banks from words first and run the table path only for statements "
+                             "whose balances do not reconcile (all supporting banks, or only the given BICs)")
+    parser.add_argument("--timeout", type=float, default=None, metavar="SECONDS",
+                        help="kill and report a PDF whose parse takes longer (runs every PDF in a worker process)")
+    parser.add_argument("--max-rss-mb", type=int, default=None, metavar="MB",
+                        help="kill and report a PDF whose worker uses more resident memory (Linux)")
+    parser.add_argument("--max-pages", type=int, default=None, metavar="N",
+                        help="report and skip PDFs with more pages")
+    parser.add_argument("--quarantine", action="store_true",
+                        help="move PDFs that fail to PDFs_Quarantine with a failure record and retry them later "
+                             "with exponential backoff")
+    parser.add_argument("--metrics-file", default=None, metavar="PATH",
+                        help="write Prometheus metrics to this file (for node_exporter's textfile collector)")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="record per-stage timings and write them as a Chrome trace-event JSON file")
+    args = parser.parse_args(argv)
+    if args.xml_batch and args.incremental:
+        parser.error("--xml-batch cannot be combined with --incremental (a re-parsed PDF would stay in the "
+                     "batch documents of earlier runs)")
+
+    if args.extract_cache or args.extract_cache_path:
+        max_bytes = args.extract_cache_mb * 1024 * 1024 if args.extract_cache_mb else None
+        enable_extraction_cache(args.extract_cache_path, max_bytes)
+
+    if args.roi is not None:
+        enable_region_of_interest(args.roi)
+    if args.learned_columns is not None:
+        enable_learned_columns(args.learned_columns)
+    if args.pdfminer_text is not None:
+        enable_pdfminer_text(args.pdfminer_text)
+    if args.bounded_memory:
+        enable_bounded_memory()
+    if args.tiered is not None:
+        enable_tiered_extraction(args.tiered)
+    if args.timeout is not None or args.max_rss_mb is not None or args.max_pages is not None:
+        enable_resource_limits(args.timeout, args.max_rss_mb, args.max_pages, classify_document_func)
+
+    sinks = []
+    if args.columnar_export:
+        columnar_folder = args.columnar_folder or os.path.join(processing_folders()["script"], "Transactions")
+        try:
+            sinks.append(ColumnarSink(columnar_folder, args.columnar_export))
+        except ImportError as e:
+            print(f"Error: {e}")
+            return
+    if args.ledger or args.ledger_path:
+        sinks.append(LedgerSink(args.ledger_path))
+
+    if args.trace:
+        enable_tracing()
+    if args.metrics_file or args.metrics_port is not None:
+        enable_metrics(args.metrics_file, args.metrics_port)
+
+    try:
+        if args.watch:
+            watch_files(extract_pdf_data_func, workers=args.workers, incremental=args.incremental,
+                        xml_batch=args.xml_batch, sinks=sinks, quarantine=args.quarantine)
+        else:
+            process_files(extract_pdf_data_func, workers=args.workers, incremental=args.incremental,
+                          xml_batch=args.xml_batch, sinks=sinks, pipeline=args.pipeline, quarantine=args.quarantine)
+    finally:
+        if PIPELINE_METRICS is not None:
+            PIPELINE_METRICS.close()
+        if args.trace:
+            print(f"Wrote {write_trace(args.trace)} trace events to {args.trace}")
 
 # -------------------- MAIN FUNCTION --------------------
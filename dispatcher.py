@@ -0,0 +1,85 @@
+import re
+
+import ABNANL2A
+import HABALT22
+import HABALV22
+import HELSFIHH
+import INGBNL2A
+import ITELFIHH
+import OKOYFIHH
+import PARXLV22
+import RABONL2U
+import RIKOLV2X
+import UNLALV2X
+from common_script import open_document, span
+
+# -------------------- BANK MARKERS --------------------
+# (bank BIC, marker, only on first page, extract function)
+# Markers are the same strings the bank modules check before parsing.
+# RABONL2U has no marker check of its own, so it is matched on its IBAN format,
+# which other banks' statements can print as well (e.g. a counterparty's
+# account); it is a fallback, tried only when no explicit marker matches.
+BANK_PARSERS = [
+    ("ABNANL2A", "Bij- en afschrijvingen", True, ABNANL2A.extract_pdf_info_and_transactions),
+    ("INGBNL2A", "Statement Zakelijke rekening", True, INGBNL2A.extract_pdf_data),
+    ("UNLALV2X", "Norēķinu konts EUR", True, UNLALV2X.extract_info_from_pdf),
+    ("HABALV22", "HABALV22", False, HABALV22.extract_pdf_data),
+    ("HABALT22", "HABALT22", False, HABALT22.extract_pdf_data),
+    ("PARXLV22", 'AS "Citadele banka" Reģ.', False, PARXLV22.extract_pdf_data),
+    ("RIKOLV2X", "RIKOLV2X", False, RIKOLV2X.extract_pdf_data),
+    ("ITELFIHH", "ITELFIHH", False, ITELFIHH.extract_pdf_data),
+    ("HELSFIHH", "HELSFIHH", False, HELSFIHH.extract_pdf_data),
+    ("OKOYFIHH", "OKOYFIHH", False, OKOYFIHH.extract_pdf_data),
+]
+
+FALLBACK_PARSERS = [
+    ("RABONL2U", re.compile(r'NL\d{2} RABO \d{4}'), False, RABONL2U.extract_pdf_data),
+]
+
+EXTRACT_FUNCTIONS = {bic: extract for bic, _, _, extract in BANK_PARSERS + FALLBACK_PARSERS}
+# -------------------- BANK MARKERS --------------------
+
+# -------------------- FUNCTION FOR CLASSIFYING PDF --------------------
+def marker_found(marker, text):
+    if isinstance(marker, str):
+        return marker in text
+    return marker.search(text) is not None
+
+
+def classify_document(doc, max_pages=None):
+    # Page by page, so most statements are classified from the first page only.
+    # The fallback patterns get a second pass over the pages, once no explicit
+    # marker matched anywhere in the document. max_pages limits how many pages
+    # are looked at (e.g. for a PDF stopped by --max-pages).
+    page_count = doc.page_count if max_pages is None else min(doc.page_count, max_pages)
+    for parsers in (BANK_PARSERS, FALLBACK_PARSERS):
+        for i in range(page_count):
+            text = doc.page_text(i) or ""
+            for bic, marker, first_page_only, _ in parsers:
+                if first_page_only and i > 0:
+                    continue
+                if marker_found(marker, text):
+                    return bic
+    return None
+
+# -------------------- FUNCTION FOR CLASSIFYING PDF --------------------
+
+# -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
+def extract_pdf_data(pdf_file):
+    try:
+        with open_document(pdf_file) as doc:
+            with span("classify"):
+                bic = classify_document(doc)
+            if bic is None:
+                return None
+
+            return EXTRACT_FUNCTIONS[bic](doc)
+
+    except Exception:
+        return None
+# -------------------- FUNCTION FOR EXTRACTING PDF DATA --------------------
+
+# Process the whole PDFs_Pending folder once, routing each PDF to its bank parser
+if __name__ == "__main__":
+    from common_script import main
+    main(extract_pdf_data, classify_document_func=classify_document)
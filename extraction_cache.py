@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+# -------------------- PERSISTENT EXTRACTION CACHE --------------------
+# On-disk cache of pdfplumber results (extract_text, extract_words,
+# extract_tables) keyed by the SHA-256 of the PDF bytes, the page number, the
+# kind of extraction and the settings that produced it. Re-running a parser on
+# the same PDFs after a regex fix then only costs the parsing layer.
+#
+# Entries live in one SQLite file. Total payload size is capped; when the cap
+# is exceeded the least recently used entries are evicted. A hit only writes
+# its new last_used time when the stored one is older than
+# TOUCH_INTERVAL_SECONDS, so reading the cache does not take SQLite's write
+# lock on every hit and concurrent workers read in parallel; recency is only
+# kept to that resolution, which is plenty for eviction.
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".extraction_cache.sqlite")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+TOUCH_INTERVAL_SECONDS = 3600
+
+MISSING = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_hash TEXT PRIMARY KEY,
+    page_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS extractions (
+    doc_hash TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (doc_hash, page, kind, settings)
+);
+CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions (last_used);
+"""
+
+
+def file_hash(pdf_path):
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as pdf_file:
+        for chunk in iter(lambda: pdf_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_bytes = max_bytes or DEFAULT_MAX_BYTES
+        self._conn = None
+        self._pid = None
+        self._total = 0
+
+    # The SQLite connection is opened lazily in each process, so a cache object
+    # can be handed to forked or spawned worker processes.
+    def __getstate__(self):
+        return {"path": self.path, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["max_bytes"])
+
+    @property
+    def conn(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._pid = os.getpid()
+            self._total = self._stored_bytes()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def get(self, doc_hash, page, kind, settings):
+        row = self.conn.execute(
+            "SELECT payload, last_used FROM extractions "
+            "WHERE doc_hash = ? AND page = ? AND kind = ? AND settings = ?",
+            (doc_hash, page, kind, settings)).fetchone()
+        if row is None:
+            return MISSING
+
+        now = time.time()
+        if now - row[1] >= TOUCH_INTERVAL_SECONDS:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE extractions SET last_used = ? "
+                    "WHERE doc_hash = ? AND page = ? AND kind = ? AND settings = ?",
+                    (now, doc_hash, page, kind, settings))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, doc_hash, page, kind, settings, value):
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        with self.conn:
+            # A replaced entry no longer counts towards the total.
+            row = self.conn.execute(
+                "SELECT size FROM extractions WHERE doc_hash = ? AND page = ? AND kind = ? AND settings = ?",
+                (doc_hash, page, kind, settings)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extractions (doc_hash, page, kind, settings, payload, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doc_hash, page, kind, settings, payload, len(payload), time.time()))
+        self._total += len(payload) - (row[0] if row else 0)
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def page_count(self, doc_hash):
+        row = self.conn.execute("SELECT page_count FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return row[0] if row else None
+
+    def set_page_count(self, doc_hash, page_count):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO documents (doc_hash, page_count) VALUES (?, ?)",
+                              (doc_hash, page_count))
+
+    def evict(self):
+        # Other worker processes write to the same file, so re-read the real
+        # total before evicting, then drop least recently used entries down to
+        # 90% of the cap to avoid evicting on every insert.
+        self._total = self._stored_bytes()
+        target = int(self.max_bytes * 0.9)
+        if self._total <= self.max_bytes:
+            return
+
+        with self.conn:
+            while self._total > target:
+                rows = self.conn.execute(
+                    "SELECT rowid, size FROM extractions ORDER BY last_used LIMIT 500").fetchall()
+                if not rows:
+                    break
+                evicted = []
+                for rowid, size in rows:
+                    if self._total <= target:
+                        break
+                    evicted.append((rowid,))
+                    self._total -= size
+                self.conn.executemany("DELETE FROM extractions WHERE rowid = ?", evicted)
+            self.conn.execute(
+                "DELETE FROM documents WHERE doc_hash NOT IN (SELECT DISTINCT doc_hash FROM extractions)")
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM extractions")
+            self.conn.execute("DELETE FROM documents")
+        self.conn.execute("VACUUM")
+        self._total = 0
+
+    def stats(self):
+        entries, stored = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+        documents = self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {"documents": documents, "entries": entries, "bytes": stored, "max_bytes": self.max_bytes}
+
+    def _stored_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+# -------------------- PERSISTENT EXTRACTION CACHE --------------------
+
+# Inspect or invalidate the cache: python extraction_cache.py stats|clear
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the persistent pdfplumber extraction cache.")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH, help="cache file (default: %(default)s)")
+    args = parser.parse_args()
+
+    cache = ExtractionCache(args.path)
+    if args.command == "clear":
+        cache.clear()
+        print(f"Cleared extraction cache: {args.path}")
+    else:
+        for key, value in cache.stats().items():
+            print(f"{key}: {value}")
+    cache.close()
@@ -0,0 +1,95 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# -------------------- FOLDER WATCHERS --------------------
+# wait(timeout) blocks for at most timeout seconds and returns the names of
+# files in the folder that were created, written or moved in since the last
+# call. InotifyWatcher is used on Linux; PollingWatcher compares directory
+# snapshots everywhere else (or when inotify is unavailable, e.g. on some
+# network file systems).
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_MODIFY = 0x00000002
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.folder = folder
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        names = set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            _, _, _, name_length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    def __init__(self, folder, interval=0.5):
+        self.folder = folder
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for entry in os.scandir(self.folder):
+            if entry.is_file():
+                stat = entry.stat()
+                snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        names = {name for name, state in snapshot.items() if self.snapshot.get(name) != state}
+        self.snapshot = snapshot
+        return names
+
+    def close(self):
+        pass
+
+
+def create_watcher(folder):
+    try:
+        return InotifyWatcher(folder)
+    except (OSError, AttributeError):
+        return PollingWatcher(folder)
+# -------------------- FOLDER WATCHERS --------------------
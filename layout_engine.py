@@ -0,0 +1,313 @@
+import re
+
+from common_script import open_document
+
+# -------------------- BANK LAYOUT ENGINE --------------------
+# A bank whose statement is readable line by line can be described as a layout
+# spec (a plain dict) instead of a parsing script. compile_layout() turns the
+# spec into a BankLayout once, at import time: every pattern is compiled and
+# every rule gets a substring prefilter, so per-line work is a few "in" checks
+# and only candidate lines reach the regex engine. parse_statement() runs any
+# compiled layout against a PDF path or an open StatementDocument, in one pass
+# over the pages: marker, header fields, balances and rows are read from each
+# page text as it comes, so no page is extracted twice and the statement text
+# is never held in memory as a whole (see --bounded-memory).
+#
+# Spec keys:
+#   bic              bank BIC, used for error messages
+#   marker           string that must appear in the statement
+#   marker_scope     "any_page" (default) or "first_page"
+#   pdfminer_text    the layout only reads plain text, so its statements may
+#                    be read with the pdfminer text backend (default False)
+#   header_source    "first_page" (default) or "all_pages"; with "all_pages"
+#                    the rules without a line_index look at every page as the
+#                    pages stream past, and each keeps the first page where
+#                    its line (or, without one, its pattern) is found
+#   header           list of field rules, evaluated in order on the header text
+#   balances         list of field rules evaluated on every transaction page
+#                    line; the first rule whose line_contains is in the line is
+#                    the only one tried on it, and later matches win
+#   rows             transaction row grammar, see below
+#   constants        fixed output values (bank name, address, ...)
+#   defaults         value of a header/balance field that never matched
+#                    (default "")
+#   output           output keys in order; a key not produced by a rule, a
+#                    constant or "transactions" gets its default
+#   refine_header    optional function(fields, first_page_lines) for quirks
+#                    that do not fit a rule; runs once the header is read,
+#                    before defaults are applied
+#
+# Field rule keys:
+#   name             output field
+#   line_index       take that line of the first page (a missing line fails
+#                    the whole parse, like indexing the lines list would)
+#   line_contains    take the first line containing this substring
+#   offset           with line_contains: use the line this many lines away
+#   when             only evaluate when this field already has a value
+#   pattern          regex searched in the line (or in the whole header text
+#                    when no line is selected); value is group `group`
+#                    (default 1) or `format` filled with all groups
+#   flags            regex flags
+#   strict           a selected line that does not match fails the parse
+#   transforms       list of transforms applied to the value (see TRANSFORMS)
+#
+# Row grammar keys:
+#   start_after      rows only follow the first line containing this text on
+#                    each page (pages without it have no rows)
+#   pattern          row regex; "match" (default) anchors it at line start,
+#                    "search" finds it anywhere in the line
+#   fields           ordered {name: (source, transforms)}; sources are
+#                    ("group", g), ("token", i), ("tokens", start, stop),
+#                    ("sequence", format) and ("literal", value); tokens
+#                    are the whitespace-separated words of the line
+#   sign             {"source": source, "credit_if" | "debit_if": (test, text)}
+#                    with test "contains", "startswith" or "equals"; the
+#                    result is written to cdt_dbt_ind
+#   refine           optional function(row, line, match) for row quirks
+TRANSFORMS = {
+    "strip": lambda value: value.strip(),
+    "collapse_spaces": lambda value: " ".join(value.split()),
+}
+
+
+def _transform(value, transforms):
+    for transform in transforms:
+        if value is None:
+            return value
+        if isinstance(transform, str):
+            value = TRANSFORMS[transform](value)
+        elif transform[0] == "remove":
+            value = value.translate({ord(ch): None for ch in transform[1]})
+        elif transform[0] == "lstrip":
+            value = value.lstrip(transform[1])
+        elif transform[0] == "sub":
+            value = transform[1].sub(transform[2], value)
+        elif transform[0] == "validate":
+            value = value if transform[1].match(value) else ""
+        else:
+            raise ValueError(f"Unknown transform: {transform[0]}")
+    return value
+
+
+def _compile_transforms(transforms):
+    compiled = []
+    for transform in transforms or ():
+        if not isinstance(transform, str) and transform[0] in ("sub", "validate"):
+            transform = (transform[0], re.compile(transform[1])) + tuple(transform[2:])
+        compiled.append(transform)
+    return compiled
+
+
+NOT_FOUND = object()
+
+
+class FieldRule:
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.line_index = spec.get("line_index")
+        self.line_contains = spec.get("line_contains")
+        self.offset = spec.get("offset", 0)
+        self.when = spec.get("when")
+        self.pattern = re.compile(spec["pattern"], spec.get("flags", 0)) if spec.get("pattern") else None
+        self.group = spec.get("group", 1)
+        self.format = spec.get("format")
+        self.strict = spec.get("strict", False)
+        self.transforms = _compile_transforms(spec.get("transforms"))
+
+    def value(self, line):
+        if self.pattern is None:
+            return _transform(line, self.transforms)
+        match = self.pattern.search(line)
+        if match is None:
+            if self.strict:
+                raise ValueError(f"'{self.name}' line does not match {self.pattern.pattern!r}")
+            return None
+        value = self.format.format(*match.groups()) if self.format else match.group(self.group)
+        return _transform(value, self.transforms)
+
+    def apply(self, fields, text, lines):
+        # NOT_FOUND when this text does not have the rule's line (or match),
+        # so a rule that reads every page keeps looking on the next one.
+        if self.when and not fields.get(self.when):
+            return NOT_FOUND
+        if self.line_index is not None:
+            return self.value(lines[self.line_index])
+        if self.line_contains is not None:
+            for i, line in enumerate(lines):
+                if self.line_contains in line:
+                    target = i + self.offset
+                    if 0 <= target < len(lines):
+                        return self.value(lines[target])
+                    return None
+            return NOT_FOUND
+        value = self.value(text)
+        return NOT_FOUND if value is None else value
+
+
+class RowGrammar:
+    def __init__(self, spec):
+        self.start_after = spec.get("start_after")
+        self.pattern = re.compile(spec["pattern"])
+        self.matcher = self.pattern.search if spec.get("mode") == "search" else self.pattern.match
+        self.fields = [(name, source, _compile_transforms(transforms))
+                       for name, (source, transforms) in spec["fields"].items()]
+        self.uses_tokens = any(source[0] in ("token", "tokens") for _, source, _ in self.fields)
+        sign = spec.get("sign")
+        self.sign = None
+        if sign:
+            credit = "credit_if" in sign
+            test, text = sign["credit_if"] if credit else sign["debit_if"]
+            self.sign = (sign["source"], credit, test, text)
+        self.refine = spec.get("refine")
+
+    def _source(self, source, match, tokens, sequence):
+        kind = source[0]
+        if kind == "group":
+            return match.group(source[1])
+        if kind == "token":
+            return tokens[source[1]]
+        if kind == "tokens":
+            return " ".join(tokens[source[1]:source[2]])
+        if kind == "sequence":
+            return source[1].format(sequence)
+        return source[1]
+
+    def _indicator(self, match, tokens, sequence):
+        source, credit, test, text = self.sign
+        value = self._source(source, match, tokens, sequence)
+        if test == "contains":
+            hit = text in value
+        elif test == "startswith":
+            hit = value.startswith(text)
+        else:
+            hit = value == text
+        return "CRDT" if hit == credit else "DBIT"
+
+    def parse_line(self, line, sequence):
+        match = self.matcher(line)
+        if match is None:
+            return None
+        tokens = line.split() if self.uses_tokens else None
+        row = {}
+        for name, source, transforms in self.fields:
+            if name == "cdt_dbt_ind" and self.sign is not None:
+                row[name] = self._indicator(match, tokens, sequence)
+            else:
+                row[name] = _transform(self._source(source, match, tokens, sequence), transforms)
+        if self.refine is not None:
+            self.refine(row, line, match)
+        return row
+
+
+class BankLayout:
+    def __init__(self, spec):
+        self.bic = spec["bic"]
+        self.marker = spec["marker"]
+        self.marker_scope = spec.get("marker_scope", "any_page")
+        self.pdfminer_text = spec.get("pdfminer_text", False)
+        self.header_source = spec.get("header_source", "first_page")
+        self.header = [FieldRule(rule) for rule in spec.get("header", ())]
+        self.balances = [FieldRule(rule) for rule in spec.get("balances", ())]
+        self.rows = RowGrammar(spec["rows"])
+        self.constants = dict(spec.get("constants", {}))
+        self.defaults = dict(spec.get("defaults", {}))
+        self.output = list(spec["output"])
+        self.refine_header = spec.get("refine_header")
+
+    def _read_header(self, fields, rules, text, lines):
+        # Applies the rules to one page; returns those still looking.
+        pending = []
+        for rule in rules:
+            value = rule.apply(fields, text, lines)
+            if value is NOT_FOUND:
+                pending.append(rule)
+            elif value is not None:
+                fields[rule.name] = value
+        return pending
+
+    def _read_balances(self, fields, lines):
+        for line in lines:
+            for rule in self.balances:
+                if rule.line_contains in line:
+                    value = rule.value(line)
+                    if value is not None:
+                        fields[rule.name] = value
+                    break
+
+    def _read_rows(self, transactions, lines):
+        if self.rows.start_after is not None:
+            start = next((i for i, line in enumerate(lines) if self.rows.start_after in line), None)
+            if start is None:
+                return
+            lines = lines[start + 1:]
+
+        for line in lines:
+            row = self.rows.parse_line(line, len(transactions) + 1)
+            if row is not None:
+                transactions.append(row)
+
+    def parse(self, doc):
+        # Returns (fields, transactions), or None when the marker is missing.
+        # Balances are applied after the header, so they win over it.
+        fields = {}
+        balances = {}
+        transactions = []
+        pending = self.header
+        first_lines = None
+        marker_found = False
+        for i, text in enumerate(doc.iter_page_texts()):
+            text = text or ""
+            lines = text.split("\n")
+            if self.marker in text:
+                marker_found = True
+            if i == 0:
+                if self.marker_scope == "first_page" and not marker_found:
+                    return None
+                first_lines = lines
+                pending = self._read_header(fields, pending, text, lines)
+                if self.header_source != "all_pages":
+                    pending = []
+                pending = [rule for rule in pending if rule.line_index is None]
+            elif pending:
+                pending = self._read_header(fields, pending, text, lines)
+            self._read_balances(balances, lines)
+            self._read_rows(transactions, lines)
+
+        if not marker_found:
+            return None
+        if self.refine_header is not None:
+            self.refine_header(fields, first_lines)
+        fields.update(balances)
+        return fields, transactions
+
+
+def compile_layout(spec):
+    return BankLayout(spec)
+
+
+def parse_statement(layout, pdf_file):
+    try:
+        with open_document(pdf_file) as doc:
+            if layout.pdfminer_text:
+                doc.use_pdfminer_text(layout.bic)
+            parsed = layout.parse(doc)
+            if parsed is None:
+                return None
+
+            fields, transactions = parsed
+
+            data = {}
+            for key in layout.output:
+                if key == "transactions":
+                    data[key] = transactions
+                elif key in fields:
+                    data[key] = fields[key]
+                elif key in layout.constants:
+                    data[key] = layout.constants[key]
+                else:
+                    data[key] = layout.defaults.get(key, "")
+            return data
+
+    except Exception:
+        return None
+# -------------------- BANK LAYOUT ENGINE --------------------
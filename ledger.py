@@ -0,0 +1,197 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from normalize import amount_minor, signed_minor, statement_dates, transaction_date
+
+# -------------------- SQLITE LEDGER --------------------
+# Optional sink that stores every parsed statement (header + transactions) in
+# one local SQLite file, so reconciliation questions ("all debits for IBAN X
+# in March") are index lookups instead of scans over the JSON folder.
+#
+# Statements are identified by a hash of their parsed content, so ingesting
+# the same statement again (a re-run, or the same PDF dropped twice) is a
+# no-op. Rows are buffered and written with executemany, one transaction per
+# batch of BATCH_ROWS transactions, in WAL mode so readers are never blocked.
+# Amounts are stored as signed integer cents (debits negative) next to the
+# text printed on the statement; dates are stored as ISO strings.
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ledger.sqlite")
+BATCH_ROWS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statements (
+    statement_hash TEXT PRIMARY KEY,
+    source_file TEXT,
+    iban TEXT,
+    bank_bic TEXT,
+    bank_name TEXT,
+    account_holder TEXT,
+    statement_period TEXT,
+    period_from TEXT,
+    period_to TEXT,
+    opening_balance TEXT,
+    closing_balance TEXT,
+    transaction_count INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    statement_hash TEXT NOT NULL REFERENCES statements (statement_hash),
+    seq INTEGER NOT NULL,
+    iban TEXT,
+    bank_bic TEXT,
+    booking_date TEXT,
+    transaction_id TEXT,
+    beneficiary TEXT,
+    details TEXT,
+    amount_cents INTEGER,
+    amount_text TEXT,
+    cdt_dbt_ind TEXT,
+    balance TEXT,
+    PRIMARY KEY (statement_hash, seq)
+);
+CREATE INDEX IF NOT EXISTS transactions_iban_date ON transactions (iban, booking_date);
+CREATE INDEX IF NOT EXISTS transactions_amount ON transactions (amount_cents);
+CREATE INDEX IF NOT EXISTS statements_iban_period ON statements (iban, period_from);
+"""
+
+HEADER_FIELDS = ["account_number", "account_holder", "bank_bic", "bank_name", "statement_period",
+                 "initial_balance", "closing_balance"]
+TRANSACTION_FIELDS = ["transaction_id", "date", "beneficiary", "details", "amount", "balance", "cdt_dbt_ind"]
+
+
+def statement_hash(data):
+    # Only the parsed fields count, not values create_xml adds to the dict
+    # (creation time, message id), so the same statement always hashes alike.
+    content = {
+        "header": {field: data.get(field) for field in HEADER_FIELDS},
+        "transactions": [{field: transaction.get(field) for field in TRANSACTION_FIELDS}
+                         for transaction in data.get("transactions") or []],
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+                          .encode("utf-8")).hexdigest()
+
+
+class LedgerSink:
+    def __init__(self, path=None, batch_rows=None):
+        self.path = path or DEFAULT_LEDGER_PATH
+        self.batch_rows = batch_rows or BATCH_ROWS
+        self._conn = None
+        self.pending = {}
+        self.pending_rows = 0
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def add(self, data, pdf_file=None):
+        key = statement_hash(data)
+        if key in self.pending:
+            return
+
+        iban = data.get("account_number") or ""
+        bank_bic = data.get("bank_bic") or ""
+        period_from, period_to = statement_dates(data.get("statement_period"))
+        transactions = data.get("transactions") or []
+
+        rows = []
+        for seq, transaction in enumerate(transactions, 1):
+            indicator = (transaction.get("cdt_dbt_ind") or "").upper()
+            amount_cents = signed_minor(amount_minor(transaction.get("amount")), indicator)
+            booking_date = transaction_date(transaction.get("date"), period_from, period_to)
+            rows.append((key, seq, iban, bank_bic, booking_date.isoformat() if booking_date else None,
+                         transaction.get("transaction_id"), transaction.get("beneficiary"),
+                         transaction.get("details"), amount_cents, transaction.get("amount"), indicator,
+                         transaction.get("balance") or None))
+
+        header = (key, pdf_file, iban, bank_bic, data.get("bank_name"), data.get("account_holder"),
+                  data.get("statement_period"), period_from.isoformat() if period_from else None,
+                  period_to.isoformat() if period_to else None, data.get("initial_balance"),
+                  data.get("closing_balance"), len(rows), time.time())
+
+        self.pending[key] = (header, rows)
+        self.pending_rows += len(rows) + 1
+        if self.pending_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        keys = list(self.pending)
+        known = set()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            known.update(row[0] for row in self.conn.execute(
+                f"SELECT statement_hash FROM statements WHERE statement_hash IN ({','.join('?' * len(chunk))})",
+                chunk))
+
+        new = [self.pending[key] for key in keys if key not in known]
+        with self.conn:
+            self.conn.executemany("INSERT INTO statements VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  [header for header, _ in new])
+            self.conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  [row for _, rows in new for row in rows])
+        self.pending.clear()
+        self.pending_rows = 0
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def transactions(self, iban, date_from=None, date_to=None, cdt_dbt_ind=None):
+        query = ("SELECT booking_date, transaction_id, beneficiary, details, amount_cents, cdt_dbt_ind "
+                 "FROM transactions WHERE iban = ?")
+        params = [iban]
+        if date_from:
+            query += " AND booking_date >= ?"
+            params.append(date_from)
+        if date_to:
+            query += " AND booking_date <= ?"
+            params.append(date_to)
+        if cdt_dbt_ind:
+            query += " AND cdt_dbt_ind = ?"
+            params.append(cdt_dbt_ind)
+        return self.conn.execute(query + " ORDER BY booking_date, statement_hash, seq", params).fetchall()
+
+    def stats(self):
+        statements = self.conn.execute("SELECT COUNT(*) FROM statements").fetchone()[0]
+        transactions = self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        accounts = self.conn.execute("SELECT COUNT(DISTINCT iban) FROM statements").fetchone()[0]
+        return {"statements": statements, "transactions": transactions, "accounts": accounts}
+# -------------------- SQLITE LEDGER --------------------
+
+# Inspect the ledger: python ledger.py stats
+# or query it: python ledger.py transactions --iban "LV12 HABA 0551 0000 0000 1" --from 2024-03-01 --to 2024-03-31 --type DBIT
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the SQLite ledger of parsed statements.")
+    parser.add_argument("command", choices=["stats", "transactions"])
+    parser.add_argument("--path", default=DEFAULT_LEDGER_PATH, help="ledger file (default: %(default)s)")
+    parser.add_argument("--iban", help="account as printed on the statement")
+    parser.add_argument("--from", dest="date_from", help="first booking date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="last booking date, YYYY-MM-DD")
+    parser.add_argument("--type", choices=["CRDT", "DBIT"], help="only credits or only debits")
+    args = parser.parse_args()
+
+    ledger = LedgerSink(args.path)
+    if args.command == "stats":
+        for key, value in ledger.stats().items():
+            print(f"{key}: {value}")
+    elif not args.iban:
+        print("Error: --iban is required for transactions")
+    else:
+        for booking_date, transaction_id, beneficiary, details, amount_cents, indicator in \
+                ledger.transactions(args.iban, args.date_from, args.date_to, args.type):
+            amount = "" if amount_cents is None else f"{amount_cents / 100:.2f}"
+            print(f"{booking_date}  {indicator:<4}  {amount:>12}  {transaction_id or ''}  {beneficiary or ''}  "
+                  f"{details or ''}")
+    ledger.close()
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------- PIPELINE METRICS --------------------
+# Optional counters and histograms for the parsing pipeline, in the Prometheus
+# text exposition format (no client library needed):
+#   bank_parser_files_processed_total{bank}           statements written
+#   bank_parser_files_failed_total{bank,stage}        files that failed; bank is
+#                                                     the parser that ran (or
+#                                                     "unknown"), stage the one
+#                                                     that raised
+#   bank_parser_statement_pages{bank}                 pages per statement
+#   bank_parser_statement_transactions{bank}          transactions per statement
+#   bank_parser_stage_seconds{stage}                  open, extract (one page),
+#                                                     parse (whole parser, incl.
+#                                                     its open and extract),
+#                                                     xml_write, json_write
+#   bank_parser_parse_seconds{bank}                   parse time per bank
+#
+# Stage latencies come from the tracing spans (see MEASUREMENTS in
+# tracing.py), so the stages are timed wherever they run, in the parent or a
+# worker. The metrics are exposed as a file for node_exporter's textfile
+# collector (rewritten atomically at most every WRITE_INTERVAL_SECONDS and on
+# close) and/or on a local HTTP endpoint (/metrics), e.g. for the watch-folder
+# daemon.
+WRITE_INTERVAL_SECONDS = 5
+UNKNOWN_BANK = "unknown"
+PAGES_MEASUREMENT = "document.pages"
+PARSER_SUFFIX = ".parse"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+TRANSACTION_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# span name -> stage; bank parsers are traced as "<BIC>.parse"
+STAGE_SPANS = {
+    "pdfplumber.open": "open",
+    "create_xml": "xml_write",
+    "create_json": "json_write",
+}
+EXTRACT_SPAN_PREFIX = "page.extract_"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} counter")
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_number(value)}")
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [bucket counts (last one +Inf), sum, count]
+
+    def observe(self, value, *label_values):
+        state = self.values.get(label_values)
+        if state is None:
+            state = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for label_values, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {count}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PipelineMetrics:
+    def __init__(self, textfile=None):
+        self.textfile = textfile
+        self.lock = threading.Lock()
+        self.files_processed = Counter("bank_parser_files_processed_total", "Statements parsed and written.",
+                                       ("bank",))
+        self.files_failed = Counter("bank_parser_files_failed_total", "Files that failed, by bank parser and stage.",
+                                    ("bank", "stage"))
+        self.statement_pages = Histogram("bank_parser_statement_pages", "Pages per parsed statement.",
+                                         ("bank",), PAGE_BUCKETS)
+        self.statement_transactions = Histogram("bank_parser_statement_transactions",
+                                                "Transactions per parsed statement.", ("bank",),
+                                                TRANSACTION_BUCKETS)
+        self.stage_seconds = Histogram("bank_parser_stage_seconds", "Latency of the pipeline stages.", ("stage",))
+        self.parse_seconds = Histogram("bank_parser_parse_seconds", "Bank parser latency per statement.",
+                                       ("bank",))
+        self.all = [self.files_processed, self.files_failed, self.statement_pages, self.statement_transactions,
+                    self.stage_seconds, self.parse_seconds]
+        self.server = None
+        self.written_at = None
+
+    def _observe_spans(self, measurements):
+        for name, value in measurements:
+            if name.endswith(PARSER_SUFFIX):
+                self.stage_seconds.observe(value, "parse")
+                self.parse_seconds.observe(value, name[:-len(PARSER_SUFFIX)])
+            elif name.startswith(EXTRACT_SPAN_PREFIX):
+                self.stage_seconds.observe(value, "extract")
+            elif name in STAGE_SPANS:
+                self.stage_seconds.observe(value, STAGE_SPANS[name])
+
+    def record_extraction(self, data, measurements):
+        # Measurements of parsing one file, wherever it ran.
+        bank = (data.get("bank_bic") if data else None) or UNKNOWN_BANK
+        with self.lock:
+            self._observe_spans(measurements)
+            if data:
+                for name, value in measurements:
+                    if name == PAGES_MEASUREMENT:
+                        self.statement_pages.observe(value, bank)
+                self.statement_transactions.observe(len(data.get("transactions") or []), bank)
+
+    def record_file(self, data, failure, measurements):
+        # Outcome of one file plus the measurements of writing it.
+        with self.lock:
+            self._observe_spans(measurements)
+            if failure is None:
+                self.files_processed.inc((data.get("bank_bic") if data else None) or UNKNOWN_BANK)
+            else:
+                self.files_failed.inc(failure.bank or UNKNOWN_BANK, failure.stage or "")
+        if self.textfile and (self.written_at is None or time.monotonic() - self.written_at >= WRITE_INTERVAL_SECONDS):
+            self.write_textfile()
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.all:
+                metric.render(lines)
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self):
+        # Written next to the target and renamed, so the collector never reads
+        # half a file.
+        tmp_path = f"{self.textfile}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(self.render())
+        os.replace(tmp_path, self.textfile)
+        self.written_at = time.monotonic()
+
+    def serve(self, port, host="127.0.0.1"):
+        self.server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.server.metrics = self
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        return self.server.server_address
+
+    def close(self):
+        if self.textfile:
+            self.write_textfile()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+# -------------------- PIPELINE METRICS --------------------
@@ -0,0 +1,169 @@
+import re
+from array import array
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+
+# -------------------- AMOUNT AND DATE NORMALIZATION --------------------
+# One place that turns the amount and date tokens printed by the banks into
+# typed values, shared by the parsers, the statement records, the ledger and
+# the columnar export.
+#
+# Amounts: amount_minor() reads a token ("1.234,56", "17,148.34", "+16240,66"
+# or "1 234,56") in one pass over its characters and returns exact integer
+# minor units (cents), no float or Decimal round trip. By default the last
+# "." or "," followed by one or two digits is the decimal separator and every
+# other separator groups thousands; passing decimal_separator pins the locale,
+# so "1.234" with "," means 1234.00, and more than two decimals are rounded
+# half up. plain_amount() is the text form the parsers print: grouping
+# separators removed and "." as decimal separator, everything else kept as
+# printed (a single str.translate instead of a replace chain).
+#
+# Dates: parse_date() accepts ISO dates and day-first dates with ".", "/" or
+# "-" ("01.02.2024", "01/02/24", "01-02" with a default year) and is memoized,
+# because a statement repeats the same few dates on every row. The batch
+# functions take a list of tokens and return an array, for the columnar
+# statement records. Values that do not parse are None in the scalar API and
+# MISSING_MINOR / MISSING_ORDINAL in the arrays.
+MISSING_MINOR = -2 ** 63
+MISSING_ORDINAL = 0
+MAX_CACHED_DATES = 4096
+
+AMOUNT_PATTERN = re.compile(r"[+-]?\d[\d.,\s]*")
+ISO_DATE_PATTERN = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+DATE_PATTERN = re.compile(r"(\d{1,2})[./-](\d{1,2})(?:[./-](\d{4}|\d{2}))?")
+
+PLAIN_AMOUNT_TABLES = {
+    ",": str.maketrans({".": None, ",": "."}),
+    ".": str.maketrans({",": None}),
+}
+
+
+def amount_minor(text, decimal_separator=None):
+    if not text:
+        return None
+    match = AMOUNT_PATTERN.search(str(text))
+    if not match:
+        return None
+
+    token = match.group(0)
+    value = 0
+    digits = 0
+    decimal_at = None
+    for ch in token:
+        if "0" <= ch <= "9":
+            value = value * 10 + ord(ch) - 48
+            digits += 1
+        elif ch == "." or ch == ",":
+            if decimal_separator is None or ch == decimal_separator:
+                decimal_at = digits
+
+    fraction = 0 if decimal_at is None else digits - decimal_at
+    if decimal_separator is None and fraction > 2:
+        fraction = 0
+    if fraction == 0:
+        value *= 100
+    elif fraction == 1:
+        value *= 10
+    elif fraction > 2:
+        value = (value + 5 * 10 ** (fraction - 3)) // 10 ** (fraction - 2)
+    return -value if token[0] == "-" else value
+
+
+def parse_amount(text, decimal_separator=None):
+    minor = amount_minor(text, decimal_separator)
+    return None if minor is None else Decimal(minor).scaleb(-2)
+
+
+def plain_amount(text, decimal_separator=","):
+    return text.translate(PLAIN_AMOUNT_TABLES[decimal_separator])
+
+
+def format_minor(minor):
+    sign = "-" if minor < 0 else ""
+    whole, cents = divmod(abs(minor), 100)
+    return f"{sign}{whole}.{cents:02}"
+
+
+def signed_minor(minor, cdt_dbt_ind):
+    # Debits negative, whatever sign the statement printed.
+    if minor is None:
+        return None
+    return -abs(minor) if (cdt_dbt_ind or "").upper() == "DBIT" else abs(minor)
+
+
+@lru_cache(maxsize=MAX_CACHED_DATES)
+def _parse_date(text, default_year):
+    try:
+        match = ISO_DATE_PATTERN.search(text)
+        if match:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+        match = DATE_PATTERN.search(text)
+        if not match:
+            return None
+        year = match.group(3)
+        if year is None:
+            if default_year is None:
+                return None
+            year = default_year
+        elif len(year) == 2:
+            year = 2000 + int(year)
+        return date(int(year), int(match.group(2)), int(match.group(1)))
+    except ValueError:
+        return None
+
+
+def parse_date(text, default_year=None):
+    if not text:
+        return None
+    return _parse_date(str(text), default_year)
+
+
+def iso_date(text, default_year=None):
+    parsed = parse_date(text, default_year)
+    return None if parsed is None else parsed.isoformat()
+
+
+def statement_dates(statement_period):
+    # "01.02.2024 - 29.02.2024", "01/01/2024-31/01/2024",
+    # "2022-06-01T00:00:01 - 2022-06-30T23:59:59" or a single date.
+    if not statement_period:
+        return None, None
+    dates = [parse_date(part) for part in re.split(r"\s+-\s+|(?<=\d)-(?=\d{2}/)", statement_period)]
+    dates = [d for d in dates if d is not None]
+    if not dates:
+        return None, None
+    return dates[0], dates[-1]
+
+
+def transaction_date(text, statement_from, statement_to):
+    # Dates printed without a year ("01/10", "01.04") take it from the
+    # statement period; a period spanning New Year picks the matching year.
+    if statement_from is None:
+        return parse_date(text)
+    parsed = parse_date(text, statement_from.year)
+    if parsed is not None and statement_to is not None and statement_to.year != statement_from.year \
+            and parsed < statement_from:
+        parsed = parse_date(text, statement_to.year)
+    return parsed
+
+
+def amounts_minor(texts, decimal_separator=None, cdt_dbt_inds=None):
+    # With cdt_dbt_inds the amounts are signed (debits negative).
+    minors = array("q")
+    for i, text in enumerate(texts):
+        minor = amount_minor(text, decimal_separator)
+        if cdt_dbt_inds is not None:
+            minor = signed_minor(minor, cdt_dbt_inds[i])
+        minors.append(MISSING_MINOR if minor is None else minor)
+    return minors
+
+
+def date_ordinals(texts, statement_from=None, statement_to=None):
+    ordinals = array("i")
+    for text in texts:
+        parsed = transaction_date(text, statement_from, statement_to)
+        ordinals.append(MISSING_ORDINAL if parsed is None else parsed.toordinal())
+    return ordinals
+# -------------------- AMOUNT AND DATE NORMALIZATION --------------------
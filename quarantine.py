@@ -0,0 +1,214 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+from extraction_cache import file_hash
+
+# -------------------- QUARANTINE --------------------
+# Optional (--quarantine): a PDF that fails to parse or to write is moved from
+# PDFs_Pending to PDFs_Quarantine instead of staying in PDFs_Pending and being
+# parsed again on every run. Every failure is appended to failures.jsonl in
+# that folder: PDF name, input hash, parser version, the bank parser that ran,
+# the stage that raised, the error and a hash of its traceback (see
+# tracing.py), the attempt number and when the file may be retried.
+#
+# Failures are keyed by input hash, so the same bytes dropped again under
+# another name go straight to quarantine without being parsed. A quarantined
+# file is released back to PDFs_Pending once its retry time has passed; the
+# wait doubles with every failed attempt (RETRY_BASE_SECONDS, capped at
+# RETRY_MAX_SECONDS) and after MAX_ATTEMPTS the file stays in quarantine. A new
+# parser version (any edited bank module or common_script) makes every
+# quarantined file due again and restarts its attempt count, since the fix
+# may be in. A retried file that parses is recorded as resolved, so its bytes
+# are welcome again. Quarantined files are named "<input hash prefix>_<PDF
+# name>".
+#
+# A failure that depends only on the bytes is bound to happen again with the
+# same parser, so it gets no retry time and is only retried when the parser
+# version changes (see retryable): a PDF over the --max-pages ceiling
+# (NON_RETRYABLE_STAGES), one pdfminer cannot parse (PARSE_ERRORS, from
+# whichever stage raised it) and one the parser read without an exception but
+# found no statement in. Anything else is retried with backoff, an OSError from
+# pdfplumber.open included, as is a worker stopped by WORKER_STOP_STAGES.
+QUARANTINE_MANIFEST = "failures.jsonl"
+RETRY_BASE_SECONDS = 3600
+RETRY_MAX_SECONDS = 7 * 24 * 3600
+MAX_ATTEMPTS = 8
+NON_RETRYABLE_STAGES = ("page_limit",)
+# pdfplumber wraps pdfminer's errors in PdfminerException; the pdfminer text
+# backend raises them as they are.
+PARSE_ERRORS = ("PdfminerException", "PDFSyntaxError", "PSEOF", "PSSyntaxError")
+WORKER_STOP_STAGES = ("timeout", "memory_limit", "worker_crash")
+HASH_PREFIX_CHARS = 16
+
+
+class ExtractionFailure:
+    # Returned in place of the statement data for a file that failed. It is
+    # falsy, so code that only checks "if data:" treats it like None.
+    __slots__ = ("stage", "bank", "error", "traceback_hash")
+
+    def __init__(self, stage, bank=None, error=None, traceback_hash=None):
+        self.stage = stage
+        self.bank = bank
+        self.error = error
+        self.traceback_hash = traceback_hash
+
+    def __bool__(self):
+        return False
+
+    def to_dict(self):
+        return {"bank": self.bank, "stage": self.stage, "error": self.error, "traceback_hash": self.traceback_hash}
+
+    def __repr__(self):
+        return f"ExtractionFailure({self.to_dict()!r})"
+
+
+def failure_from_probe(probe, stage, error):
+    # stage/error describe a file that failed without an exception, e.g. a
+    # parser that returned None because its patterns did not match.
+    if probe is None:
+        return ExtractionFailure(stage, error=error)
+    if probe.stage is None:
+        return ExtractionFailure(f"{probe.bank}.parse" if probe.bank else stage, probe.bank, error)
+    return ExtractionFailure(probe.stage, probe.bank, probe.error, probe.traceback_hash)
+
+
+def retryable(failure):
+    if failure.stage in NON_RETRYABLE_STAGES:
+        return False
+    if failure.traceback_hash is None:
+        return failure.stage in WORKER_STOP_STAGES
+    return (failure.error or "").split(":", 1)[0] not in PARSE_ERRORS
+
+
+def retry_delay(attempt):
+    return min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+
+
+def load_failures(manifest_path):
+    # input hash -> latest failure; compacted on load like the output manifest.
+    failures = {}
+    if not os.path.exists(manifest_path):
+        return failures
+
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        for line in manifest_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # partial line left by an interrupted run
+            if entry.get("resolved_at"):
+                failures.pop(entry["input_hash"], None)
+            else:
+                failures[entry["input_hash"]] = entry
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+        for entry in failures.values():
+            manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, manifest_path)
+    return failures
+
+
+class Quarantine:
+    def __init__(self, folder, version=None):
+        self.folder = folder
+        self.version = version
+        os.makedirs(folder, exist_ok=True)
+        self.manifest_path = os.path.join(folder, QUARANTINE_MANIFEST)
+        self.failures = load_failures(self.manifest_path)
+        self.by_prefix = {input_hash[:HASH_PREFIX_CHARS]: input_hash for input_hash in self.failures}
+        self.retrying = {}  # PDF path -> input hash of an admitted file that failed before
+
+    def is_due(self, entry, now=None):
+        if entry.get("parser_version") != self.version:
+            return True
+        retry_at = entry.get("retry_at")
+        return retry_at is not None and (now or time.time()) >= retry_at
+
+    def _move_in(self, pdf_path, input_hash):
+        target = os.path.join(self.folder, f"{input_hash[:HASH_PREFIX_CHARS]}_{os.path.basename(pdf_path)}")
+        shutil.move(pdf_path, target)
+        return target
+
+    def admit(self, pdf_path, input_hash=None):
+        # True if the PDF should be parsed; False after moving bytes that
+        # already failed and are not due for a retry back to quarantine.
+        try:
+            input_hash = input_hash or file_hash(pdf_path)
+        except OSError:
+            return True
+        entry = self.failures.get(input_hash)
+        if entry is None:
+            return True
+        if self.is_due(entry):
+            self.retrying[pdf_path] = input_hash
+            return True
+
+        self._move_in(pdf_path, input_hash)
+        retry = "never" if entry.get("retry_at") is None else \
+            datetime.fromtimestamp(entry["retry_at"]).isoformat(timespec="seconds")
+        print(f"Quarantined file: {os.path.basename(pdf_path)} (failed before in {entry.get('stage')}, "
+              f"next retry: {retry})")
+        return False
+
+    def add(self, pdf_path, failure, input_hash=None):
+        pdf_file = os.path.basename(pdf_path)
+        input_hash = input_hash or file_hash(pdf_path)
+        previous = self.failures.get(input_hash)
+        attempt = 1
+        if previous is not None and previous.get("parser_version") == self.version:
+            attempt = previous.get("attempt", 0) + 1
+
+        now = time.time()
+        retry_at = None
+        if attempt < MAX_ATTEMPTS and retryable(failure):
+            retry_at = now + retry_delay(attempt)
+        entry = {
+            "pdf_file": pdf_file,
+            "input_hash": input_hash,
+            "parser_version": self.version,
+            **failure.to_dict(),
+            "attempt": attempt,
+            "failed_at": now,
+            "retry_at": retry_at,
+        }
+        self.retrying.pop(pdf_path, None)
+        self._move_in(pdf_path, input_hash)
+        self._append(entry)
+        self.failures[input_hash] = entry
+        self.by_prefix[input_hash[:HASH_PREFIX_CHARS]] = input_hash
+        print(f"Quarantined file: {pdf_file} ({failure.stage}: {failure.error or 'no data'}, attempt {attempt})")
+
+    def _append(self, entry):
+        with open(self.manifest_path, "a", encoding="utf-8") as manifest_file:
+            manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def resolve(self, pdf_path):
+        # Called after a PDF was parsed and written.
+        input_hash = self.retrying.pop(pdf_path, None)
+        if input_hash is not None and self.failures.pop(input_hash, None) is not None:
+            self._append({"pdf_file": os.path.basename(pdf_path), "input_hash": input_hash, "resolved_at": time.time()})
+
+    def release_due(self, pending_folder):
+        # Moves quarantined PDFs whose retry time has passed back to
+        # PDFs_Pending; returns how many were released.
+        released = 0
+        now = time.time()
+        for name in sorted(os.listdir(self.folder)):
+            prefix, _, pdf_file = name.partition("_")
+            if not name.endswith(".pdf") or not pdf_file:
+                continue
+            entry = self.failures.get(self.by_prefix.get(prefix))
+            if entry is not None and not self.is_due(entry, now):
+                continue
+            target = os.path.join(pending_folder, pdf_file)
+            if os.path.exists(target):
+                continue
+            shutil.move(os.path.join(self.folder, name), target)
+            print(f"Released file for retry: {pdf_file}")
+            released += 1
+        return released
+# -------------------- QUARANTINE --------------------
@@ -0,0 +1,641 @@
+import argparse
+import calendar
+import math
+import os
+import random
+import unicodedata
+from datetime import date
+from decimal import Decimal
+
+# -------------------- SYNTHETIC STATEMENT GENERATOR --------------------
+# Generates synthetic bank statement PDFs in the layout each bank module
+# expects, so parser throughput can be measured (see benchmark.py) without
+# real customer statements. Every statement is internally consistent: the
+# opening balance plus the signed transactions equals the closing balance.
+#
+# The PDFs are written by the small writer below (standard Helvetica font, no
+# extra dependencies). Characters outside ASCII are mapped to named glyphs, so
+# pdfplumber extracts the same Latvian/Finnish/Lithuanian text the parsers
+# look for ("Sākuma atlikums", "Norēķinu konts EUR", "NÄRPES", ...).
+BANKS = ["RABONL2U", "INGBNL2A", "ABNANL2A", "HABALV22", "HABALT22", "PARXLV22",
+         "RIKOLV2X", "UNLALV2X", "ITELFIHH", "HELSFIHH", "OKOYFIHH"]
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+TOP_MARGIN = 40
+BOTTOM_MARGIN = 800
+LINE_HEIGHT = 12
+ROW_HEIGHT = 14
+FONT_SIZE = 9
+
+# Helvetica advance widths for character codes 32..126
+HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+# Non-ASCII characters used by the layouts and their glyph names. They are
+# encoded from code 128 upwards through the font's /Differences array.
+EXTRA_GLYPHS = {
+    "ā": "amacron", "Ā": "Amacron", "ē": "emacron", "Ē": "Emacron", "ī": "imacron",
+    "Ī": "Imacron", "ū": "umacron", "Ū": "Umacron", "ķ": "kcommaaccent", "Ķ": "Kcommaaccent",
+    "ļ": "lcommaaccent", "Ļ": "Lcommaaccent", "ņ": "ncommaaccent", "Ņ": "Ncommaaccent",
+    "ģ": "gcommaaccent", "Ģ": "Gcommaaccent", "š": "scaron", "Š": "Scaron", "ž": "zcaron",
+    "Ž": "Zcaron", "č": "ccaron", "Č": "Ccaron", "ä": "adieresis", "Ä": "Adieresis",
+    "ö": "odieresis", "Ö": "Odieresis", "å": "aring", "Å": "Aring", "ė": "edotaccent",
+    "ų": "uogonek", "ą": "aogonek", "€": "Euro", "„": "quotedblbase", "”": "quotedblright",
+}
+EXTRA_CODES = {char: 128 + i for i, char in enumerate(EXTRA_GLYPHS)}
+SPECIAL_WIDTHS = {"€": 556, "„": 333, "”": 333}
+
+
+def char_width(char):
+    if char in SPECIAL_WIDTHS:
+        return SPECIAL_WIDTHS[char]
+    base = unicodedata.normalize("NFD", char)[0]
+    code = ord(base)
+    return HELVETICA_WIDTHS[code - 32] if 32 <= code <= 126 else 556
+
+
+def text_width(text, size=FONT_SIZE):
+    return sum(char_width(char) for char in text) * size / 1000
+
+
+def fit(text, width, size=FONT_SIZE):
+    while text and text_width(text, size) > width:
+        text = text[:-1]
+    return text.rstrip()
+
+
+def encode_text(text):
+    encoded = bytearray()
+    for char in text:
+        code = EXTRA_CODES.get(char, ord(char))
+        if code > 255:
+            code = ord("?")
+        if char in "\\()":
+            encoded += b"\\"
+        encoded.append(code)
+    return bytes(encoded)
+
+
+class SyntheticPdf:
+    def __init__(self):
+        self.pages = []
+
+    def add_page(self):
+        self.pages.append([])
+
+    def text(self, x, top, text, size=FONT_SIZE):
+        y = PAGE_HEIGHT - top - size
+        self.pages[-1].append(b"BT /F1 %d Tf 1 0 0 1 %.2f %.2f Tm (" % (size, x, y)
+                              + encode_text(text) + b") Tj ET")
+
+    def line(self, x0, top0, x1, top1):
+        self.pages[-1].append(b"%.2f %.2f m %.2f %.2f l S" % (x0, PAGE_HEIGHT - top0, x1, PAGE_HEIGHT - top1))
+
+    def save(self, path):
+        objects = []
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        differences = b" ".join(b"/" + name.encode("ascii") for name in EXTRA_GLYPHS.values())
+        last_char = 127 + len(EXTRA_GLYPHS)
+        widths = HELVETICA_WIDTHS + [0] + [char_width(char) for char in EXTRA_GLYPHS]
+        font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                      b"/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences [128 "
+                      + differences + b"] >> /FirstChar 32 /LastChar %d /Widths [" % last_char
+                      + b" ".join(b"%d" % w for w in widths) + b"] >>")
+        pages_id = add(None)
+
+        page_ids = []
+        for operations in self.pages:
+            content = b"0.5 w\n" + b"\n".join(operations)
+            content_id = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+            page_ids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                                b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                                % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font_id, content_id)))
+        objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids))
+        catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+        output = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        xref_offset = len(output)
+        output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+        output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objects) + 1, catalog_id, xref_offset)
+
+        with open(path, "wb") as pdf_file:
+            pdf_file.write(output)
+# -------------------- SYNTHETIC STATEMENT GENERATOR --------------------
+
+# -------------------- FUNCTIONS FOR STATEMENT CONTENT --------------------
+HOLDERS = {
+    "NL": ["Bakkerij de Vries B.V.", "Jansen Installatietechniek Holding B.V.", "Van Dijk en Zonen V.O.F.",
+           "Groen Hoveniers Utrecht B.V."],
+    "LV": ["SIA Koka Darbnīca", "SIA Baltijas Loģistika", "SIA Rīgas Maiznīca", "SIA Zaļā Dārzniecība"],
+    "LT": ["UAB Medienos Gaminiai", "UAB Baltic Trade Partners", "UAB Vilniaus Kepykla"],
+    "FI": ["Oy Esimerkki Ab", "Rakennus Virtanen Oy", "Kahvila Korhonen Oy"],
+}
+ADDRESSES = {
+    "NL": ["Dorpsstraat 12", "1234 AB Utrecht"],
+    "LV": ["Brīvības iela 101", "Rīga, LV-1001"],
+    "LT": ["Gedimino pr. 1", "Vilnius, LT-01103"],
+    "FI": ["Kauppakatu 5", "00100 Helsinki"],
+}
+COUNTERPARTIES = {
+    "NL": ["Albert Heijn 1019", "Jumbo Supermarkten", "KPN B.V.", "Belastingdienst", "Eneco Services",
+           "Vattenfall Klantenservice", "Shell Station A2", "Bol.com Retail", "Ziggo Services"],
+    "LV": ["SIA Rimi", "AS Latvenergo", "SIA Tele2", "SIA Maxima", "AS Circle", "SIA Lattelecom",
+           "AS Virši", "SIA Narvesen"],
+    "LT": ["UAB Maxima", "Telia Lietuva", "UAB Lidl", "Ignitis UAB", "UAB Circle", "Bolt Operations"],
+    "FI": ["K-MARKET", "S-MARKET", "ELISA", "FORTUM", "TELIA", "NESTE", "POSTI", "ALEPA"],
+}
+CREDIT_COUNTERPARTIES = {
+    "NL": ["Storting", "Rentebijschrijving", "Creditering", "Terugboeking"],
+    "LV": ["SIA Klients", "AS Pasūtītājs", "SIA Partneris", "VID Atmaksa"],
+    "LT": ["UAB Klientas", "UAB Partneris", "VMI Grąžinimas"],
+    "FI": ["ASIAKAS", "KELA", "VEROHALLINTO", "YRITYS"],
+}
+DETAILS = {
+    "NL": ["Betaalautomaat 12:31 pasnr. 012", "Factuur 2024-0{n}", "Maandelijkse termijn",
+           "Omschrijving: bestelling {n}", "Kenmerk: {n}"],
+    "LV": ["Pirkums karte", "Rēķins {n}", "Komunālie maksājumi", "Pakalpojumi {n}", "Līgums {n}"],
+    "LT": ["Pirkimas kortele", "Sąskaita {n}", "Paslaugos {n}", "Sutartis {n}"],
+    "FI": ["Viite {n}", "Lasku {n}", "Korttiosto", "Palvelumaksu {n}", "Viesti: tilaus {n}"],
+}
+
+BANK_REGIONS = {
+    "RABONL2U": "NL", "INGBNL2A": "NL", "ABNANL2A": "NL", "HABALV22": "LV", "HABALT22": "LT",
+    "PARXLV22": "LV", "RIKOLV2X": "LV", "UNLALV2X": "LV", "ITELFIHH": "FI", "HELSFIHH": "FI",
+    "OKOYFIHH": "FI",
+}
+
+
+def digits(rng, count):
+    return "".join(rng.choice("0123456789") for _ in range(count))
+
+
+def make_statement(bank_bic, transactions, seed):
+    rng = random.Random(f"{bank_bic}-{seed}")
+    region = BANK_REGIONS[bank_bic]
+    year = rng.randint(2021, 2025)
+    month = rng.randint(1, 12)
+    last_day = calendar.monthrange(year, month)[1]
+
+    balance = Decimal(rng.randint(100000, 2000000)) / 100
+    statement = {
+        "bank_bic": bank_bic,
+        "holder": rng.choice(HOLDERS[region]),
+        "address": ADDRESSES[region],
+        "holder_id": f"{digits(rng, 6)}-{digits(rng, 5)}",
+        "start": date(year, month, 1),
+        "end": date(year, month, last_day),
+        "opening": balance,
+        "transactions": [],
+    }
+
+    days = sorted(rng.randint(1, last_day) for _ in range(transactions))
+    for number, day in enumerate(days, start=1):
+        credit = rng.random() < 0.3
+        amount = Decimal(rng.randint(100, 300000 if credit else 60000)) / 100
+        if not credit and amount > balance:
+            credit = True
+        balance += amount if credit else -amount
+        pool = CREDIT_COUNTERPARTIES if credit else COUNTERPARTIES
+        statement["transactions"].append({
+            "number": number,
+            "date": date(year, month, day),
+            "counterparty": rng.choice(pool[region]),
+            "details": rng.choice(DETAILS[region]).format(n=digits(rng, 5)),
+            "amount": amount if credit else -amount,
+            "balance": balance,
+            "reference": digits(rng, 10),
+        })
+    statement["closing"] = balance
+    return statement
+
+
+def fmt_amount(value, decimal_sep=".", thousands_sep="", sign=False):
+    # fmt_amount(Decimal("-1234.5"), ",", ".") -> "1.234,50"; sign=True keeps "+"/"-"
+    text = f"{abs(value):,.2f}".replace(",", "\0").replace(".", decimal_sep).replace("\0", thousands_sep)
+    if sign:
+        return ("-" if value < 0 else "+") + text
+    return text
+
+
+def fmt_date(value, pattern):
+    return value.strftime(pattern)
+# -------------------- FUNCTIONS FOR STATEMENT CONTENT --------------------
+
+# -------------------- FUNCTIONS FOR PAGE LAYOUT --------------------
+# A text row is a list of (x, text) segments on one baseline. Columns are laid
+# out at fixed x positions; pdfplumber joins them with single spaces.
+def split_evenly(items, parts):
+    parts = max(1, min(parts, len(items))) if items else 1
+    size = math.ceil(len(items) / parts) if items else 0
+    return [items[i * size:(i + 1) * size] for i in range(parts)]
+
+
+def draw_rows(pdf, top, rows):
+    for row in rows:
+        for i, (x, text) in enumerate(row):
+            if i + 1 < len(row):
+                text = fit(text, row[i + 1][0] - x - 6)  # keep a gap before the next column
+            pdf.text(x, top, text)
+        top += LINE_HEIGHT
+    return top
+
+
+def flow_text(pdf, header, continuation, groups, footer, pages, header_page_only=False):
+    # groups: one list of rows per transaction; a group is never split over
+    # two pages. pages is a lower bound: pages are added when rows overflow.
+    capacity = BOTTOM_MARGIN - TOP_MARGIN
+    chunks = split_evenly(groups, pages - 1 if header_page_only else pages)
+
+    pdf.add_page()
+    top = draw_rows(pdf, TOP_MARGIN, header)
+    if header_page_only:
+        pdf.add_page()
+        top = draw_rows(pdf, TOP_MARGIN, continuation)
+
+    for chunk_index, chunk in enumerate(chunks):
+        if chunk_index > 0:
+            pdf.add_page()
+            top = draw_rows(pdf, TOP_MARGIN, continuation)
+        for group in chunk:
+            if top + len(group) * LINE_HEIGHT > TOP_MARGIN + capacity:
+                pdf.add_page()
+                top = draw_rows(pdf, TOP_MARGIN, continuation)
+            top = draw_rows(pdf, top, group)
+
+    if top + len(footer) * LINE_HEIGHT > TOP_MARGIN + capacity:
+        pdf.add_page()
+        top = draw_rows(pdf, TOP_MARGIN, continuation)
+    draw_rows(pdf, top, footer)
+
+
+def draw_table(pdf, top, columns, rows):
+    # columns: x boundaries (len = cells + 1); rows: list of cell lists. A row
+    # with a single cell spans the whole table (no inner vertical lines).
+    for cells in rows:
+        bottom = top + ROW_HEIGHT
+        pdf.line(columns[0], top, columns[-1], top)
+        edges = columns if len(cells) > 1 else [columns[0], columns[-1]]
+        for x in edges:
+            pdf.line(x, top, x, bottom)
+        for i, cell in enumerate(cells):
+            right = edges[i + 1]
+            pdf.text(edges[i] + 2, top + 3, fit(cell, right - edges[i] - 4))
+        top = bottom
+    pdf.line(columns[0], top, columns[-1], top)
+    return top
+
+
+def flow_table(pdf, header, continuation, columns, head_row, first_rows, tx_rows, last_rows, pages,
+               repeat_head=True):
+    chunks = split_evenly(tx_rows, pages)
+    capacity_rows = (BOTTOM_MARGIN - TOP_MARGIN - len(header) * LINE_HEIGHT) // ROW_HEIGHT - 2
+    page_rows = []
+    for chunk in chunks:
+        while len(chunk) > capacity_rows:
+            page_rows.append(chunk[:capacity_rows])
+            chunk = chunk[capacity_rows:]
+        page_rows.append(chunk)
+
+    for page_index, rows in enumerate(page_rows):
+        pdf.add_page()
+        top = draw_rows(pdf, TOP_MARGIN, header if page_index == 0 else continuation) + 6
+        table = []
+        if page_index == 0 or repeat_head:
+            table.append(head_row)
+        if page_index == 0:
+            table.extend(first_rows)
+        table.extend(rows)
+        if page_index == len(page_rows) - 1:
+            table.extend(last_rows)
+        draw_table(pdf, top, columns, table)
+# -------------------- FUNCTIONS FOR PAGE LAYOUT --------------------
+
+# -------------------- BANK LAYOUTS --------------------
+def layout_rabonl2u(pdf, st, pages):
+    iban = "NL%s RABO %s %s %s" % (digits(random.Random(st["holder"]), 2), "0123", "4567", "89")
+    header = [
+        [(40, "Rabobank")], [(40, "Rekeningafschrift")],
+        [(40, "Nummer %d / %d" % (st["start"].month, st["start"].year))],
+        [(40, "Datum %s" % fmt_date(st["end"], "%d-%m-%Y"))], [(40, "Zakelijke Rekening")],
+        [(40, st["holder"])], [(40, " ".join(st["address"]))], [(40, "Rekeningoverzicht")],
+        [(40, "Beginsaldo %s" % fmt_date(st["start"], "%d-%m-%Y")), (400, fmt_amount(st["opening"], ",", ".") + " CR")],
+        [(40, "Totaal afschrijvingen"), (400, fmt_amount(sum(-t["amount"] for t in st["transactions"] if t["amount"] < 0), ",", "."))],
+        [(40, "Eindsaldo %s" % fmt_date(st["end"], "%d-%m-%Y")), (400, fmt_amount(st["closing"], ",", ".") + " CR")],
+        [(40, "Totaal bijschrijvingen"), (400, fmt_amount(sum(t["amount"] for t in st["transactions"] if t["amount"] > 0), ",", "."))],
+        [(40, "Rekeningnummer %s" % iban)],
+        [(40, "Datum"), (90, "Omschrijving"), (470, "Bedrag")],
+    ]
+    continuation = [[(40, "Rabobank")], [(40, "Rekeningnummer %s" % iban)],
+                     [(40, "Datum"), (90, "Omschrijving"), (470, "Bedrag")]]
+    groups = []
+    for t in st["transactions"]:
+        groups.append([
+            [(40, fmt_date(t["date"], "%d-%m")), (90, t["counterparty"]), (470, fmt_amount(t["amount"], ",", "."))],
+            [(90, t["details"])],
+            [(90, "Verwerkingsdatum: %s" % fmt_date(t["date"], "%d-%m-%Y"))],
+        ])
+    flow_text(pdf, header, continuation, groups, [], pages)
+
+
+def layout_ingbnl2a(pdf, st, pages):
+    period = "%s till %s" % (fmt_date(st["start"], "%d/%m/%Y"), fmt_date(st["end"], "%d/%m/%Y"))
+    header = [
+        [(40, "Statement Zakelijke rekening")], [(40, "ING Bank N.V.")], [(40, "Period")],
+        [(40, st["holder"]), (300, period)], [(40, "Accountnumber")], [(40, "Type Zakelijke rekening")],
+        [(40, "NL%s INGB 0001 2345 67" % fmt_date(st["start"], "%m"))],
+        [(40, "Opening balance (EUR)")], [(40, fmt_amount(st["opening"], ".", ","))],
+        [(40, "Closing balance (EUR)")], [(40, fmt_amount(st["closing"], ".", ","))],
+        [(40, "Date"), (110, "Name / Description"), (470, "Amount")],
+    ]
+    continuation = [[(40, "Statement Zakelijke rekening")], [(40, "Date"), (110, "Name / Description"), (470, "Amount")]]
+    groups = []
+    for t in st["transactions"]:
+        sign = "+" if t["amount"] > 0 else "-"
+        groups.append([
+            [(40, fmt_date(t["date"], "%d/%m/%Y")), (110, t["counterparty"]), (470, "%s %s" % (sign, fmt_amount(t["amount"], ".", ",")))],
+            [(110, t["details"])],
+            [(110, "Value date: %s" % fmt_date(t["date"], "%d/%m/%Y"))],
+        ])
+    flow_text(pdf, header, continuation, groups, [], pages)
+
+
+def layout_abnanl2a(pdf, st, pages):
+    debits = sum(1 for t in st["transactions"] if t["amount"] < 0)
+    header = [
+        [(40, "ABN AMRO Bank N.V.")], [(40, "Bij- en afschrijvingen")],
+        [(40, "Rekeninghouder %s" % st["holder"])], [(40, st["address"][0])], [(40, st["address"][1])],
+        [(40, "Ondernemersrekening %s" % digits(random.Random(st["holder"]), 9))],
+        [(40, "IBAN NL%s ABNA 0123 4567 89" % fmt_date(st["start"], "%m"))],
+        [(40, "Periode %s t/m %s" % (fmt_date(st["start"], "%d-%m-%Y"), fmt_date(st["end"], "%d-%m-%Y"))),
+         (300, "Aantal afschrijvingen %d" % debits)],
+        [(40, "Saldo %s" % fmt_date(st["start"], "%d-%m-%Y")), (300, "€ %s" % fmt_amount(st["opening"], ",", "."))],
+        [(40, "Saldo %s" % fmt_date(st["end"], "%d-%m-%Y")), (300, "€ %s" % fmt_amount(st["closing"], ",", "."))],
+        [(40, "Datum"), (110, "Omschrijving"), (420, "Af"), (500, "Bij")],
+    ]
+    continuation = [[(40, "ABN AMRO Bank N.V.")], [(40, "Datum"), (110, "Omschrijving"), (420, "Af"), (500, "Bij")]]
+    groups = []
+    for t in st["transactions"]:
+        # Credits are booked with a one-word description, as the parser tells
+        # credit from debit by the number of columns on the line.
+        if t["amount"] > 0:
+            first = [(40, fmt_date(t["date"], "%d-%m-%Y")), (110, t["counterparty"].split()[0]),
+                     (500, fmt_amount(t["amount"], ",", "."))]
+        else:
+            first = [(40, fmt_date(t["date"], "%d-%m-%Y")), (110, t["counterparty"]),
+                     (420, fmt_amount(t["amount"], ",", "."))]
+        groups.append([first, [(110, t["details"])], [(110, "Referentie %s" % t["reference"])]])
+    footer = [[(40, "Aantal afschrijvingen %d" % debits)]]
+    flow_text(pdf, header, continuation, groups, footer, pages)
+
+
+def layout_habalv22(pdf, st, pages):
+    rng = random.Random(st["holder"])
+    iban = "LV%s HABA %s %s %s %s" % (digits(rng, 2), digits(rng, 4), digits(rng, 4), digits(rng, 4), digits(rng, 1))
+    column_head = [(40, "Nr."), (60, "Datums"), (115, "Saņēmējs/Maksātājs"), (250, "Informācija"),
+                   (420, "Summa"), (490, "Atlikums")]
+    header = [
+        [(40, st["holder"]), (300, "AS Swedbank")],
+        [(40, "p.k. %s" % st["holder_id"]), (300, "Reģ. Nr. 40003074764")],
+        [(40, "Konts %s EUR" % iban)],
+        [(40, " ".join(st["address"]))],
+        [(40, "Periods %s - %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_date(st["end"], "%d.%m.%Y"))),
+         (300, "Reģ. Nr. 40003074764")],
+        [(40, "BIC HABALV22")],
+        column_head,
+        [(40, "Sākuma atlikums %s %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_amount(st["opening"])))],
+    ]
+    continuation = [[(40, "AS Swedbank")], column_head]
+    groups = []
+    for t in st["transactions"]:
+        beneficiary = (t["counterparty"].split() + ["-"])[:2]
+        details = (t["details"].split() + ["-"])[:2]
+        groups.append([[(40, str(t["number"])), (60, fmt_date(t["date"], "%d.%m.%Y")),
+                        (115, " ".join(beneficiary)), (250, " ".join(details)),
+                        (420, fmt_amount(t["amount"], sign=True)), (490, fmt_amount(t["balance"]))]])
+    footer = [[(40, "Beigu atlikums %s %s" % (fmt_date(st["end"], "%d.%m.%Y"), fmt_amount(st["closing"])))]]
+    flow_text(pdf, header, continuation, groups, footer, pages)
+
+
+def layout_habalt22(pdf, st, pages):
+    start = fmt_date(st["start"], "%Y-%m-%d")
+    end = fmt_date(st["end"], "%Y-%m-%d")
+    header = [
+        [(40, "Account statement")],
+        [(40, "%s „Swedbank” AB" % st["holder"])],
+        [(40, "ID No %s Konstitucijos pr. 20A, Vilnius" % digits(random.Random(st["holder"]), 9))],
+        [(40, "%s, %s Reg.no 112029651, VAT payer code LT120296515" % tuple(st["address"]))],
+        [(40, "Account LT%s 7300 0101 2345 6789 Bank AB Swedbank" % fmt_date(st["start"], "%m"))],
+        [(40, "Period %s - %s Registered 1992-05-14" % (start, end))],
+        [(40, "BIC: HABALT22")],
+        [(40, "EUR Opening balance %s %s" % (start, fmt_amount(st["opening"])))],
+        [(40, "EUR Closing balance %s %s" % (end, fmt_amount(st["closing"])))],
+    ]
+    continuation = [[(40, "Account statement")], [(40, "BIC: HABALT22")]]
+    columns = [40, 70, 125, 260, 420, 480, 555]
+    head_row = ["No.", "Date", "Beneficiary / Payer", "Details", "Amount", "Balance"]
+    rows = [[str(t["number"]), fmt_date(t["date"], "%Y-%m-%d"), t["counterparty"], t["details"],
+             ("-" if t["amount"] < 0 else "") + fmt_amount(t["amount"]), fmt_amount(t["balance"])]
+            for t in st["transactions"]]
+    flow_table(pdf, header, continuation, columns, head_row, [], rows, [], pages)
+
+
+def layout_parxlv22(pdf, st, pages):
+    iban = "LV%sPARX%s" % (digits(random.Random(st["holder"]), 2), digits(random.Random(st["holder_id"]), 13))
+    header = [
+        [(40, 'AS "Citadele banka" Reģ. Nr. 40103303559')],
+        [(40, "Konta pārskats")], [(40, st["holder"])],
+        [(40, "Personas kods/Pases Nr.: %s" % st["holder_id"])],
+        [(40, " ".join(st["address"]))],
+        [(40, "Konta numurs (IBAN): %s" % iban)],
+        [(40, "No %s līdz %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_date(st["end"], "%d.%m.%Y")))],
+    ]
+    continuation = [[(40, 'AS "Citadele banka"')], [(40, "Konta numurs (IBAN): %s" % iban)]]
+    columns = [40, 100, 230, 440, 555]
+    head_row = ["Datums", "Saņēmējs/Maksātājs", "Apraksts", "Summa EUR"]
+    first_rows = [["Sākuma atlikums: %s" % fmt_amount(st["opening"])]]
+    rows = [[fmt_date(t["date"], "%d.%m.%Y"), t["counterparty"], t["details"], fmt_amount(t["amount"], sign=True)]
+            for t in st["transactions"]]
+    debit_total = sum(-t["amount"] for t in st["transactions"] if t["amount"] < 0)
+    last_rows = [["Debeta apgrozījums: %s" % fmt_amount(debit_total)],
+                 ["Beigu atlikums: %s" % fmt_amount(st["closing"])]]
+    flow_table(pdf, header, continuation, columns, head_row, first_rows, rows, last_rows, pages)
+
+
+def layout_rikolv2x(pdf, st, pages):
+    iban = "LV%sRIKO%s" % (digits(random.Random(st["holder"]), 2), digits(random.Random(st["holder_id"]), 13))
+    header = [
+        [(40, "Luminor Bank AS Latvijas filiāle"), (400, "BIC RIKOLV2X")],
+        [(40, "Konta pārskats %s" % st["holder"]), (350, st["holder_id"])],
+        [(40, "Konts: %s" % iban)],
+        [(40, "Pārskata periods: %s - %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_date(st["end"], "%d.%m.%Y")))],
+    ]
+    continuation = [[(40, "Luminor Bank AS Latvijas filiāle"), (400, "BIC RIKOLV2X")]]
+    columns = [40, 100, 220, 400, 475, 555]
+    head_row = ["Datums", "Saņēmējs/Maksātājs", "Maksājuma mērķis", "Debets", "Kredīts"]
+    first_rows = [["Sākuma atlikums: +%s EUR" % fmt_amount(st["opening"])]]
+    rows = [[fmt_date(t["date"], "%d.%m.%Y"), t["counterparty"], t["details"],
+             fmt_amount(t["amount"]) if t["amount"] < 0 else "", fmt_amount(t["amount"]) if t["amount"] > 0 else ""]
+            for t in st["transactions"]]
+    debit_total = sum(-t["amount"] for t in st["transactions"] if t["amount"] < 0)
+    last_rows = [["Kopā izejošie: %s EUR" % fmt_amount(debit_total)],
+                 ["Beigu atlikums: +%s EUR" % fmt_amount(st["closing"])]]
+    # The parser treats every row after the opening balance as a transaction
+    # candidate, so the column header is only printed on the first page.
+    flow_table(pdf, header, continuation, columns, head_row, first_rows, rows, last_rows, pages,
+               repeat_head=False)
+
+
+def layout_unlalv2x(pdf, st, pages):
+    column_head = [(40, "Datums Dok. Maksātājs/Saņēmējs Maksājuma mērķis Summa")]
+    header = [
+        [(40, "AS SEB banka")],
+        [(40, "%s Norēķinu konts EUR LV%sUNLA%s" % (st["holder"], fmt_date(st["start"], "%m"),
+                                                  digits(random.Random(st["holder_id"]), 13)))],
+        [(40, "Pārskats par periodu %s - %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_date(st["end"], "%d.%m.%Y")))],
+        [(40, "Sākuma atlikums"), (400, fmt_amount(st["opening"], ","))],
+        [(40, "Beigu atlikums"), (400, fmt_amount(st["closing"], ","))],
+        column_head,
+    ]
+    continuation = [[(40, "AS SEB banka")], column_head]
+    groups = []
+    for t in st["transactions"]:
+        reference = "MAKSĀJUMS/%s" % t["reference"]
+        amount = ("-" if t["amount"] < 0 else "") + fmt_amount(t["amount"], ",")
+        groups.append([[(40, fmt_date(t["date"], "%d.%m.%Y")), (100, t["counterparty"]),
+                        (220, "%s %s" % (reference, t["details"])), (490, amount)]])
+    flow_text(pdf, header, continuation, groups, [], pages)
+
+
+def layout_itelfihh(pdf, st, pages):
+    period = "%s - %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_date(st["end"], "%d.%m.%Y"))
+    iban = "FI%s 4970 0012 3456 78" % fmt_date(st["start"], "%m")
+    header = [
+        [(40, "NÄRPES SPARBANK AB"), (300, fmt_date(st["end"], "%d.%m.%Y"))],
+        [(40, "HUVUDKONTOR NÄRPES NÄRPESVÄGEN 13"), (300, period)],
+        [(40, "Mottagare"), (300, "IBAN-kontonummer")],
+        [(40, st["holder"])], [(40, iban)], [(40, st["address"][0])], [(40, st["address"][1])],
+        [(40, "BIC-kod ITELFIHH")],
+        [(40, "SALDO %s %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_amount(st["opening"], ",", ".")))],
+        [(40, "BetalningsdagValördag Förklaring EUR")],
+    ]
+    continuation = [[(40, "NÄRPES SPARBANK"), (300, period)]]
+    groups = []
+    for t in st["transactions"]:
+        groups.append([
+            [(40, fmt_date(t["date"], "%d.%m")), (75, fmt_date(t["date"], "%d.%m")), (110, t["counterparty"]),
+             (470, fmt_amount(t["amount"], ",", sign=True))],
+            [(110, t["details"])],
+            [(110, "ARN: %s" % t["reference"])],
+        ])
+    footer = [[(40, "SALDO %s %s" % (fmt_date(st["end"], "%d.%m.%Y"), fmt_amount(st["closing"], ",", ".")))]]
+    flow_text(pdf, header, continuation, groups, footer, pages, header_page_only=True)
+
+
+def layout_helsfihh(pdf, st, pages):
+    header = [
+        [(40, "Aktia Pankki Oyj")], [(40, "TILIOTE")], [(40, st["holder"])],
+        [(40, fmt_date(st["end"], "%d.%m.%Y")), (150, "FI%s 4055 0012 3456 78" % fmt_date(st["start"], "%m"))],
+        [(40, " ".join(st["address"]))],
+        [(40, "PUH. %s %s %s Kausi %d/%d" % (digits(random.Random(st["holder"]), 3), "456", "789",
+                                              st["start"].month, st["start"].year))],
+        [(40, "%s - %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_date(st["end"], "%d.%m.%Y"))), (300, "HELSFIHH")],
+        [(40, "SALDO %s %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_amount(st["opening"], ",", ".")))],
+    ]
+    continuation = [[(40, "Aktia Pankki Oyj")], [(40, "TILIOTE")]]
+    groups = []
+    for t in st["transactions"]:
+        beneficiary = t["counterparty"].replace("-", "")
+        groups.append([[(40, beneficiary), (130, "K"), (145, fmt_date(t["date"], "%d%m")), (180, t["details"]),
+                        (470, "%s %s" % (fmt_amount(t["amount"]), "+" if t["amount"] > 0 else "-"))]])
+    footer = [
+        [(40, "SALDO %s %s" % (fmt_date(st["end"], "%d.%m.%Y"), fmt_amount(st["closing"], ",", ".")))],
+        [(40, "NOSTETTAVISSA %s" % fmt_amount(st["closing"], ",", "."))],
+    ]
+    flow_text(pdf, header, continuation, groups, footer, pages)
+
+
+def layout_okoyfihh(pdf, st, pages):
+    column_head = [(40, "Saaja/Maksaja"), (130, "Kirjauspäivä"), (200, "Laji"), (470, "Määrä EUR")]
+    header = [
+        [(40, "OP Tiliote")],
+        [(40, "Ajalta %s - %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_date(st["end"], "%d.%m.%Y")))],
+        [(40, "Tilinumero IBAN: FI%s 5000 0120 3456 78 BIC: OKOYFIHH" % fmt_date(st["start"], "%m"))],
+        [(40, st["holder"])], [(40, " ".join(st["address"]))],
+        [(40, "SALDO %s %s" % (fmt_date(st["start"], "%d.%m.%Y"), fmt_amount(st["opening"], ",", " ", sign=True)))],
+        column_head,
+    ]
+    continuation = [[(40, "OP Tiliote")], column_head]
+    kinds = ["TILISIIRTO", "VIITESIIRTO", "PALVELUMAKSU"]
+    groups = []
+    for t in st["transactions"]:
+        kind = "PANO" if t["amount"] > 0 else kinds[t["number"] % len(kinds)]
+        groups.append([
+            [(40, t["counterparty"].replace(" ", "-")), (130, fmt_date(t["date"], "%d.%m.%y")), (200, kind),
+             (470, fmt_amount(t["amount"], ",", " ", sign=True))],
+            [(130, t["details"])],
+        ])
+    footer = [[(40, "SALDO %s %s" % (fmt_date(st["end"], "%d.%m.%Y"), fmt_amount(st["closing"], ",", " ", sign=True)))]]
+    flow_text(pdf, header, continuation, groups, footer, pages)
+
+
+LAYOUTS = {
+    "RABONL2U": layout_rabonl2u, "INGBNL2A": layout_ingbnl2a, "ABNANL2A": layout_abnanl2a,
+    "HABALV22": layout_habalv22, "HABALT22": layout_habalt22, "PARXLV22": layout_parxlv22,
+    "RIKOLV2X": layout_rikolv2x, "UNLALV2X": layout_unlalv2x, "ITELFIHH": layout_itelfihh,
+    "HELSFIHH": layout_helsfihh, "OKOYFIHH": layout_okoyfihh,
+}
+# -------------------- BANK LAYOUTS --------------------
+
+# -------------------- FUNCTION FOR GENERATING STATEMENTS --------------------
+def generate_statement(bank_bic, pdf_path, pages=1, transactions=20, seed=0):
+    statement = make_statement(bank_bic, transactions, seed)
+    pdf = SyntheticPdf()
+    LAYOUTS[bank_bic](pdf, statement, max(1, pages))
+    pdf.save(pdf_path)
+    statement["pages"] = len(pdf.pages)
+    return statement
+
+
+def generate_statements(output_folder, banks=None, count=1, pages=1, transactions=20, seed=0):
+    os.makedirs(output_folder, exist_ok=True)
+    generated = []
+    for bank_bic in banks or BANKS:
+        for number in range(count):
+            pdf_path = os.path.join(output_folder, f"{bank_bic}_{seed + number:05d}.pdf")
+            statement = generate_statement(bank_bic, pdf_path, pages, transactions, seed + number)
+            generated.append((pdf_path, statement))
+    return generated
+# -------------------- FUNCTION FOR GENERATING STATEMENTS --------------------
+
+# Example: python synthetic_statements.py PDFs_Pending --banks HABALV22 RABONL2U --count 5 --pages 3
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic bank statement PDFs.")
+    parser.add_argument("output_folder")
+    parser.add_argument("--banks", nargs="+", choices=BANKS, default=BANKS)
+    parser.add_argument("--count", type=int, default=1, help="statements per bank")
+    parser.add_argument("--pages", type=int, default=1, help="minimum pages per statement")
+    parser.add_argument("--transactions", type=int, default=20, help="transactions per statement")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for pdf_path, statement in generate_statements(args.output_folder, args.banks, args.count, args.pages,
+                                                   args.transactions, args.seed):
+        print(f"Generated {pdf_path} ({statement['pages']} pages, {len(statement['transactions'])} transactions)")
@@ -0,0 +1,273 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+
+# -------------------- STAGE TRACING --------------------
+# Optional span instrumentation for the pipeline stages (pdfplumber.open,
+# extract_text / extract_words / extract_tables, the bank parsers, create_xml
+# and create_json). Tracing is off by default; span() then returns a shared
+# no-op context manager, so the instrumented code pays a few global lookups.
+#
+# When enabled, every span is recorded as a Chrome trace "complete" event
+# (ph "X", timestamps in microseconds). write_trace() produces a file that
+# loads in chrome://tracing or https://ui.perfetto.dev, where one slow
+# statement shows up as a flame timeline. Spans recorded in worker processes
+# are collected with take_events() and merged into the parent with
+# add_events(); they keep their own pid, so each worker gets its own track.
+# Every thread records into its own buffer, so take_events() in one thread
+# (e.g. the writer of the --pipeline mode) never takes events of the files
+# other threads are working on; write_trace() merges all buffers.
+#
+# The same spans double as failure probes and as stage timings for the metrics
+# (see STAGE FAILURES and MEASUREMENTS below).
+TRACING = False
+
+_buffers = threading.local()
+_event_buffers = []  # every thread's event buffer, for write_trace()
+_event_buffers_lock = threading.Lock()
+
+
+def _thread_events():
+    events = getattr(_buffers, "events", None)
+    if events is None:
+        events = _buffers.events = []
+        with _event_buffers_lock:
+            _event_buffers.append(events)
+    return events
+
+
+def _thread_measurements():
+    measurements = getattr(_buffers, "measurements", None)
+    if measurements is None:
+        measurements = _buffers.measurements = []
+    return measurements
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class _Span:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        if MEASURING:
+            _thread_measurements().append((self.name, end - self.start))
+        if TRACING:
+            event = {
+                "name": self.name,
+                "ph": "X",
+                "ts": self.start * 1e6,
+                "dur": (end - self.start) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            }
+            if exc_type is not None:
+                self.args["error"] = exc_type.__name__
+            if self.args:
+                event["args"] = self.args
+            _thread_events().append(event)
+        if exc_type is not None and FAILURE_PROBES:
+            _note_exception(self.name, exc_value)
+        return False
+
+
+class _ProbeSpan:
+    # Failure probes without tracing: only exceptions are noted.
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            _note_exception(self.name, exc_value)
+        return False
+
+
+def span(name, **args):
+    if not TRACING and not MEASURING:
+        if FAILURE_PROBES:
+            _note_stage(name)
+            return _ProbeSpan(name)
+        return NO_SPAN
+    if FAILURE_PROBES:
+        _note_stage(name)
+    return _Span(name, args)
+
+
+def traced(name):
+    # Decorator form of span() for whole functions, e.g. a bank's extract
+    # function. Nested extraction spans show up as its children, so the
+    # remaining self time is the parser's own regex / string work.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACING and not MEASURING and not FAILURE_PROBES:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable_tracing():
+    global TRACING
+    TRACING = True
+
+
+def tracing_enabled():
+    return TRACING
+
+
+def take_events():
+    # Returns the events this thread recorded so far and empties its buffer.
+    if not TRACING:
+        return []
+    buffer = _thread_events()
+    events = buffer[:]
+    del buffer[:]
+    return events
+
+
+def add_events(events):
+    if TRACING and events:
+        _thread_events().extend(events)
+
+
+def write_trace(trace_path):
+    with _event_buffers_lock:
+        events = [event for buffer in _event_buffers for event in buffer]
+    for pid in sorted({event["pid"] for event in events}):
+        name = "main" if pid == os.getpid() else f"worker {pid}"
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": name}})
+
+    with open(trace_path, "w", encoding="utf-8") as trace_file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file, ensure_ascii=False)
+    return len(events)
+# -------------------- STAGE TRACING --------------------
+
+# -------------------- STAGE FAILURES --------------------
+# Bank parsers catch their own exceptions and return None, so the caller only
+# learns that a file failed, not where. With failure probes enabled, span()
+# and traced() also note, tracing or not, which bank parser ran (bank parsers
+# are traced as "<BIC>.parse") and the last exception that left a span: its
+# stage is the innermost span it passed through, and its traceback is hashed
+# (exception type plus file, function and line of every frame), so the same
+# failure gets the same hash on every run and machine. A probe is started per
+# file with start_probe() and belongs to the thread that started it; spans in
+# other threads do not touch it.
+FAILURE_PROBES = False
+PARSER_SUFFIX = ".parse"
+MAX_ERROR_CHARS = 300
+
+_probes = threading.local()
+
+
+class FailureProbe:
+    def __init__(self):
+        self.bank = None
+        self.stage = None
+        self.error = None
+        self.traceback_hash = None
+        self._exception = None
+
+
+def enable_failure_probes():
+    global FAILURE_PROBES
+    FAILURE_PROBES = True
+
+
+def failure_probes_enabled():
+    return FAILURE_PROBES
+
+
+def start_probe():
+    # Returns None while failure probes are disabled.
+    probe = FailureProbe() if FAILURE_PROBES else None
+    _probes.current = probe
+    return probe
+
+
+def stop_probe():
+    _probes.current = None
+
+
+def traceback_hash(exception):
+    frames = traceback.extract_tb(exception.__traceback__)
+    key = type(exception).__name__ + "".join(f"|{os.path.basename(frame.filename)}:{frame.name}:{frame.lineno}"
+                                             for frame in frames)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _note_stage(name):
+    probe = getattr(_probes, "current", None)
+    if probe is not None and name.endswith(PARSER_SUFFIX):
+        probe.bank = name[:-len(PARSER_SUFFIX)]
+
+
+def _note_exception(name, exception):
+    # Outer spans see the same exception again; the innermost one is kept.
+    probe = getattr(_probes, "current", None)
+    if probe is None or exception is probe._exception:
+        return
+    probe._exception = exception
+    probe.stage = name
+    probe.error = f"{type(exception).__name__}: {exception}"[:MAX_ERROR_CHARS]
+    probe.traceback_hash = traceback_hash(exception)
+# -------------------- STAGE FAILURES --------------------
+
+# -------------------- MEASUREMENTS --------------------
+# For the pipeline metrics (see metrics.py): while measurements are enabled,
+# every span appends (span name, seconds) to the measurement buffer of its
+# thread, and measure() adds other per-file values such as the page count of
+# a statement. Whoever works on a file takes the measurements of its thread
+# when done with it (take_measurements()) and hands them on with the file: a
+# worker process with its result, like its trace events, and the read stage
+# of the --pipeline mode with the file it read.
+MEASURING = False
+
+
+def enable_measurements():
+    global MEASURING
+    MEASURING = True
+
+
+def measurements_enabled():
+    return MEASURING
+
+
+def measure(name, value):
+    if MEASURING:
+        _thread_measurements().append((name, value))
+
+
+def take_measurements():
+    # Returns the measurements this thread recorded so far and starts a new
+    # list.
+    if not MEASURING:
+        return []
+    measurements = _thread_measurements()
+    _buffers.measurements = []
+    return measurements
+# -------------------- MEASUREMENTS --------------------